@@ -171,6 +171,22 @@ void setup() {
 void loop() {
   // put your main code here, to run repeatedly:
   
+  //Reading the next move from the computer, "MOVER origin,destination,capture,capture square,castle":
+  if (Serial.available() > 0) {
+    String command = Serial.readStringUntil('\n');
+    command.trim();
+    if (command.startsWith("MOVER ")) {
+      int start = 6;
+      for (int k = 0; k < 5; k++) {
+        int end = command.indexOf(',', start);
+        if (end < 0) end = command.length();
+        Movement[k] = command.substring(start, end).toInt();
+        start = end + 1;
+      }
+      Serial.println("MOVER_OK");
+    }
+  }
+
   //Assigning the button to pin:
   RobotTurnButton = digitalRead(pin1);
   
@@ -0,0 +1,438 @@
+import argparse
+import multiprocessing as mp
+import os
+import random
+import tempfile
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from connect4_bitboard import COLUNAS, LINHAS, EstadoConnect4, entradas_modelo
+from minimax_connect4 import avaliacao_do_modelo, minimax
+
+# Geração de dados do Connect_4_ML_V4 (training_Batch / pretraining_Batch) em
+# paralelo: cada processo de um Pool joga partidas com o minimax em bitboard e
+# escreve as amostras (estado, jogador, alvo) direto num buffer de replay em
+# memmap, um anel de capacidade fixa (as mais antigas saem primeiro). Os pesos
+# do modelo usado nas folhas ficam em memória compartilhada; o treino publica
+# uma versão nova de tempos em tempos e cada processo a recarrega antes da
+# próxima partida. treinar() amostra do buffer enquanto as partidas seguem.
+
+# spawn: o processo principal pode estar treinando com threads do torch, e fork
+# no meio disso pode travar os filhos. Locks e Pool têm de vir do mesmo contexto.
+CONTEXTO = mp.get_context('spawn')
+
+CASAS = LINHAS * COLUNAS
+DTYPE_AMOSTRA = np.dtype([('estado', np.int8, (CASAS,)), ('jogador', np.int8), ('alvo', np.float32)])
+
+
+class BufferReplay:
+    # <caminho>: as amostras; <caminho>.cab: [próxima posição, total já escrito].
+    # Qualquer processo que abre o mesmo caminho vê os mesmos dados (mmap
+    # compartilhado); lock é um Lock de CONTEXTO comum a todos eles.
+    def __init__(self, caminho: str, capacidade: int, lock=None):
+        self.caminho = caminho
+        self.capacidade = capacidade
+        self.lock = lock if lock is not None else CONTEXTO.Lock()
+
+        tamanho = capacidade * DTYPE_AMOSTRA.itemsize
+        existe = os.path.exists(caminho) and os.path.getsize(caminho) == tamanho \
+            and os.path.exists(caminho + '.cab')
+        modo = 'r+' if existe else 'w+'
+        self.amostras = np.memmap(caminho, DTYPE_AMOSTRA, mode=modo, shape=(capacidade,))
+        self.cabecalho = np.memmap(caminho + '.cab', np.int64, mode=modo, shape=(2,))
+
+    def __getstate__(self):
+        # Vai para outro processo só o endereço; ele reabre os mesmos arquivos
+        return {'caminho': self.caminho, 'capacidade': self.capacidade, 'lock': self.lock}
+
+    def __setstate__(self, estado):
+        self.__init__(estado['caminho'], estado['capacidade'], estado['lock'])
+
+    def __len__(self) -> int:
+        return int(min(self.cabecalho[1], self.capacidade))
+
+    @property
+    def total_escrito(self) -> int:
+        return int(self.cabecalho[1])
+
+    def adicionar(self, estados: np.ndarray, jogadores: np.ndarray, alvos: np.ndarray):
+        n = len(alvos)
+        if n > self.capacidade:
+            estados, jogadores, alvos = estados[-self.capacidade:], jogadores[-self.capacidade:], alvos[-self.capacidade:]
+            n = self.capacidade
+        with self.lock:
+            posicao, total = int(self.cabecalho[0]), int(self.cabecalho[1])
+            # Até duas fatias quando dá a volta no anel
+            primeira = min(n, self.capacidade - posicao)
+            for destino, origem in ((slice(posicao, posicao + primeira), slice(0, primeira)),
+                                    (slice(0, n - primeira), slice(primeira, n))):
+                self.amostras['estado'][destino] = estados[origem]
+                self.amostras['jogador'][destino] = jogadores[origem]
+                self.amostras['alvo'][destino] = alvos[origem]
+            self.cabecalho[0] = (posicao + n) % self.capacidade
+            self.cabecalho[1] = total + n
+
+    def amostrar(self, n: int, rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # Com reposição, uniforme sobre o que está no buffer; a cópia é feita sob
+        # o lock para não pegar uma linha pela metade
+        with self.lock:
+            tamanho = len(self)
+            if tamanho == 0:
+                raise ValueError("Buffer de replay vazio")
+            amostras = self.amostras[rng.integers(tamanho, size=n)]
+        return amostras['estado'], amostras['jogador'], amostras['alvo']
+
+    def entradas(self, estados: np.ndarray, jogadores: np.ndarray) -> np.ndarray:
+        # Amostras -> (n, 43) float32, o Baches_to_input dos notebooks
+        entrada = np.empty((len(jogadores), CASAS + 1), dtype=np.float32)
+        entrada[:, :CASAS] = estados
+        entrada[:, CASAS] = jogadores
+        return entrada
+
+    def fechar(self):
+        self.amostras.flush()
+        self.cabecalho.flush()
+
+
+class PesosCompartilhados:
+    # Memória compartilhada: [versão, quantidade] (int64) + parâmetros float32.
+    # Versão ímpar = escrita em andamento; quem lê nesse meio tenta de novo.
+    def __init__(self, quantidade: Optional[int] = None, nome: Optional[str] = None):
+        if nome is None:
+            self.memoria = shared_memory.SharedMemory(create=True, size=16 + 4 * quantidade)
+            self.dono = True
+        else:
+            # Os processos do Pool dividem o resource_tracker do principal, que
+            # é quem apaga o bloco (fechar() do dono)
+            self.memoria = shared_memory.SharedMemory(name=nome)
+            self.dono = False
+        self.cabecalho = np.ndarray((2,), np.int64, self.memoria.buf, 0)
+        if self.dono:
+            self.cabecalho[:] = (0, quantidade)
+        self.valores = np.ndarray((int(self.cabecalho[1]),), np.float32, self.memoria.buf, 16)
+
+    @property
+    def nome(self) -> str:
+        return self.memoria.name
+
+    @property
+    def versao(self) -> int:
+        return int(self.cabecalho[0])
+
+    def publicar(self, valores: np.ndarray):
+        versao = int(self.cabecalho[0])
+        self.cabecalho[0] = versao + 1
+        self.valores[:] = valores
+        self.cabecalho[0] = versao + 2
+
+    def ler(self, ultima: int) -> Optional[Tuple[int, np.ndarray]]:
+        # (versão, cópia) se houver versão publicada mais nova que ultima
+        while True:
+            versao = int(self.cabecalho[0])
+            if versao == ultima or versao == 0:
+                return None
+            if versao % 2:
+                time.sleep(0)
+                continue
+            copia = self.valores.copy()
+            if int(self.cabecalho[0]) == versao:
+                return versao, copia
+
+    def fechar(self):
+        del self.cabecalho, self.valores
+        self.memoria.close()
+        if self.dono:
+            self.memoria.unlink()
+
+
+def vetor_de_pesos(modelo) -> np.ndarray:
+    import torch
+    return torch.nn.utils.parameters_to_vector(modelo.parameters()).detach().cpu().numpy().astype(np.float32)
+
+
+def carregar_vetor(modelo, valores: np.ndarray):
+    import torch
+    with torch.no_grad():
+        torch.nn.utils.vector_to_parameters(torch.from_numpy(valores), modelo.parameters())
+
+
+# ---- Partidas ----
+
+def jogar_partida(avaliar, profundidade: int, p_aleatorio: float, rng: random.Random,
+                  rotular=None) -> Tuple[List[int], List[int], List[int], List[float]]:
+    # Uma partida de training_Batch (avaliar = modelo) ou pretraining_Batch
+    # (avaliar = None), com as mesmas regras de quais posições entram.
+    # rotular(estado, jogador) -> (valor, lance, terminal) troca o minimax de
+    # profundidade fixa por outra busca (ex.: BuscaMinimax com tempo por lance).
+    pecas1, pecas2, jogadores, alvos = [], [], [], []
+    estado = EstadoConnect4()
+    jogador = 1
+    for _ in range(CASAS):
+        if rotular is None:
+            valor, melhor, terminal = minimax(estado, jogador, profundidade, avaliar, 0, 1, rng)
+        else:
+            valor, melhor, terminal = rotular(estado, jogador)
+        if avaliar is None:
+            guardar = valor != 0.5 or rng.random() > 0.6
+        else:
+            guardar = not terminal or rng.random() > 0.6
+        if guardar:
+            pecas1.append(estado.pecas1)
+            pecas2.append(estado.pecas2)
+            jogadores.append(jogador)
+            alvos.append(valor)
+
+        validos = estado.validos()
+        lance = melhor if rng.random() > p_aleatorio else validos[int(rng.random() * len(validos))]
+        estado = estado.jogar(lance, jogador)
+        vencedor = estado.vencedor()
+        if vencedor or estado.cheio():
+            break
+        jogador = -jogador
+
+    # Posição final com o resultado, marcada com o jogador do último lance
+    pecas1.append(estado.pecas1)
+    pecas2.append(estado.pecas2)
+    jogadores.append(jogador)
+    alvos.append({1: 1.0, -1: 0.0}.get(vencedor, 0.5))
+    return pecas1, pecas2, jogadores, alvos
+
+
+def gravar_partidas(buffer: BufferReplay, partidas: List[Tuple[list, list, list, list]]) -> int:
+    pecas1 = [p for partida in partidas for p in partida[0]]
+    pecas2 = [p for partida in partidas for p in partida[1]]
+    jogadores = np.array([j for partida in partidas for j in partida[2]], dtype=np.int8)
+    alvos = np.array([a for partida in partidas for a in partida[3]], dtype=np.float32)
+    estados = entradas_modelo(pecas1, pecas2, jogadores)[:, :CASAS].astype(np.int8)
+    buffer.adicionar(estados, jogadores, alvos)
+    return len(alvos)
+
+
+# Estado de cada processo de trabalho (montado pelo initializer do Pool)
+_trabalho: Dict[str, object] = {}
+
+
+def _iniciar_trabalhador(buffer: BufferReplay, nome_pesos: Optional[str], arquitetura: Optional[str],
+                         profundidade: int, p_aleatorio: float):
+    _trabalho.update(buffer=buffer, profundidade=profundidade, p_aleatorio=p_aleatorio,
+                     modelo=None, avaliar=None, pesos=None, versao=0)
+    if arquitetura:
+        import torch
+        import modelos_connect4
+        # Um processo por núcleo: threads do torch dentro de cada um só disputariam a CPU
+        torch.set_num_threads(1)
+        modelo = modelos_connect4.MODELOS[arquitetura]().eval()
+        _trabalho.update(modelo=modelo, avaliar=avaliacao_do_modelo(modelo),
+                         pesos=PesosCompartilhados(nome=nome_pesos))
+
+
+def _jogar(tarefa: Tuple[int, int]) -> Tuple[int, int, int]:
+    semente, partidas = tarefa
+    rng = random.Random(semente)
+    pesos = _trabalho['pesos']
+    jogadas = []
+    for _ in range(partidas):
+        if pesos is not None:
+            nova = pesos.ler(_trabalho['versao'])
+            if nova:
+                _trabalho['versao'], valores = nova
+                carregar_vetor(_trabalho['modelo'], valores)
+        jogadas.append(jogar_partida(_trabalho['avaliar'], _trabalho['profundidade'], _trabalho['p_aleatorio'], rng))
+    amostras = gravar_partidas(_trabalho['buffer'], jogadas)
+    return partidas, amostras, _trabalho['versao']
+
+
+class GeradorAutojogo:
+    # arquitetura=None gera como pretraining_Batch (sem modelo, sem torch); com
+    # 'layers3'/'layers4' as folhas do minimax usam o modelo publicado (o
+    # Base_model do notebook), e publicar() manda pesos novos aos processos.
+    def __init__(self, buffer: BufferReplay, profundidade: int = 3, p_aleatorio: float = 0.5,
+                 processos: Optional[int] = None, arquitetura: Optional[str] = None,
+                 partidas_por_tarefa: int = 4, semente: int = 0):
+        self.buffer = buffer
+        self.profundidade = profundidade
+        self.p_aleatorio = p_aleatorio
+        self.processos = processos or os.cpu_count() or 1
+        self.arquitetura = arquitetura
+        self.partidas_por_tarefa = partidas_por_tarefa
+        self.semente = semente
+
+        self.pesos: Optional[PesosCompartilhados] = None
+        self.pool = None
+        self.thread = None
+        self.partidas = 0
+        self.amostras = 0
+        self.versao_usada = 0
+        self.inicio = 0.0
+        self.fim: Optional[float] = None
+        self.erro: Optional[BaseException] = None
+
+    def publicar(self, modelo):
+        valores = vetor_de_pesos(modelo)
+        if self.pesos is None:
+            self.pesos = PesosCompartilhados(len(valores))
+        self.pesos.publicar(valores)
+
+    def iniciar(self, partidas: int):
+        if self.arquitetura and self.pesos is None:
+            raise RuntimeError("Publique os pesos do modelo antes de iniciar")
+        self.pool = CONTEXTO.Pool(self.processos, initializer=_iniciar_trabalhador,
+                                  initargs=(self.buffer, self.pesos.nome if self.pesos else None,
+                                            self.arquitetura, self.profundidade, self.p_aleatorio))
+        tarefas = []
+        restantes = partidas
+        while restantes > 0:
+            n = min(self.partidas_por_tarefa, restantes)
+            tarefas.append((self.semente + len(tarefas), n))
+            restantes -= n
+
+        self.partidas = self.amostras = 0
+        self.inicio = time.perf_counter()
+        self.fim = None
+        self.thread = threading.Thread(target=self._acompanhar, args=(tarefas,), name="autojogo", daemon=True)
+        self.thread.start()
+
+    def _acompanhar(self, tarefas: List[Tuple[int, int]]):
+        try:
+            for partidas, amostras, versao in self.pool.imap_unordered(_jogar, tarefas):
+                self.partidas += partidas
+                self.amostras += amostras
+                self.versao_usada = max(self.versao_usada, versao)
+        except BaseException as e:
+            self.erro = e
+        finally:
+            self.fim = time.perf_counter()
+
+    @property
+    def ativo(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def aguardar(self, timeout: Optional[float] = None):
+        if self.thread:
+            self.thread.join(timeout)
+        if self.erro:
+            raise self.erro
+
+    def encerrar(self):
+        if self.pool:
+            self.pool.terminate()
+            self.pool.join()
+            self.pool = None
+        if self.pesos:
+            self.pesos.fechar()
+            self.pesos = None
+
+    def estatisticas(self) -> dict:
+        duracao = (self.fim or time.perf_counter()) - self.inicio
+        return {
+            'partidas': self.partidas,
+            'amostras': self.amostras,
+            'partidas_por_segundo': self.partidas / duracao if duracao > 0 else 0.0,
+            'amostras_por_segundo': self.amostras / duracao if duracao > 0 else 0.0,
+            'buffer': len(self.buffer),
+            'versao_pesos': self.versao_usada,
+        }
+
+
+# ---- Treino ----
+
+def MPE(y_pred, Data_Y, power):
+    # Média do erro elevado a certa potência (a loss dos notebooks)
+    import torch
+    return torch.mean(torch.pow(y_pred - Data_Y, power))
+
+
+def treinar(modelo, buffer: BufferReplay, passos: int, tamanho_lote: int = 512,
+            gerador: Optional[GeradorAutojogo] = None, publicar_a_cada: int = 100, minimo: int = 1000,
+            lr: float = 2e-3, imprimir_a_cada: int = 100, semente: int = 0):
+    # Passos de Adam em lotes amostrados do buffer enquanto o gerador segue
+    # jogando; a cada publicar_a_cada passos o gerador passa a usar estes pesos
+    import torch
+    otimizador = torch.optim.Adam(modelo.parameters(), lr=lr, betas=(0.9, 0.999))
+    rng = np.random.default_rng(semente)
+
+    while len(buffer) < minimo and gerador is not None and gerador.ativo:
+        time.sleep(0.05)
+
+    inicio = time.perf_counter()
+    for passo in range(passos):
+        estados, jogadores, alvos = buffer.amostrar(tamanho_lote, rng)
+        y_pred = modelo(torch.from_numpy(buffer.entradas(estados, jogadores)))
+        loss = 100 * MPE(y_pred, torch.from_numpy(alvos), 4)
+        otimizador.zero_grad()
+        loss.backward()
+        otimizador.step()
+
+        if gerador is not None and (passo + 1) % publicar_a_cada == 0:
+            gerador.publicar(modelo)
+        if imprimir_a_cada and passo % imprimir_a_cada == 0:
+            duracao = time.perf_counter() - inicio
+            print(f"passo {passo}: loss {loss.item():.4f}, buffer {len(buffer)}, "
+                  f"{(passo + 1) / duracao if duracao > 0 else 0:.0f} passos/s")
+    return modelo
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Autojogo do Connect-4 em paralelo com buffer de replay em memmap")
+    parser.add_argument("--partidas", type=int, default=400)
+    parser.add_argument("--processos", type=int, default=os.cpu_count())
+    parser.add_argument("--profundidade", type=int, default=3)
+    parser.add_argument("--p-aleatorio", type=float, default=0.5)
+    parser.add_argument("--capacidade", type=int, default=200_000, help="amostras no buffer (FIFO)")
+    parser.add_argument("--buffer", help="arquivo do buffer (padrão: temporário)")
+    parser.add_argument("--arquitetura", choices=['layers3', 'layers4'],
+                        help="modelo nas folhas do minimax; sem ele gera como pretraining_Batch")
+    parser.add_argument("--pesos", help="pesos iniciais (.pth) para a arquitetura")
+    parser.add_argument("--passos", type=int, default=0, help="passos de treino durante a geração")
+    parser.add_argument("--salvar", help="grava os pesos treinados neste .pth")
+    parser.add_argument("--sequencial", type=int, default=0,
+                        help="antes, joga esta quantidade de partidas num processo só, para comparar")
+    args = parser.parse_args()
+
+    caminho = args.buffer or os.path.join(tempfile.mkdtemp(prefix='autojogo_'), 'replay.bin')
+    buffer = BufferReplay(caminho, args.capacidade)
+
+    modelo = None
+    if args.arquitetura:
+        import torch
+        import modelos_connect4
+        modelo = modelos_connect4.MODELOS[args.arquitetura]()
+        if args.pesos:
+            modelo.load_state_dict(torch.load(args.pesos, map_location='cpu'))
+
+    if args.sequencial:
+        rng = random.Random(0)
+        avaliar = avaliacao_do_modelo(modelo) if modelo is not None else None
+        inicio = time.perf_counter()
+        partidas = [jogar_partida(avaliar, args.profundidade, args.p_aleatorio, rng) for _ in range(args.sequencial)]
+        duracao = time.perf_counter() - inicio
+        print(f"Sequencial: {args.sequencial / duracao:.1f} partidas/s, "
+              f"{sum(len(p[3]) for p in partidas) / duracao:.0f} amostras/s")
+
+    gerador = GeradorAutojogo(buffer, args.profundidade, args.p_aleatorio, args.processos, args.arquitetura)
+    if modelo is not None:
+        gerador.publicar(modelo)
+    gerador.iniciar(args.partidas)
+    try:
+        if modelo is not None and args.passos:
+            treinar(modelo, buffer, args.passos, gerador=gerador)
+            if args.salvar:
+                import torch
+                torch.save(modelo.state_dict(), args.salvar)
+        gerador.aguardar()
+    finally:
+        gerador.encerrar()
+        buffer.fechar()
+
+    e = gerador.estatisticas()
+    print(f"{args.processos} processos: {e['partidas']} partidas, {e['amostras']} amostras, "
+          f"{e['partidas_por_segundo']:.1f} partidas/s, {e['amostras_por_segundo']:.0f} amostras/s; "
+          f"buffer {e['buffer']}/{args.capacidade} em {caminho}")
+
+
+if __name__ == '__main__':
+    main()
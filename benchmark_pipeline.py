@@ -0,0 +1,253 @@
+import argparse
+import io
+import itertools
+import json
+import logging
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from board_engine import BoardEngine, INFERENCIA_HMM
+from protocolo_serial import ParserFrames, montar_frame_binario
+from simulador_arduino import NIVEIS_CATEGORIA
+
+# Benchmarks do caminho sensor -> lance no host, em 3x3 e 8x8:
+#   decodificação (ASCII e binária), classificação (casa a casa e vetorizada),
+#   inferência (tabela, construção da tabela, HMM), calibração e fim a fim
+#   contra o Arduino simulado (sim://).
+# Cada caso reporta p50/p99 por chamada e chamadas/s; --json grava o resultado
+# com o commit, e --comparar aponta regressões contra um resultado anterior.
+
+RUIDO = 20.0
+
+
+def medir(funcao: Callable[[], object], repeticoes: int, aquecimento: int = 20) -> Dict:
+    for _ in range(min(aquecimento, repeticoes)):
+        funcao()
+    tempos = np.empty(repeticoes)
+    for n in range(repeticoes):
+        inicio = time.perf_counter_ns()
+        funcao()
+        tempos[n] = time.perf_counter_ns() - inicio
+    return resumir(tempos / 1000)
+
+
+def resumir(tempos_us: np.ndarray) -> Dict:
+    media = float(np.mean(tempos_us))
+    return {
+        'n': int(len(tempos_us)),
+        'p50_us': float(np.percentile(tempos_us, 50)),
+        'p99_us': float(np.percentile(tempos_us, 99)),
+        'media_us': media,
+        'por_segundo': 1e6 / media if media > 0 else 0.0,
+    }
+
+
+def gerar_frames(categorias: np.ndarray, n: int, rng: np.random.Generator, ganhos: np.ndarray) -> np.ndarray:
+    base = NIVEIS_CATEGORIA[categorias] * ganhos
+    return np.clip(base + rng.normal(0, RUIDO, (n,) + categorias.shape), 0, 1023).round()
+
+
+def motor_calibrado(linhas: int, colunas: int, rng: np.random.Generator, ganhos: np.ndarray) -> BoardEngine:
+    engine = BoardEngine(linhas, colunas, porta='benchmark')
+    categorias = engine.categorias_pecas(engine.pecas_tabuleiro)
+    engine.processar_calibracao_por_luminosidade(gerar_frames(categorias, engine.amostras_calibracao, rng, ganhos))
+    return engine
+
+
+def lance_de_teste(engine: BoardEngine) -> np.ndarray:
+    # Classificação depois de um lance legal qualquer das brancas (o primeiro gerado)
+    posicao = engine.obter_posicao()
+    lance = posicao.lances_legais()[0]
+    anterior = posicao.jogar(lance)
+    classes = engine.categorias_pecas(posicao.para_matriz())
+    posicao.desfazer(lance, anterior)
+    return classes
+
+
+def casos_tamanho(linhas: int, colunas: int, repeticoes: int) -> List[Dict]:
+    rng = np.random.default_rng(0)
+    ganhos = np.clip(rng.normal(1.0, 0.08, (linhas, colunas)), 0.5, 1.5)
+    engine = motor_calibrado(linhas, colunas, rng, ganhos)
+    categorias = engine.categorias_pecas(engine.pecas_tabuleiro)
+    frames = gerar_frames(categorias, repeticoes, rng, ganhos).astype(int)
+    resultados = []
+
+    def caso(nome: str, medida: Dict):
+        resultados.append(dict(medida, caso=nome, tamanho=f"{linhas}x{colunas}"))
+
+    # Decodificação: um frame por chamada, de um fluxo em memória
+    linhas_ascii = b"".join(("DADOS:" + ",".join(str(v) for v in f.ravel()) + "\n").encode() for f in frames)
+    parser, fluxo = ParserFrames(linhas, colunas), io.BytesIO(linhas_ascii)
+    caso('decodificar_ascii', medir(lambda: parser.ler_mensagem(fluxo), repeticoes, aquecimento=0))
+
+    binarios = b"".join(montar_frame_binario(f, n) for n, f in enumerate(frames))
+    parser, fluxo = ParserFrames(linhas, colunas), io.BytesIO(binarios)
+    parser.definir_binario(True)
+    caso('decodificar_binario', medir(lambda: parser.ler_mensagem(fluxo), repeticoes, aquecimento=0))
+
+    # Classificação do tabuleiro inteiro
+    quadros = itertools.cycle(frames)
+    caso('classificar_casa', medir(lambda: [engine.classificar_casa(v) for v in next(quadros).ravel()], repeticoes))
+    caso('classificar_matriz', medir(lambda: engine.classificar_matriz(next(quadros)), repeticoes))
+
+    # Inferência: leitura com um lance legal, consulta na tabela já montada
+    depois = lance_de_teste(engine)
+    caso('inferencia_tabela', medir(lambda: engine.aplicar_logica_markoviana(depois), repeticoes))
+    posicao = engine.obter_posicao()
+    caso('construir_tabela', medir(lambda: engine.tabela._construir_legais(posicao), max(10, repeticoes // 20)))
+
+    engine.modo_inferencia = INFERENCIA_HMM
+    rastreador = engine.obter_rastreador()
+    caso('inferencia_hmm', medir(lambda: rastreador.atualizar(next(quadros), engine.codigo_anterior,
+                                                              engine.vez_das_brancas, posicao), repeticoes))
+
+    # Calibração completa (GMM + ganhos por casa) com os frames de sempre
+    calibracao = gerar_frames(categorias, engine.amostras_calibracao, rng, ganhos)
+    caso('calibracao', medir(lambda: engine.processar_calibracao_por_luminosidade(calibracao),
+                             max(5, repeticoes // 50), aquecimento=2))
+    return resultados
+
+
+def fim_a_fim(linhas: int, colunas: int, segundos: float, fps: float) -> List[Dict]:
+    # Arduino simulado em sim:// (transporte em memória, sem latência):
+    # latência da chegada do frame ao fim do processamento, e do lance à detecção
+    engine = BoardEngine(linhas, colunas, porta=f"sim://{linhas}x{colunas}?ruido={RUIDO:g}&variacao=0.08&semente=0&fps={fps:g}")
+    # Perfis num diretório temporário: sempre calibra do zero
+    perfis = tempfile.TemporaryDirectory()
+    engine.diretorio_perfis = perfis.name
+    if not engine.conectar():
+        raise RuntimeError("Não foi possível conectar ao simulador")
+    simulador = engine.ser.simulador
+    resultados = []
+    try:
+        engine.leitor.executar("CALIBRAR", "CALIBRACAO_CONCLUIDA", engine.timeouts['CALIBRAR'])
+        engine.processar_calibracao_automatica()
+
+        detectados = []
+        engine.inscrever(lambda evento, dados: detectados.append(time.perf_counter()) if evento == 'movimento' else None)
+        engine.iniciar_streaming(fps, consumir=False)
+
+        latencias, lances = [], []
+        ciclo = lances_de_ida_e_volta(engine)
+        proximo_lance = time.perf_counter() + 0.3
+        inicio = time.perf_counter()
+        while time.perf_counter() - inicio < segundos:
+            latencia = engine.processar_frame_pendente()
+            if latencia is None:
+                time.sleep(0.0005)
+            else:
+                latencias.append(latencia * 1e6)
+
+            agora = time.perf_counter()
+            if agora >= proximo_lance:
+                # Só move de novo depois que o último lance foi detectado
+                if len(detectados) == len(lances):
+                    origem, destino = next(ciclo)
+                    simulador.mover(origem, destino)
+                    lances.append(agora)
+                proximo_lance = agora + 0.3
+        decorrido = time.perf_counter() - inicio
+        engine.parar_streaming()
+
+        medida = resumir(np.array(latencias))
+        medida['por_segundo'] = len(latencias) / decorrido
+        resultados.append(dict(medida, caso='fim_a_fim_frame', tamanho=f"{linhas}x{colunas}"))
+        atrasos = np.array([d - l for l, d in zip(lances, detectados)]) * 1e6
+        if len(atrasos):
+            medida = resumir(atrasos)
+            medida['por_segundo'] = len(atrasos) / decorrido
+            resultados.append(dict(medida, caso='fim_a_fim_lance', tamanho=f"{linhas}x{colunas}"))
+    finally:
+        engine.fechar()
+        perfis.cleanup()
+    return resultados
+
+
+def lances_de_ida_e_volta(engine: BoardEngine):
+    # Lances legais que voltam à posição inicial: no 8x8 os cavalos, no resto
+    # a peça da coluna 0 de cada lado sobe uma casa e volta
+    if (engine.linhas, engine.colunas) == (8, 8):
+        sequencia = [((0, 6), (2, 5)), ((7, 6), (5, 5)), ((2, 5), (0, 6)), ((5, 5), (7, 6))]
+    else:
+        ultima = engine.linhas - 1
+        sequencia = [((0, 0), (1, 0)), ((ultima, 0), (ultima - 1, 1)), ((1, 0), (0, 0)), ((ultima - 1, 1), (ultima, 0))]
+    while True:
+        yield from sequencia
+
+
+def commit_atual() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def comparar(resultados: List[Dict], caminho_base: str, tolerancia: float) -> List[str]:
+    with open(caminho_base, encoding='utf-8') as f:
+        base = {(r['caso'], r['tamanho']): r for r in json.load(f)['resultados']}
+
+    regressoes = []
+    print(f"\nComparação com {caminho_base} (p50 atual / base):")
+    for r in resultados:
+        anterior = base.get((r['caso'], r['tamanho']))
+        if not anterior or anterior['p50_us'] <= 0:
+            continue
+        razao = r['p50_us'] / anterior['p50_us']
+        marca = "  REGRESSÃO" if razao > tolerancia else ""
+        print(f"  {r['tamanho']:>4} {r['caso']:<22} {razao:6.2f}x{marca}")
+        if marca:
+            regressoes.append(f"{r['tamanho']} {r['caso']}")
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks do pipeline sensor -> lance")
+    parser.add_argument("--tamanhos", nargs="+", default=["3x3", "8x8"])
+    parser.add_argument("--repeticoes", type=int, default=2000)
+    parser.add_argument("--segundos", type=float, default=3.0, help="duração do fim a fim por tamanho")
+    parser.add_argument("--fps", type=float, default=200.0, help="frames/s pedidos ao simulador no fim a fim")
+    parser.add_argument("--sem-fim-a-fim", action="store_true")
+    parser.add_argument("--json", help="grava os resultados neste arquivo")
+    parser.add_argument("--comparar", help="resultado anterior (--json) para comparar")
+    parser.add_argument("--tolerancia", type=float, default=1.25, help="razão de p50 acima da qual é regressão")
+    args = parser.parse_args()
+
+    # Mede o pipeline, não o log de cada frame
+    logging.getLogger('tabuleiro').setLevel(logging.WARNING)
+
+    resultados = []
+    for tamanho in args.tamanhos:
+        linhas, colunas = (int(v) for v in tamanho.lower().split('x'))
+        resultados.extend(casos_tamanho(linhas, colunas, args.repeticoes))
+        if not args.sem_fim_a_fim:
+            resultados.extend(fim_a_fim(linhas, colunas, args.segundos, args.fps))
+
+    print(f"{'tamanho':>7} {'caso':<22} {'p50 (us)':>10} {'p99 (us)':>10} {'por s':>10}")
+    for r in resultados:
+        print(f"{r['tamanho']:>7} {r['caso']:<22} {r['p50_us']:>10.1f} {r['p99_us']:>10.1f} {r['por_segundo']:>10.0f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({
+                'commit': commit_atual(),
+                'data': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'python': platform.python_version(),
+                'numpy': np.__version__,
+                'plataforma': platform.platform(),
+                'resultados': resultados,
+            }, f, ensure_ascii=False, indent=2)
+        print(f"\nResultados salvos em {args.json}")
+
+    if args.comparar and comparar(resultados, args.comparar, args.tolerancia):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1217 @@
+import argparse
+import logging
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Union
+
+import numpy as np
+import serial
+import serial.tools.list_ports
+
+from calibracao import estatisticas_clusters, ganhos_por_casa, limiar_entre, salvar_perfil, carregar_perfil
+from controle_varredura import ControladorVarredura
+from filtro_temporal import FiltroTemporal, MODO_EMA
+from gravador_frames import GravadorFrames
+from gerador_lances import EN_PASSANT, ROQUE_GRANDE, ROQUE_PEQUENO, Lance, Posicao, casa_de_nome, comando_robo, nome_casa
+from leitor_serial import LeitorSerial, ErroComando
+from log_sistema import NOME_LOGGER, configurar_logging, encerrar_logging
+from metricas import Metricas, ServidorMetricas
+from protocolo_serial import MODO_ASCII, MODO_BINARIO
+from rastreador_hmm import ModeloSensores, RastreadorHMM
+from registro_partida import RegistroPartida, arquivo_partida, ler_partida, truncar_partida, ultima_partida
+from tabela_transicoes import Movimento, TabelaTransicoes
+from transporte import abrir_transporte
+
+TAMANHO_MAXIMO = 8
+
+# Prefixo da linha que o firmware envia ao terminar o boot
+AVISO_PRONTO = "ARDUINO_PRONTO_3X3_REAL"
+
+# Braço robótico (Automatic_Chess_Bot_V2.ino): porta própria, a 9600 baud; reinicia
+# ao abrir a porta e não se anuncia, então só se espera o boot
+BAUD_ROBO = 9600
+ESPERA_BOOT_ROBO = 2.0
+
+# Como o streaming decide os lances: filtro temporal + tabela (decisão dura)
+# ou rastreador HMM (crença sobre os lances legais, com confiança)
+INFERENCIA_FILTRO = 'filtro'
+INFERENCIA_HMM = 'hmm'
+
+# Classes de casa: 0 = vazio, 1 = branco, 2 = preto
+CATEGORIAS = ('vazio', 'branco', 'preto')
+MARCADORES_BASICOS = np.array(['·', 'B', 'p'])  # Peças genéricas, sem identidade
+# np.digitize devolve 0 (< preto_branco), 1 (faixa média) ou 2 (>= branco_vazio)
+CLASSE_POR_FAIXA = np.array([2, 1, 0])
+
+
+def parece_arduino(porta) -> bool:
+    # Placas originais se identificam; clones costumam usar CH340 ou FTDI
+    texto = f"{porta.description} {porta.manufacturer or ''}".upper()
+    return any(marca in texto for marca in ("ARDUINO", "CH340", "FTDI", "USB SERIAL"))
+
+
+@dataclass
+class CalibrationData:
+    thresholds: Dict
+    cluster_stats: Dict
+    # Limiares por casa, shape (2, linhas, colunas): [preto_branco, branco_vazio]
+    limiares_casas: Optional[np.ndarray] = None
+
+    def __post_init__(self):
+        self.thresholds = self.calculate_thresholds()
+
+    def calculate_thresholds(self) -> Dict:
+        preto = self.cluster_stats['preto']['media']
+        branco = self.cluster_stats['branco']['media']
+        vazio = self.cluster_stats['vazio']['media']
+
+        # Com os desvios do ajuste, o limiar fica mais perto do cluster mais estreito
+        desvio = {nome: self.cluster_stats[nome].get('desvio', 0.0) for nome in ('preto', 'branco', 'vazio')}
+        limiar_preto_branco = limiar_entre(preto, desvio['preto'], branco, desvio['branco'])
+        limiar_branco_vazio = limiar_entre(branco, desvio['branco'], vazio, desvio['vazio'])
+
+        return {
+            'preto_branco': limiar_preto_branco,
+            'branco_vazio': limiar_branco_vazio,
+            'cluster_preto': preto,
+            'cluster_branco': branco,
+            'cluster_vazio': vazio
+        }
+
+    def para_dict(self) -> Dict:
+        return {
+            'cluster_stats': self.cluster_stats,
+            'limiares_casas': self.limiares_casas.tolist() if self.limiares_casas is not None else None,
+        }
+
+    @classmethod
+    def de_dict(cls, dados: Dict) -> 'CalibrationData':
+        limiares = dados.get('limiares_casas')
+        return cls(thresholds={}, cluster_stats=dados['cluster_stats'],
+                   limiares_casas=np.array(limiares, dtype=float) if limiares is not None else None)
+
+
+class BoardEngine:
+    # Núcleo sem interface gráfica: serial, calibração, classificação e rastreamento
+    # de movimentos. Quem quiser acompanhar o sistema se inscreve em inscrever();
+    # as mensagens de log vão para o logger 'tabuleiro' (ver log_sistema).
+    #
+    # Eventos emitidos (nome, dados):
+    #   'conexao'    {'estado': 'conectando' | 'conectado' | 'falha' | 'erro'}
+    #   'tamanho'    {'linhas', 'colunas'}
+    #   'calibracao' {'calibrado'}
+    #   'frame'      {'matriz', 'classificacao'}
+    #   'estado'     {'pecas', 'vez_das_brancas'}
+    #   'movimento'  {'pecas', 'vez_das_brancas', 'confianca' (None fora do modo HMM),
+    #                 'lance' (Lance do gerador_lances com regras, Movimento sem elas)}
+    #   'streaming'  {'ativo'}
+    def __init__(self, linhas: int = 3, colunas: int = 3, porta: str = 'COM6', baud_rate: int = 115200,
+                 nome: Optional[str] = None):
+        self.nome = nome
+        self.arduino_port = porta
+        self.baud_rate = baud_rate
+        self.ser = None
+        self.connected = False
+        self.connection_in_progress = False
+
+        self.assinantes: List[Callable[[str, dict], None]] = []
+        # Com vários tabuleiros no mesmo processo, cada um loga em 'tabuleiro.<nome>'
+        self.logger = logging.getLogger(f"{NOME_LOGGER}.{nome}" if nome else NOME_LOGGER)
+
+        self.calibration_data = None
+        self.dados_matriz = None
+        self.dados_classificados = None
+        self.validar_tamanho(linhas, colunas)
+        self.linhas = linhas
+        self.colunas = colunas
+
+        # Protocolo dos frames, negociado no handshake
+        self.modo_protocolo = MODO_ASCII
+
+        # Estado do tabuleiro com peças específicas
+        self.pecas_tabuleiro = self.get_posicao_inicial_pecas()
+        self.estado_anterior = None
+        self.categorias_anteriores = None
+        self.tabela = TabelaTransicoes(linhas, colunas)
+        self.codigo_anterior = None
+        self.vez_das_brancas = True
+        self.mapa_linhas = None
+
+        # Regras de movimento (gerador_lances): só lances legais explicam uma leitura.
+        # A posição acompanha o jogo (roque, en passant) e é refeita do estado
+        # quando ele muda por fora (reset, novo tamanho)
+        self.validar_regras = True
+        self.posicao_jogo = None
+        self.ultimo_lance = None
+
+        # Registro da partida (registro_partida): cada lance confirmado, com o frame
+        # bruto, vai para um JSONL por partida; ver iniciar_registro()
+        self.registro = None
+        self.diretorio_partidas = 'partidas'
+
+        # Gravação dos frames brutos para reprodução offline (gravador_frames, reproducao)
+        self.gravador = None
+
+        # Histogramas de tempo por etapa e contadores de falha (metricas); a coleta
+        # de tempos pode ser desligada em execução com metricas.ativo = False
+        self.metricas = Metricas(rotulos={'tabuleiro': nome or str(porta)})
+        self.ja_conectou = False
+
+        # Calibração: quantos frames ajustar e onde guardar os perfis por tabuleiro
+        self.amostras_calibracao = 20
+        self.diretorio_perfis = 'calibracoes'
+
+        # Filtro temporal dos frames de streaming; recriado a cada calibração.
+        # histerese é a fração da distância entre limiar e centro do cluster.
+        self.usar_filtro = True
+        self.parametros_filtro = {'modo': MODO_EMA, 'alfa': 0.5, 'janela': 5, 'frames_estaveis': 3, 'histerese': 0.25}
+        self.filtro = None
+        self.calibracao_do_filtro = None
+
+        self.modo_inferencia = INFERENCIA_FILTRO
+        self.parametros_hmm = {'prob_movimento': 0.05, 'limiar_confianca': 0.995, 'peso_observacao': 0.5}
+        self.rastreador = None
+        self.calibracao_do_rastreador = None
+
+        # Uma thread de leitura por conexão; os comandos aguardam a própria resposta
+        self.leitor = None
+        self.ao_receber_frame = None
+        self.timeouts = {
+            'PRONTO': 7.0,
+            'MODO': 2.0,
+            'LER': 10.0,
+            'CALIBRAR': 15.0,
+            'RESET': 5.0,
+            'TEST': 5.0,
+            'STREAM': 2.0,
+            'MOVER': 2.0,
+        }
+
+        # Braço robótico opcional (conectar_robo / mover_robo)
+        self.robo = None
+        self.robo_ser = None
+
+        # Modo streaming: o Arduino envia frames continuamente
+        self.streaming = False
+        self.streaming_consumir = True
+        self.max_fps = 10.0
+
+        # Varredura adaptativa (controle_varredura): só com firmware que anuncia SCAN
+        self.varredura_adaptativa = False
+        self.varredura_ajustavel = False
+        self.controle_varredura = None
+
+        self.salvar_estado_atual()
+
+    # ---- Eventos ----
+
+    def inscrever(self, callback: Callable[[str, dict], None]):
+        self.assinantes.append(callback)
+
+    def cancelar_inscricao(self, callback: Callable[[str, dict], None]):
+        if callback in self.assinantes:
+            self.assinantes.remove(callback)
+
+    def emitir(self, evento: str, **dados):
+        for callback in list(self.assinantes):
+            try:
+                callback(evento, dados)
+            except Exception as e:
+                self.log_message(f"Erro no assinante de '{evento}': {e}")
+
+    def log_message(self, message: str):
+        self.logger.info(f"[{self.nome}] {message}" if self.nome else message)
+
+    def emitir_estado(self):
+        self.emitir('estado', pecas=self.pecas_tabuleiro, vez_das_brancas=self.vez_das_brancas)
+
+    # ---- Tabuleiro ----
+
+    def validar_tamanho(self, linhas: int, colunas: int):
+        if not (1 <= linhas <= TAMANHO_MAXIMO and 1 <= colunas <= TAMANHO_MAXIMO):
+            raise ValueError(f"Tamanho de tabuleiro inválido: {linhas}x{colunas} (máximo {TAMANHO_MAXIMO}x{TAMANHO_MAXIMO})")
+
+    def configurar_tamanho(self, linhas: int, colunas: int):
+        self.validar_tamanho(linhas, colunas)
+        self.linhas = linhas
+        self.colunas = colunas
+
+        if self.leitor:
+            self.leitor.redimensionar(linhas, colunas)
+        if self.gravador and (self.gravador.linhas, self.gravador.colunas) != (linhas, colunas):
+            # Uma sessão tem um só tamanho; se nada foi gravado ainda (DIM do handshake), recomeça
+            gravador = self.gravador
+            self.parar_gravacao()
+            if gravador.gravados == 0:
+                self.gravar_frames(gravador.diretorio, gravador.frames_por_segmento)
+        self.tabela = TabelaTransicoes(linhas, colunas)
+        self.dados_matriz = None
+        self.dados_classificados = None
+        self.mapa_linhas = None
+        self.pecas_tabuleiro = self.get_posicao_inicial_pecas()
+        self.vez_das_brancas = True
+        self.salvar_estado_atual()
+        if self.registro:
+            self.nova_partida()
+
+        self.log_message(f"Tabuleiro configurado para {linhas}x{colunas}")
+        self.emitir('tamanho', linhas=linhas, colunas=colunas)
+        self.emitir_estado()
+
+    def get_posicao_inicial_pecas(self):
+        if (self.linhas, self.colunas) == (3, 3):
+            return [
+                ['A', 'B', 'C'],  # Brancas
+                ['·', '·', '·'],  # Vazio
+                ['a', 'b', 'c']   # Pretas
+            ]
+
+        if (self.linhas, self.colunas) == (8, 8):
+            return ([list('RNBQKBNR'), ['P'] * 8] +
+                    [['·'] * 8 for _ in range(4)] +
+                    [['p'] * 8, list('rnbqkbnr')])
+
+        # Demais tamanhos: primeira linha brancas, última pretas
+        brancas = [chr(65 + j % 3) for j in range(self.colunas)]
+        estado = [brancas] + [['·'] * self.colunas for _ in range(self.linhas - 1)]
+        if self.linhas > 1:
+            estado[-1] = [p.lower() for p in brancas]
+        return estado
+
+    def salvar_estado_atual(self):
+        if self.pecas_tabuleiro is not None:
+            self.estado_anterior = [linha[:] for linha in self.pecas_tabuleiro]
+            self.categorias_anteriores = self.categorias_pecas(self.estado_anterior)
+            self.codigo_anterior = self.tabela.codificar(self.categorias_anteriores)
+
+    def categorias_pecas(self, pecas: List[List[str]]) -> np.ndarray:
+        return np.array([[CATEGORIAS.index(self.obter_categoria_peca(p)) for p in linha]
+                         for linha in pecas], dtype=np.int8)
+
+    def classificar_casa(self, valor: int) -> int:
+        if not self.calibration_data:
+            return 0
+
+        thresholds = self.calibration_data.thresholds
+
+        if valor < thresholds['preto_branco']:
+            return 2  # Preto (faixa baixa)
+        elif valor < thresholds['branco_vazio']:
+            return 1  # Branco (faixa média)
+        else:
+            return 0  # Vazio (faixa alta)
+
+    def classificar_matriz(self, matriz: np.ndarray) -> np.ndarray:
+        # Mesma regra de classificar_casa, aplicada ao tabuleiro inteiro de uma vez
+        if not self.calibration_data:
+            return np.zeros(matriz.shape, dtype=np.int8)
+
+        limiares_casas = self.calibration_data.limiares_casas
+        if limiares_casas is not None and limiares_casas.shape[1:] == matriz.shape:
+            # Limiares próprios de cada casa: a faixa é quantos limiares a leitura atinge
+            faixa = (matriz >= limiares_casas[0]).astype(np.int8) + (matriz >= limiares_casas[1])
+            return CLASSE_POR_FAIXA[faixa].astype(np.int8)
+
+        thresholds = self.calibration_data.thresholds
+        limites = np.array([thresholds['preto_branco'], thresholds['branco_vazio']])
+        return CLASSE_POR_FAIXA[np.digitize(matriz, limites)].astype(np.int8)
+
+    # ---- Conexão ----
+
+    def conectar(self, ser=None, linha_pronto: Optional[str] = None) -> bool:
+        # ser/linha_pronto: porta já aberta por quem sondou as candidatas
+        # (gerenciador_conexao), com o aviso de pronto já lido
+        if self.connection_in_progress:
+            return False
+
+        self.connection_in_progress = True
+        self.connected = False
+        self.emitir('conexao', estado='conectando')
+        self.log_message("Conectando ao Arduino...")
+
+        try:
+            self.log_message(f"Tentando porta: {self.arduino_port}")
+
+            self.parar_streaming()
+            self.fechar_porta()
+
+            # Timeout curto só para a thread de leitura poder ser encerrada
+            self.ser = ser or abrir_transporte(self.arduino_port, self.baud_rate, timeout=0.5)
+            self.log_message("Porta aberta")
+
+            self.leitor = LeitorSerial(self.ser, self.linhas, self.colunas, max_fps=self.max_fps,
+                                       ao_receber_linha=lambda l: self.log_message(f"Arduino: {l}"),
+                                       ao_receber_frame=self.ao_receber_frame, metricas=self.metricas)
+            self.leitor.gravador = self.gravador
+            if linha_pronto is None:
+                # O Arduino reinicia ao abrir a porta e se anuncia quando fica pronto
+                pronto = self.leitor.esperar_linha(AVISO_PRONTO)
+                self.leitor.iniciar()
+                linha_pronto = self.leitor.aguardar(pronto, self.timeouts['PRONTO']).linha
+            else:
+                self.leitor.iniciar()
+            self.log_message(f"Arduino: {linha_pronto}")
+            self.negociar_protocolo(linha_pronto)
+
+            # Perfil salvo deste tabuleiro: dispensa o ciclo CALIBRAR
+            if self.calibration_data is None:
+                self.carregar_calibracao()
+
+            self.connected = True
+            self.connection_in_progress = False
+            self.metricas.incrementar('reconexoes' if self.ja_conectou else 'conexoes')
+            self.ja_conectou = True
+            self.log_message("Arduino conectado com sucesso!")
+            self.emitir('conexao', estado='conectado')
+            return True
+
+        except TimeoutError:
+            self.log_message("Timeout - Arduino não encontrado")
+            self.emitir('conexao', estado='falha')
+
+        except Exception as e:
+            self.log_message(f"Erro de conexão: {e}")
+            self.emitir('conexao', estado='erro')
+
+        self.metricas.incrementar('falhas_conexao')
+        self.connection_in_progress = False
+        return False
+
+    def negociar_protocolo(self, linha_pronto: str):
+        # Firmwares antigos só anunciam ARDUINO_PRONTO_3X3_REAL_V2 e ficam em ASCII
+        self.modo_protocolo = MODO_ASCII
+        self.leitor.definir_binario(False)
+        campos = linha_pronto.split()
+
+        # Firmwares novos anunciam as dimensões da matriz (ex.: DIM:8x8)
+        for campo in campos:
+            if campo.startswith("DIM:"):
+                try:
+                    linhas, colunas = (int(x) for x in campo[4:].split("x"))
+                    if (linhas, colunas) != (self.linhas, self.colunas):
+                        self.configurar_tamanho(linhas, colunas)
+                except ValueError as e:
+                    self.log_message(f"Dimensão anunciada inválida: {e}")
+
+        # ... e se aceitam IDs nos comandos (PROTO:ASCII,BIN1,CMDID)
+        protocolos = []
+        for campo in campos:
+            if campo.startswith("PROTO:"):
+                protocolos = campo[6:].split(",")
+        self.leitor.usar_ids = "CMDID" in protocolos
+        self.varredura_ajustavel = "SCAN" in protocolos
+
+        if MODO_BINARIO in protocolos:
+            try:
+                self.leitor.executar(f"MODO {MODO_BINARIO}", "MODO_OK", self.timeouts['MODO'])
+                self.modo_protocolo = MODO_BINARIO
+                self.leitor.definir_binario(True)
+            except (TimeoutError, ErroComando) as e:
+                self.log_message(f"Modo binário recusado: {e}")
+
+        self.log_message(f"Protocolo: {self.modo_protocolo} (IDs de comando: {'sim' if self.leitor.usar_ids else 'não'})")
+
+    def listar_portas(self) -> List:
+        self.log_message("Listando portas seriais...")
+        try:
+            portas = serial.tools.list_ports.comports()
+            if not portas:
+                self.log_message("Nenhuma porta serial encontrada")
+                return []
+
+            for i, porta in enumerate(portas):
+                self.log_message(f"{i+1}. {porta.device} - {porta.description}")
+                if parece_arduino(porta):
+                    self.log_message(f" Use: {porta.device}")
+            return portas
+
+        except Exception as e:
+            self.log_message(f"Erro ao listar portas: {e}")
+            return []
+
+    def fechar_porta(self):
+        if self.leitor:
+            self.leitor.parar()
+            self.leitor = None
+        if self.ser and self.ser.is_open:
+            self.ser.close()
+
+    def fechar(self):
+        self.parar_streaming()
+        self.fechar_porta()
+        self.desconectar_robo()
+        self.connected = False
+        if self.registro:
+            # Sem 'fim': a partida pode ser retomada na próxima execução
+            self.registro.fechar()
+            self.registro = None
+        self.parar_gravacao()
+
+    # ---- Calibração ----
+
+    def calibrar(self) -> bool:
+        try:
+            self.log_message("Comando CALIBRAR enviado")
+            self.leitor.executar("CALIBRAR", "CALIBRACAO_CONCLUIDA", self.timeouts['CALIBRAR'])
+
+            # Após calibração, coleta vários frames para o ajuste
+            self.processar_calibracao_automatica()
+            if self.calibration_data is not None:
+                self.salvar_calibracao()
+
+        except Exception as e:
+            self.log_message(f"Erro na calibração: {e}")
+
+        return self.calibration_data is not None
+
+    def processar_calibracao_automatica(self):
+        try:
+            self.log_message(f"Obtendo {self.amostras_calibracao} frames para calibração...")
+            frames = np.empty((self.amostras_calibracao, self.linhas, self.colunas))
+            for n in range(self.amostras_calibracao):
+                resposta = self.leitor.executar("LER", "LEITURA_CONCLUIDA", self.timeouts['LER'], quer_dados=True)
+                if resposta.dados is None:
+                    self.log_message("Leitura de calibração sem dados")
+                    return
+                frames[n] = resposta.dados
+            self.processar_calibracao_por_luminosidade(frames)
+
+        except Exception as e:
+            self.log_message(f"Erro no processamento: {e}")
+
+    def processar_calibracao_por_luminosidade(self, dados_calibracao):
+        # Aceita um frame (linhas, colunas) ou vários (n, linhas, colunas)
+        try:
+            frames = np.asarray(dados_calibracao, dtype=float).reshape(-1, self.linhas, self.colunas)
+
+            # Identifica automaticamente os 3 clusters de luminosidade (do mais escuro ao mais claro)
+            cluster_preto, cluster_branco, cluster_vazio = self.identificar_clusters_luminosidade(frames)
+
+            tipos = ('preto', 'branco', 'vazio')
+            cluster_stats = {
+                'preto': cluster_preto,
+                'branco': cluster_branco,
+                'vazio': cluster_vazio
+            }
+            self.calibration_data = CalibrationData(thresholds={}, cluster_stats=cluster_stats)
+
+            # Determina o mapeamento das linhas
+            self.mapear_linhas_automaticamente(frames.mean(axis=0))
+
+            # Cada casa mostra a peça da sua linha na calibração; isso dá o ganho do
+            # LDR da casa e o ruído de cada classe sem a diferença entre sensores
+            medias = np.array([cluster_stats[t]['media'] for t in tipos])
+            classes = np.repeat([[tipos.index(self.mapa_linhas[i])] for i in range(self.linhas)], self.colunas, axis=1)
+            ganhos, desvios = ganhos_por_casa(frames, classes, medias)
+            for tipo, desvio in zip(tipos, desvios):
+                cluster_stats[tipo]['desvio'] = float(desvio)
+
+            calibracao = CalibrationData(thresholds={}, cluster_stats=cluster_stats)
+            limiares = np.array([calibracao.thresholds['preto_branco'], calibracao.thresholds['branco_vazio']])
+            calibracao.limiares_casas = limiares[:, None, None] * ganhos[None]
+            self.calibration_data = calibracao
+
+            self.log_message(f"CALIBRAÇÃO CONCLUÍDA - Mistura gaussiana ({len(frames)} frames)")
+            self.log_message(f"Preto (faixa baixa): {cluster_preto['media']:.1f} ±{cluster_preto['desvio']:.1f} [{cluster_preto['min']:.1f}-{cluster_preto['max']:.1f}]")
+            self.log_message(f"Branco (faixa média): {cluster_branco['media']:.1f} ±{cluster_branco['desvio']:.1f} [{cluster_branco['min']:.1f}-{cluster_branco['max']:.1f}]")
+            self.log_message(f"Vazio (faixa alta): {cluster_vazio['media']:.1f} ±{cluster_vazio['desvio']:.1f} [{cluster_vazio['min']:.1f}-{cluster_vazio['max']:.1f}]")
+            self.log_message(f"Limiar Preto-Branco: {calibracao.thresholds['preto_branco']:.1f}")
+            self.log_message(f"Limiar Branco-Vazio: {calibracao.thresholds['branco_vazio']:.1f}")
+            self.log_message(f"Ganho dos LDRs por casa: {ganhos.min():.2f} a {ganhos.max():.2f}")
+
+            self.emitir('calibracao', calibrado=True)
+
+        except Exception as e:
+            self.log_message(f"Erro na calibração por luminosidade: {e}")
+
+    def identificar_clusters_luminosidade(self, valores):
+        # k-means seguido de mistura gaussiana sobre todas as leituras;
+        # não supõe a mesma quantidade de casas em cada grupo
+        return estatisticas_clusters(np.asarray(valores).ravel(), 3)
+
+    def mapear_linhas_automaticamente(self, dados_calibracao):
+        medias_linhas = dados_calibracao.mean(axis=1)
+
+        # Cada linha recebe o cluster de média mais próxima
+        # (no 3x3 equivale a ordenar: mais escura PRETO, intermediária BRANCO, mais clara VAZIO)
+        tipos = ['preto', 'branco', 'vazio']
+        medias_clusters = np.array([self.calibration_data.cluster_stats[t]['media'] for t in tipos])
+        mais_proximo = np.abs(medias_linhas[:, None] - medias_clusters[None, :]).argmin(axis=1)
+
+        self.mapa_linhas = {i: tipos[k] for i, k in enumerate(mais_proximo)}
+        linhas_ordenadas = sorted(enumerate(medias_linhas), key=lambda x: x[1])
+
+        self.log_message("Mapeamento automático de linhas:")
+        for linha_ordenada, media in linhas_ordenadas:
+            tipo = self.mapa_linhas[linha_ordenada]
+            self.log_message(f"  Linha física {linha_ordenada}: {tipo} (média: {media:.1f})")
+
+    def id_tabuleiro(self) -> str:
+        # Número de série USB quando existir; senão a própria porta/endereço
+        try:
+            for porta in serial.tools.list_ports.comports():
+                if porta.device == self.arduino_port and porta.serial_number:
+                    return f"{porta.serial_number}_{self.linhas}x{self.colunas}"
+        except Exception:
+            pass
+        return f"{self.arduino_port}_{self.linhas}x{self.colunas}"
+
+    def salvar_calibracao(self):
+        try:
+            perfil = {
+                'linhas': self.linhas,
+                'colunas': self.colunas,
+                'calibracao': self.calibration_data.para_dict(),
+                'mapa_linhas': self.mapa_linhas,
+            }
+            caminho = salvar_perfil(self.id_tabuleiro(), perfil, self.diretorio_perfis)
+            self.log_message(f"Perfil de calibração salvo em {caminho}")
+            self.anotar_calibracao_gravacao()
+        except Exception as e:
+            self.log_message(f"Erro ao salvar perfil de calibração: {e}")
+
+    def carregar_calibracao(self) -> bool:
+        try:
+            perfil = carregar_perfil(self.id_tabuleiro(), self.diretorio_perfis)
+            if perfil is None:
+                return False
+            if (perfil['linhas'], perfil['colunas']) != (self.linhas, self.colunas):
+                self.log_message("Perfil de calibração com dimensões diferentes; ignorado")
+                return False
+
+            self.calibration_data = CalibrationData.de_dict(perfil['calibracao'])
+            mapa = perfil.get('mapa_linhas')
+            self.mapa_linhas = {int(i): tipo for i, tipo in mapa.items()} if mapa else None
+
+            thresholds = self.calibration_data.thresholds
+            self.log_message(f"Calibração carregada do perfil {perfil['id']} "
+                             f"(limiares {thresholds['preto_branco']:.1f} / {thresholds['branco_vazio']:.1f})")
+            self.emitir('calibracao', calibrado=True)
+            self.anotar_calibracao_gravacao()
+            return True
+
+        except Exception as e:
+            self.log_message(f"Erro ao carregar perfil de calibração: {e}")
+            return False
+
+    # ---- Partida ----
+
+    def iniciar_registro(self, retomar: bool = True) -> bool:
+        # Com retomar, continua a última partida não encerrada deste tabuleiro:
+        # devolve True se o estado foi restaurado dela
+        if self.registro:
+            self.registro.fechar()
+            self.registro = None
+
+        caminho = ultima_partida(self.id_tabuleiro(), self.diretorio_partidas) if retomar else None
+        partida = ler_partida(caminho) if caminho else None
+        if partida is None or partida.encerrada or \
+                (partida.cabecalho['linhas'], partida.cabecalho['colunas']) != (self.linhas, self.colunas):
+            self.nova_partida()
+            return False
+
+        if partida.linhas_descartadas:
+            self.log_message(f"Registro da partida com final corrompido; {partida.linhas_descartadas} linha(s) descartada(s)")
+            truncar_partida(partida)
+
+        self.pecas_tabuleiro = [linha[:] for linha in partida.pecas]
+        self.vez_das_brancas = partida.vez_das_brancas
+        self.salvar_estado_atual()
+        # Reaplicar os lances recupera direitos de roque e en passant
+        self.posicao_jogo = partida.posicao() if self.validar_regras else None
+        self.registro = RegistroPartida(partida.caminho, lances=len(partida.lances))
+
+        self.log_message(f"Partida retomada de {partida.caminho}: {len(partida.lances)} lances, "
+                         f"vez das {'brancas' if self.vez_das_brancas else 'pretas'}")
+        self.emitir_estado()
+        return True
+
+    def nova_partida(self, resultado: str = '*'):
+        # Encerra a partida em andamento e começa outra a partir do estado atual
+        if self.registro:
+            self.registro.encerrar(resultado)
+        caminho = arquivo_partida(self.id_tabuleiro(), self.diretorio_partidas)
+        self.registro = RegistroPartida.nova(caminho, self.linhas, self.colunas, self.pecas_tabuleiro,
+                                             self.vez_das_brancas, self.id_tabuleiro())
+        self.log_message(f"Registrando partida em {caminho}")
+
+    # ---- Gravação de frames ----
+
+    def gravar_frames(self, diretorio: str, frames_por_segmento: int = 4096):
+        self.parar_gravacao()
+        self.gravador = GravadorFrames(diretorio, self.linhas, self.colunas, frames_por_segmento)
+        self.anotar_calibracao_gravacao()
+        if self.leitor:
+            self.leitor.gravador = self.gravador
+        self.log_message(f"Gravando frames em {diretorio}")
+
+    def parar_gravacao(self):
+        if not self.gravador:
+            return
+        if self.leitor:
+            self.leitor.gravador = None
+        self.gravador.fechar()
+        self.log_message(f"Gravação encerrada: {self.gravador.gravados} frames em {self.gravador.diretorio}")
+        self.gravador = None
+
+    def anotar_calibracao_gravacao(self):
+        # A reprodução pode usar a mesma calibração da sessão em vez de recalibrar
+        if self.gravador and self.calibration_data:
+            self.gravador.atualizar_meta(calibracao=self.calibration_data.para_dict(), mapa_linhas=self.mapa_linhas)
+
+    # ---- Leitura ----
+
+    def ler_tabuleiro(self) -> bool:
+        self.log_message("Solicitando leitura...")
+        try:
+            resposta = self.leitor.executar("LER", "LEITURA_CONCLUIDA", self.timeouts['LER'], quer_dados=True)
+            if resposta.dados is None:
+                self.log_message("TIMEOUT: Dados incompletos recebidos")
+                return False
+
+            self.log_message(f"Arduino: DADOS {resposta.dados.ravel().tolist()}")
+            self.log_message("Leitura concluída")
+            return self.processar_dados_completos(resposta.dados, filtrar=False)
+
+        except TimeoutError:
+            self.log_message("TIMEOUT: Dados incompletos recebidos")
+        except Exception as e:
+            self.log_message(f"ERRO NA LEITURA: {e}")
+
+        return False
+
+    def iniciar_streaming(self, max_fps: Optional[float] = None, consumir: bool = True):
+        # consumir=False: quem chama processa os frames com processar_frame_pendente
+        if self.streaming:
+            return
+        if max_fps is not None:
+            self.max_fps = max(1.0, max_fps)
+
+        self.leitor.max_fps = self.max_fps
+        self.leitor.limpar_frames()
+        try:
+            self.leitor.executar(f"STREAM_ON {int(self.max_fps)}", "STREAM_INICIADO", self.timeouts['STREAM'])
+        except Exception as e:
+            self.log_message(f"Erro ao iniciar streaming: {e}")
+            return
+
+        self.streaming = True
+        self.streaming_consumir = consumir
+        self.log_message(f"Streaming iniciado ({self.max_fps:.0f} frames/s)")
+        self.emitir('streaming', ativo=True)
+
+        if self.controle_varredura:
+            # Sobra de um streaming interrompido por queda: a placa já voltou ao padrão
+            self.controle_varredura.parar(restaurar=False)
+            self.controle_varredura = None
+        if self.varredura_adaptativa and self.varredura_ajustavel:
+            self.controle_varredura = ControladorVarredura(self)
+            self.controle_varredura.iniciar()
+
+        if consumir:
+            threading.Thread(target=self.consumir_frames, daemon=True).start()
+
+    def parar_streaming(self):
+        if not self.streaming:
+            return
+
+        self.streaming = False
+        try:
+            self.leitor.executar("STREAM_OFF", "STREAM_PARADO", self.timeouts['STREAM'])
+        except Exception as e:
+            self.log_message(f"Erro ao parar streaming: {e}")
+
+        if self.controle_varredura:
+            # LER e CALIBRAR voltam a usar a varredura padrão do firmware
+            self.controle_varredura.parar()
+            self.controle_varredura = None
+
+        if self.leitor:
+            stats = self.leitor.estatisticas()
+            self.log_message(f"Streaming parado - recebidos: {stats['recebidos']}, "
+                             f"descartados: {stats['descartados']}")
+
+        self.emitir('streaming', ativo=False)
+
+    def consumir_frames(self):
+        leitor = self.leitor
+        while self.streaming and leitor.ativo:
+            frame = leitor.proximo_frame(timeout=0.5)
+            if frame is None:
+                continue
+
+            sequencia, timestamp, matriz = frame
+            self.processar_dados_completos(matriz, sequencia)
+
+        if self.streaming:
+            self.log_message("Leitor de streaming encerrado")
+            self.streaming = False
+            self.emitir('streaming', ativo=False)
+
+    def processar_frame_pendente(self) -> Optional[float]:
+        # Processa o frame mais recente, se houver; devolve a latência desde a chegada (s)
+        if not self.leitor:
+            return None
+        frame = self.leitor.retirar_frame()
+        if frame is None:
+            return None
+
+        sequencia, timestamp, matriz = frame
+        self.processar_dados_completos(matriz, sequencia)
+        return time.time() - timestamp
+
+    def estatisticas_streaming(self) -> Optional[dict]:
+        if not self.leitor:
+            return None
+        stats = self.leitor.estatisticas()
+        if self.filtro:
+            stats['filtro'] = self.filtro.estatisticas()
+        if self.rastreador:
+            stats['hmm'] = self.rastreador.estatisticas()
+        if self.controle_varredura:
+            stats['varredura'] = self.controle_varredura.estatisticas()
+        return stats
+
+    def obter_rastreador(self) -> Optional[RastreadorHMM]:
+        if self.modo_inferencia != INFERENCIA_HMM or not self.calibration_data:
+            return None
+        if self.rastreador is not None and self.calibracao_do_rastreador is self.calibration_data \
+                and self.rastreador.tabela is self.tabela:
+            return self.rastreador
+
+        # O ganho de cada LDR é a razão entre o limiar da casa e o limiar global
+        ganhos = None
+        limiares_casas = self.calibration_data.limiares_casas
+        if limiares_casas is not None and limiares_casas.shape[1:] == (self.linhas, self.colunas):
+            ganhos = limiares_casas[0] / self.calibration_data.thresholds['preto_branco']
+
+        modelo = ModeloSensores(self.calibration_data.cluster_stats, ganhos)
+        self.rastreador = RastreadorHMM(self.tabela, modelo, **self.parametros_hmm)
+        self.calibracao_do_rastreador = self.calibration_data
+        return self.rastreador
+
+    def obter_filtro(self) -> Optional[FiltroTemporal]:
+        if not self.usar_filtro or not self.calibration_data:
+            return None
+        if self.filtro is not None and self.calibracao_do_filtro is self.calibration_data \
+                and self.filtro.suavizado.shape == (self.linhas, self.colunas):
+            return self.filtro
+
+        thresholds = self.calibration_data.thresholds
+        limiares_globais = np.array([thresholds['preto_branco'], thresholds['branco_vazio']])
+        centros = np.array([thresholds['cluster_preto'], thresholds['cluster_branco'], thresholds['cluster_vazio']])
+        folga = np.minimum(limiares_globais - centros[:2], centros[1:] - limiares_globais)
+
+        parametros = dict(self.parametros_filtro)
+        limiares = limiares_globais
+        bandas = parametros.pop('histerese') * folga
+
+        # Com limiares por casa, a banda acompanha o ganho do LDR de cada casa
+        limiares_casas = self.calibration_data.limiares_casas
+        if limiares_casas is not None and limiares_casas.shape[1:] == (self.linhas, self.colunas):
+            limiares = limiares_casas
+            bandas = bandas[:, None, None] * (limiares_casas / limiares_globais[:, None, None])
+
+        self.filtro = FiltroTemporal(limiares, bandas, self.linhas, self.colunas, **parametros)
+        self.calibracao_do_filtro = self.calibration_data
+        return self.filtro
+
+    # ---- Movimentos ----
+
+    def processar_dados_completos(self, matriz: np.ndarray, sequencia: Optional[int] = None, filtrar: bool = True):
+        # filtrar=False para leituras avulsas (LER), que já vêm com a média do firmware
+        try:
+            inicio = time.perf_counter()
+            t_classificacao = t_inferencia = inicio
+            novo_estado = None
+            confianca = None
+
+            # A matriz vem do buffer do parser, que é reutilizado
+            if self.dados_matriz is None or self.dados_matriz.shape != matriz.shape:
+                self.dados_matriz = np.zeros(matriz.shape, dtype=int)
+            np.copyto(self.dados_matriz, matriz)
+
+            # Classifica as casas
+            if self.calibration_data:
+                rastreador = self.obter_rastreador() if filtrar else None
+                filtro = self.obter_filtro() if filtrar and not rastreador else None
+                if rastreador:
+                    # A crença sobre os lances legais é atualizada com a leitura bruta
+                    self.dados_classificados = self.classificar_matriz(self.dados_matriz)
+                    resultado = rastreador.atualizar(self.dados_matriz, self.codigo_anterior, self.vez_das_brancas,
+                                                     self.obter_posicao())
+                    if resultado:
+                        movimentos, confianca = resultado
+                        movimento = self.escolher_lance(movimentos)
+                        if movimento:
+                            novo_estado = self.aplicar_movimento(movimento)
+                    avaliar = False
+                elif filtro:
+                    # Só um estado estável por K frames segue para a detecção de movimento
+                    faixas, confirmado = filtro.atualizar(self.dados_matriz)
+                    self.dados_classificados = CLASSE_POR_FAIXA[faixas].astype(np.int8)
+                    avaliar = confirmado and not np.array_equal(self.dados_classificados, self.categorias_anteriores)
+                else:
+                    self.dados_classificados = self.classificar_matriz(self.dados_matriz)
+                    avaliar = True
+                t_classificacao = t_inferencia = time.perf_counter()
+
+                if avaliar:
+                    # Aplica a lógica Markoviana para detectar movimento
+                    novo_estado = self.aplicar_logica_markoviana(self.dados_classificados)
+                    t_inferencia = time.perf_counter()
+                    if not novo_estado and (filtro or not filtrar):
+                        # Com o filtro só chega aqui uma mudança estável; sem ele, seria a cada frame
+                        self.log_message("Nenhum movimento válido detectado")
+
+                if novo_estado:
+                    lance = self.ultimo_lance
+                    estado_antes = self.estado_anterior
+                    if self.posicao_jogo is not None and isinstance(lance, Lance):
+                        self.posicao_jogo.jogar(lance)
+                    self.pecas_tabuleiro = novo_estado
+                    self.salvar_estado_atual()
+                    self.vez_das_brancas = not self.vez_das_brancas
+                    self.metricas.incrementar('lances')
+                    texto_confianca = f" (confiança {confianca:.3f})" if confianca is not None else ""
+                    self.log_message(f"Movimento detectado{texto_confianca} - turno alternado para {'BRANCAS' if self.vez_das_brancas else 'PRETAS'}")
+                    self.emitir('movimento', pecas=self.pecas_tabuleiro, vez_das_brancas=self.vez_das_brancas,
+                                confianca=confianca, lance=lance)
+                    if self.registro:
+                        self.registro.registrar_lance(lance, estado_antes, self.pecas_tabuleiro, self.vez_das_brancas,
+                                                      confianca, self.dados_matriz.copy())
+
+            if not filtrar:
+                # No streaming o registro por frame fica no logger.debug("Frame processado")
+                self.log_message("Dados processados com sucesso")
+            self.emitir('frame', matriz=self.dados_matriz, classificacao=self.dados_classificados)
+            self.emitir_estado()
+
+            fim = time.perf_counter()
+            metricas = self.metricas
+            if metricas.ativo:
+                metricas.observar('classificacao', t_classificacao - inicio)
+                if t_inferencia > t_classificacao:
+                    metricas.observar('inferencia', t_inferencia - t_classificacao)
+                metricas.observar('frame_total', fim - inicio)
+            self.logger.debug("Frame processado", extra={'campos': {
+                'sequencia': sequencia,
+                'classificacao_ms': (t_classificacao - inicio) * 1000,
+                'inferencia_ms': (t_inferencia - t_classificacao) * 1000,
+                'total_ms': (fim - inicio) * 1000,
+                'movimento': bool(novo_estado),
+                'confianca': confianca,
+            }})
+            return True
+
+        except Exception as e:
+            self.log_message(f"Erro ao processar dados completos: {e}")
+            return False
+
+    def classificacao_para_estado_basico(self, classificacao: np.ndarray) -> List[List[str]]:
+        # 'B' = branco genérico, 'p' = preto genérico
+        return MARCADORES_BASICOS[classificacao].tolist()
+
+    def aplicar_logica_markoviana(self, classificacao: np.ndarray) -> Optional[List[List[str]]]:
+        if self.estado_anterior is None:
+            return self.classificacao_para_estado_basico(classificacao)
+
+        # Só considera diferença se houve mudança de categoria (não apenas flutuação dentro da mesma categoria)
+        observado = self.tabela.codificar(classificacao)
+        if observado == self.codigo_anterior:
+            return None  # Sem movimento
+
+        # Lances do lado que joga que levam da posição anterior à observada
+        posicao = self.obter_posicao()
+        movimentos = self.tabela.explicar(self.codigo_anterior, observado, self.vez_das_brancas, posicao)
+        movimento = self.escolher_lance(movimentos)
+        if movimento:
+            return self.aplicar_movimento(movimento)
+
+        self.registrar_diferencas(classificacao)
+        if movimentos:
+            self.metricas.incrementar('lances_ambiguos')
+            self.log_message(f"Movimento ambíguo: {len(movimentos)} lances explicam a leitura")
+        elif posicao and self.tabela.explicar(self.codigo_anterior, observado, self.vez_das_brancas):
+            self.metricas.incrementar('lances_ilegais')
+            self.log_message("Lance ilegal: a peça não pode ir para essa casa"
+                             f"{' (rei em xeque)' if posicao.em_xeque() else ''}")
+        elif self.tabela.explicar(self.codigo_anterior, observado, not self.vez_das_brancas):
+            self.metricas.incrementar('turno_errado')
+            self.log_message(f"Movimento de peça errada no turno das {'brancas' if self.vez_das_brancas else 'pretas'}")
+        else:
+            alteradas = self.tabela.casas_alteradas(self.codigo_anterior, observado)
+            self.metricas.incrementar('padroes_invalidos')
+            self.log_message(f"Padrão não reconhecido: {alteradas} casas alteradas")
+            self.log_message("Padrão de movimento inválido detectado")
+        return None
+
+    def registrar_diferencas(self, classificacao: np.ndarray):
+        # Só para diagnóstico, quando a leitura não corresponde a nenhum lance
+        diferencas = np.argwhere(self.categorias_anteriores != classificacao)
+        self.log_message(f"Diferenças detectadas: {len(diferencas)}")
+        for i, j in diferencas:
+            anterior = self.estado_anterior[i][j]
+            atual = MARCADORES_BASICOS[classificacao[i, j]]
+            self.log_message(f"  [{i},{j}] '{anterior}'->'{CATEGORIAS[self.categorias_anteriores[i, j]]}' -> "
+                             f"'{atual}'->'{CATEGORIAS[classificacao[i, j]]}'")
+
+    def obter_posicao(self) -> Optional[Posicao]:
+        if not self.validar_regras or self.estado_anterior is None:
+            return None
+        vez = 0 if self.vez_das_brancas else 1
+        casas = [peca for linha in self.estado_anterior for peca in linha]
+        if self.posicao_jogo is not None and self.posicao_jogo.vez == vez and self.posicao_jogo.casas == casas:
+            return self.posicao_jogo
+
+        try:
+            self.posicao_jogo = Posicao.de_matriz(self.estado_anterior, self.vez_das_brancas)
+        except KeyError:
+            # Peça fora da variante (estado genérico): segue só com a ocupação
+            self.posicao_jogo = None
+        return self.posicao_jogo
+
+    def escolher_lance(self, movimentos: tuple) -> Optional[Union[Lance, Movimento]]:
+        # Vários lances com a mesma origem e destino só diferem na promoção, que os
+        # sensores não veem: fica o primeiro (dama)
+        if movimentos and all((m.origem, m.destino) == (movimentos[0].origem, movimentos[0].destino)
+                              for m in movimentos):
+            return movimentos[0]
+        return None
+
+    def aplicar_movimento(self, movimento: Union[Lance, Movimento]) -> List[List[str]]:
+        self.ultimo_lance = movimento
+        origem = divmod(movimento.origem, self.colunas)
+        destino = divmod(movimento.destino, self.colunas)
+        texto_origem = nome_casa(origem[0], origem[1], self.linhas, self.colunas)
+        texto_destino = nome_casa(destino[0], destino[1], self.linhas, self.colunas)
+
+        # Com regras, a posição do jogo calcula o resultado (move a torre no roque,
+        # tira o peão no en passant, promove); ela só avança quando o lance é confirmado
+        if isinstance(movimento, Lance) and self.posicao_jogo is not None:
+            especial = movimento.especial
+            casa_captura = divmod(self.posicao_jogo.casa_captura(movimento), self.colunas)
+            anterior = self.posicao_jogo.jogar(movimento)
+            novo_estado = self.posicao_jogo.para_matriz()
+            self.posicao_jogo.desfazer(movimento, anterior)
+
+            if especial in (ROQUE_GRANDE, ROQUE_PEQUENO):
+                self.log_message(f"Roque {'grande' if especial == ROQUE_GRANDE else 'pequeno'}: {movimento.peca} de {texto_origem} para {texto_destino}")
+            elif movimento.captura:
+                casa = nome_casa(casa_captura[0], casa_captura[1], self.linhas, self.colunas)
+                sufixo = " (en passant)" if especial == EN_PASSANT else ""
+                self.log_message(f"Captura: {movimento.peca} capturou {movimento.captura} em {casa}{sufixo}")
+            else:
+                self.log_message(f"Movimento simples: {movimento.peca} de {texto_origem} para {texto_destino}")
+            if movimento.promocao:
+                self.log_message(f"Promoção: {movimento.peca} virou {movimento.promocao} em {texto_destino}")
+            return novo_estado
+
+        # Cria novo estado mantendo a identidade da peça
+        novo_estado = [linha[:] for linha in self.estado_anterior]
+        peca_movida = self.estado_anterior[origem[0]][origem[1]]
+        peca_capturada = self.estado_anterior[destino[0]][destino[1]]
+        novo_estado[origem[0]][origem[1]] = '·'
+        novo_estado[destino[0]][destino[1]] = peca_movida
+
+        if movimento.captura:
+            self.log_message(f"Captura: {peca_movida} capturou {peca_capturada} em {texto_destino}")
+        else:
+            self.log_message(f"Movimento simples: {peca_movida} de {texto_origem} para {texto_destino}")
+        return novo_estado
+
+    def obter_categoria_peca(self, peca: str) -> str:
+        # Maiúsculas são brancas e minúsculas pretas (A/a no 3x3, RNBQKP/rnbqkp no 8x8)
+        if peca == '·':
+            return 'vazio'
+        elif peca.isupper():
+            return 'branco'
+        elif peca.islower():
+            return 'preto'
+        else:
+            return 'desconhecido'
+
+    # ---- Comandos ----
+
+    def resetar(self) -> bool:
+        try:
+            self.log_message("Resetando sistema...")
+
+            self.calibration_data = None
+            self.dados_matriz = None
+            self.mapa_linhas = None
+            self.pecas_tabuleiro = self.get_posicao_inicial_pecas()
+            self.salvar_estado_atual()
+            self.vez_das_brancas = True
+            if self.registro:
+                self.nova_partida()
+            self.emitir('calibracao', calibrado=False)
+
+            self.leitor.executar("RESET", "RESET_CONCLUIDO", self.timeouts['RESET'])
+            self.log_message("Sistema resetado")
+            self.emitir_estado()
+            return True
+
+        except Exception as e:
+            self.log_message(f"Erro no reset: {e}")
+
+        return False
+
+    def testar_comunicacao(self) -> Optional[str]:
+        try:
+            self.log_message("Testando comunicação...")
+            inicio = time.perf_counter()
+            resposta = self.leitor.executar("TEST", "TESTE_OK", self.timeouts['TEST'])
+            self.log_message(f"Resposta: {resposta.linha} ({(time.perf_counter() - inicio) * 1000:.1f} ms)")
+            return resposta.linha
+
+        except Exception as e:
+            self.log_message(f"Erro no teste: {e}")
+
+        return None
+
+    # ---- Robô ----
+
+    def conectar_robo(self, porta: str, ser=None) -> bool:
+        self.desconectar_robo()
+        try:
+            self.robo_ser = ser or abrir_transporte(porta, BAUD_ROBO, timeout=0.5)
+        except Exception as e:
+            self.log_message(f"Erro ao abrir a porta do robô {porta}: {e}")
+            return False
+        self.robo = LeitorSerial(self.robo_ser, ao_receber_linha=lambda l: self.log_message(f"Robô: {l}"))
+        self.robo.iniciar()
+        if ser is None:
+            time.sleep(ESPERA_BOOT_ROBO)
+        self.log_message(f"Robô conectado em {porta}")
+        return True
+
+    def desconectar_robo(self):
+        if self.robo:
+            self.robo.parar()
+            self.robo = None
+        if self.robo_ser and self.robo_ser.is_open:
+            self.robo_ser.close()
+        self.robo_ser = None
+
+    def mover_robo(self, origem: int, destino: int, promocao: str = '') -> Lance:
+        # Carrega no braço um lance legal do lado da vez (casas k = i*colunas + j).
+        # O braço executa quando o botão dele é apertado, e o lance entra no jogo
+        # pela leitura do tabuleiro, como qualquer outro.
+        if self.robo is None:
+            raise ErroComando("Robô não conectado")
+        posicao = self.obter_posicao()
+        if posicao is None:
+            raise ValueError("O robô precisa das regras de movimento (validar_regras) e de um estado conhecido")
+
+        candidatos = [l for l in posicao.lances_legais() if l.origem == origem and l.destino == destino
+                      and (not promocao or l.promocao.upper() == promocao.upper())]
+        texto = (f"{nome_casa(*divmod(origem, self.colunas), self.linhas, self.colunas)}-"
+                 f"{nome_casa(*divmod(destino, self.colunas), self.linhas, self.colunas)}")
+        if not candidatos:
+            raise ValueError(f"Lance ilegal para o robô: {texto}")
+
+        lance = candidatos[0]
+        self.robo.executar(comando_robo(lance, posicao), "MOVER_OK", self.timeouts['MOVER'])
+        self.log_message(f"Robô: lance {lance.peca} {texto} carregado; aperte o botão do braço para executar")
+        return lance
+
+    def debug_sistema(self):
+        self.log_message("DEBUG DO SISTEMA:")
+        self.log_message(f"   Conectado: {self.connected}")
+        self.log_message(f"   Tabuleiro: {self.linhas}x{self.colunas}")
+        self.log_message(f"   Streaming: {self.streaming}")
+        self.log_message(f"   Protocolo: {self.modo_protocolo}")
+        if self.leitor:
+            self.log_message(f"   Leitor: {self.leitor.estatisticas()}")
+        self.log_message(f"   Calibração: {self.calibration_data is not None}")
+        for nome, resumo in self.metricas.instantaneo()['histogramas'].items():
+            self.log_message(f"   Tempo {nome}: n={resumo['n']} p50={resumo['p50_ms']:.3f} ms p99={resumo['p99_ms']:.3f} ms")
+        if self.metricas.contadores:
+            self.log_message(f"   Contadores: {self.metricas.contadores}")
+        self.log_message(f"   Dados matriz: {self.dados_matriz is not None}")
+        self.log_message(f"   Mapa linhas: {self.mapa_linhas}")
+        self.log_message(f"   Vez das brancas: {self.vez_das_brancas}")
+        self.log_message(f"   Estado atual das peças:")
+        for i, linha in enumerate(self.pecas_tabuleiro):
+            self.log_message(f"     Linha {i}: {linha}")
+        if self.estado_anterior:
+            self.log_message(f"   Estado anterior:")
+            for i, linha in enumerate(self.estado_anterior):
+                self.log_message(f"     Linha {i}: {linha}")
+
+
+def ler_lances_robo(engine: BoardEngine):
+    # Um lance por linha no terminal: origem e destino ("e7e5", "e7-e5", "A3 B2"),
+    # com a peça da promoção opcional no fim ("e7e8q")
+    while True:
+        try:
+            texto = input().strip()
+        except EOFError:
+            return
+        if not texto:
+            continue
+        lance = re.fullmatch(r'([A-Za-z]\d+)[\s-]*([A-Za-z]\d+)=?([QRBNqrbn]?)', texto)
+        try:
+            if lance is None:
+                raise ValueError(f"Lance inválido: {texto!r} (ex.: e7e5)")
+            origem, destino = (casa_de_nome(casa, engine.linhas, engine.colunas) for casa in lance.group(1, 2))
+            engine.mover_robo(origem, destino, lance.group(3))
+        except (ValueError, TimeoutError, ErroComando) as e:
+            engine.log_message(f"Robô: {e}")
+
+
+def main():
+    # Execução sem interface gráfica: conecta, calibra (opcional) e faz streaming,
+    # imprimindo os eventos no terminal.
+    parser = argparse.ArgumentParser(description="Motor do tabuleiro sem interface gráfica")
+    parser.add_argument("--porta", default="COM6", help="porta serial, tcp://host:porta ou sim://3x3?ruido=5")
+    parser.add_argument("--linhas", type=int, default=3)
+    parser.add_argument("--colunas", type=int, default=3)
+    parser.add_argument("--calibrar", action="store_true")
+    parser.add_argument("--fps", type=float, default=10.0)
+    parser.add_argument("--hmm", action="store_true", help="rastreador HMM em vez do filtro temporal")
+    parser.add_argument("--registrar", action="store_true", help="grava os lances em partidas/ e retoma a última partida")
+    parser.add_argument("--gravar", metavar="DIRETORIO", help="grava os frames brutos da sessão (ver reproducao.py)")
+    parser.add_argument("--varredura-adaptativa", action="store_true",
+                        help="ajusta amostras e tempos da varredura do firmware durante o streaming")
+    parser.add_argument("--metricas-porta", type=int, help="expõe /metrics (Prometheus) nesta porta local")
+    parser.add_argument("--robo", metavar="PORTA", help="porta do braço robótico; lances digitados (ex.: e7e5) vão para ele")
+    args = parser.parse_args()
+
+    configurar_logging(console=True)
+    engine = BoardEngine(args.linhas, args.colunas, porta=args.porta)
+    if args.hmm:
+        engine.modo_inferencia = INFERENCIA_HMM
+    engine.varredura_adaptativa = args.varredura_adaptativa
+
+    servidor_metricas = ServidorMetricas(lambda: [engine.metricas], args.metricas_porta) if args.metricas_porta else None
+    if args.gravar:
+        engine.gravar_frames(args.gravar)
+    if not engine.conectar():
+        return
+    if args.calibrar:
+        engine.calibrar()
+    if args.registrar:
+        engine.iniciar_registro()
+
+    if args.robo and engine.conectar_robo(args.robo):
+        threading.Thread(target=ler_lances_robo, args=(engine,), daemon=True).start()
+
+    engine.iniciar_streaming(args.fps)
+    try:
+        while engine.streaming:
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.fechar()
+        if servidor_metricas:
+            servidor_metricas.encerrar()
+        encerrar_logging()
+
+
+if __name__ == "__main__":
+    main()
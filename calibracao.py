@@ -0,0 +1,146 @@
+import json
+import os
+import re
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# Desvio mínimo (em unidades do ADC) para um cluster não colapsar quando o ruído é zero
+DESVIO_MINIMO = 1.0
+# Limite do ganho estimado por casa; fora disso a leitura é tratada como defeito
+GANHO_MINIMO, GANHO_MAXIMO = 0.5, 2.0
+
+
+def centros_iniciais(valores: np.ndarray, k: int = 3) -> np.ndarray:
+    # Em 1D os clusters ficam separados pelos maiores saltos entre valores
+    # ordenados, qualquer que seja a quantidade de peças de cada cor
+    ordenados = np.sort(valores)
+    cortes = np.sort(np.argsort(np.diff(ordenados))[-(k - 1):]) + 1
+    return np.array([grupo.mean() for grupo in np.split(ordenados, cortes)])
+
+
+def kmeans_1d(valores: np.ndarray, k: int = 3, iteracoes: int = 100) -> Tuple[np.ndarray, np.ndarray]:
+    valores = np.asarray(valores, dtype=float).ravel()
+    centros = centros_iniciais(valores, k)
+
+    for _ in range(iteracoes):
+        rotulos = np.abs(valores[:, None] - centros[None, :]).argmin(axis=1)
+        somas = np.bincount(rotulos, weights=valores, minlength=k)
+        contagens = np.bincount(rotulos, minlength=k)
+        novos = np.where(contagens > 0, somas / np.maximum(contagens, 1), centros)
+        if np.allclose(novos, centros):
+            break
+        centros = novos
+
+    ordem = np.argsort(centros)
+    rotulos = np.argsort(ordem)[rotulos]
+    return centros[ordem], rotulos
+
+
+def ajustar_gmm_1d(valores: np.ndarray, k: int = 3, iteracoes: int = 100,
+                   tolerancia: float = 1e-6) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Mistura de gaussianas por EM, começando do k-means; devolve (médias, desvios, pesos)
+    # em ordem crescente de média
+    valores = np.asarray(valores, dtype=float).ravel()
+    medias, rotulos = kmeans_1d(valores, k)
+    desvios = np.array([valores[rotulos == c].std() if np.any(rotulos == c) else DESVIO_MINIMO
+                        for c in range(k)])
+    desvios = np.maximum(desvios, DESVIO_MINIMO)
+    pesos = np.bincount(rotulos, minlength=k) / len(valores)
+
+    anterior = -np.inf
+    for _ in range(iteracoes):
+        # Passo E em log para não perder precisão com clusters bem separados
+        z = (valores[:, None] - medias[None, :]) / desvios[None, :]
+        log_p = np.log(np.maximum(pesos, 1e-12)) - np.log(desvios) - 0.5 * z ** 2
+        maximo = log_p.max(axis=1, keepdims=True)
+        soma = np.exp(log_p - maximo).sum(axis=1, keepdims=True)
+        responsabilidades = np.exp(log_p - maximo) / soma
+        verossimilhanca = float((maximo + np.log(soma)).sum())
+
+        # Passo M
+        n = responsabilidades.sum(axis=0) + 1e-12
+        medias = (responsabilidades * valores[:, None]).sum(axis=0) / n
+        desvios = np.sqrt((responsabilidades * (valores[:, None] - medias[None, :]) ** 2).sum(axis=0) / n)
+        desvios = np.maximum(desvios, DESVIO_MINIMO)
+        pesos = n / len(valores)
+
+        if verossimilhanca - anterior < tolerancia * abs(verossimilhanca):
+            break
+        anterior = verossimilhanca
+
+    ordem = np.argsort(medias)
+    return medias[ordem], desvios[ordem], pesos[ordem]
+
+
+def estatisticas_clusters(valores: np.ndarray, k: int = 3) -> List[dict]:
+    valores = np.asarray(valores, dtype=float).ravel()
+    if len(np.unique(valores)) < k:
+        raise ValueError(f"Leituras insuficientes para {k} clusters: verifique a posição das peças")
+
+    medias, desvios, pesos = ajustar_gmm_1d(valores, k)
+    rotulos = np.abs((valores[:, None] - medias[None, :]) / desvios[None, :]).argmin(axis=1)
+
+    clusters = []
+    for c in range(k):
+        grupo = valores[rotulos == c]
+        clusters.append({
+            'media': float(medias[c]),
+            'desvio': float(desvios[c]),
+            'peso': float(pesos[c]),
+            'min': float(grupo.min()) if len(grupo) else float(medias[c]),
+            'max': float(grupo.max()) if len(grupo) else float(medias[c]),
+            'n': int(len(grupo)),
+        })
+    return clusters
+
+
+def limiar_entre(media_a: float, desvio_a: float, media_b: float, desvio_b: float) -> float:
+    # Ponto com o mesmo z-score para os dois clusters; sem desvios, o ponto médio
+    if desvio_a + desvio_b <= 0:
+        return (media_a + media_b) / 2
+    return (media_a * desvio_b + media_b * desvio_a) / (desvio_a + desvio_b)
+
+
+def ganhos_por_casa(frames: np.ndarray, classes: np.ndarray,
+                    medias: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # Cada LDR tem sua própria sensibilidade. A média de cada casa nos frames de
+    # calibração, dividida pelo centro da classe que ela mostrava, dá o ganho da
+    # casa. Devolve (ganhos (linhas, colunas), desvio de cada classe já sem o
+    # efeito dos ganhos, isto é, só o ruído de leitura).
+    frames = frames.reshape(-1, *frames.shape[-2:])
+    ganhos = np.clip(frames.mean(axis=0) / np.maximum(medias[classes], 1e-9), GANHO_MINIMO, GANHO_MAXIMO)
+
+    normalizados = frames / ganhos
+    desvios = np.array([normalizados[:, classes == c].std() if np.any(classes == c) else DESVIO_MINIMO
+                        for c in range(len(medias))])
+    return ganhos, np.maximum(desvios, DESVIO_MINIMO)
+
+
+# ---- Perfis salvos ----
+
+def arquivo_perfil(id_tabuleiro: str, diretorio: str = 'calibracoes') -> str:
+    nome = re.sub(r'[^A-Za-z0-9_.-]+', '_', id_tabuleiro).strip('_')
+    return os.path.join(diretorio, f"{nome}.json")
+
+
+def salvar_perfil(id_tabuleiro: str, perfil: dict, diretorio: str = 'calibracoes') -> str:
+    os.makedirs(diretorio, exist_ok=True)
+    caminho = arquivo_perfil(id_tabuleiro, diretorio)
+    dados = dict(perfil, id=id_tabuleiro, salvo_em=time.time())
+
+    # Escreve num temporário e troca, para um perfil nunca ficar pela metade
+    temporario = caminho + ".tmp"
+    with open(temporario, 'w', encoding='utf-8') as f:
+        json.dump(dados, f, ensure_ascii=False, indent=2)
+    os.replace(temporario, caminho)
+    return caminho
+
+
+def carregar_perfil(id_tabuleiro: str, diretorio: str = 'calibracoes') -> Optional[dict]:
+    caminho = arquivo_perfil(id_tabuleiro, diretorio)
+    if not os.path.exists(caminho):
+        return None
+    with open(caminho, encoding='utf-8') as f:
+        return json.load(f)
@@ -0,0 +1,408 @@
+import argparse
+import copy
+import json
+import os
+import random
+import time
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+# Connect-4 em bitboard: cada jogador é um inteiro com um bit por casa, coluna a
+# coluna, 7 bits por coluna (6 casas + 1 de folga em cima, que impede que as
+# linhas de 4 "dêem a volta" de uma coluna para a próxima):
+#
+#    5 12 19 26 33 40 47     <- linha de cima (linha 0 do board_state)
+#    ...
+#    0  7 14 21 28 35 42     <- linha de baixo (linha 5 do board_state)
+#
+# Um lance é uma soma (o bit sobe até a primeira casa vazia da coluna), a vitória
+# são quatro AND com deslocamento, e os lances válidos são uma máscara em O(1).
+# Copiar o estado é copiar dois inteiros.
+#
+# Connect_4 e Board reproduzem a API dos notebooks (AlphaZero_From_Scratch-Modified
+# e Connect_4_ML_V4) para poderem ser trocados sem mexer no MCTS e no minimax.
+
+LINHAS = 6
+COLUNAS = 7
+ALTURA = LINHAS + 1
+
+FUNDO = sum(1 << (c * ALTURA) for c in range(COLUNAS))
+TOPO = FUNDO << (LINHAS - 1)
+TABULEIRO_CHEIO = FUNDO * ((1 << LINHAS) - 1)
+MASCARA_COLUNA = tuple(((1 << LINHAS) - 1) << (c * ALTURA) for c in range(COLUNAS))
+FUNDO_COLUNA = tuple(1 << (c * ALTURA) for c in range(COLUNAS))
+
+# Deslocamentos das quatro direções: vertical, horizontal e as duas diagonais
+DIRECOES = (1, ALTURA, ALTURA - 1, ALTURA + 1)
+
+# Máscara de colunas livres (bits do TOPO ainda vazios) -> colunas, para não
+# percorrer bits a cada chamada
+_COLUNAS_LIVRES: Dict[int, Tuple[int, ...]] = {}
+for _k in range(1 << COLUNAS):
+    _cols = tuple(c for c in range(COLUNAS) if _k >> c & 1)
+    _COLUNAS_LIVRES[sum(TOPO & MASCARA_COLUNA[c] for c in _cols)] = _cols
+
+
+def tem_quatro(bits: int) -> bool:
+    for d in DIRECOES:
+        m = bits & (bits >> d)
+        if m & (m >> (2 * d)):
+            return True
+    return False
+
+
+def conexoes(bits: int) -> List[List[int]]:
+    # Linhas de 4 no formato de Check_Conections: [X, Y, n], Y de cima para baixo,
+    # n = 1,2,3,4 para leste, sudeste, sul, sudoeste, a partir da casa de início
+    resultado = []
+    for d, direcao in ((ALTURA, 1), (ALTURA - 1, 2), (1, 3), (ALTURA + 1, 4)):
+        m = bits & (bits >> d) & (bits >> (2 * d)) & (bits >> (3 * d))
+        while m:
+            bit = (m & -m).bit_length() - 1
+            m &= m - 1
+            coluna, linha = divmod(bit, ALTURA)
+            if direcao == 3:
+                linha += 3  # começa na casa de cima
+            elif direcao == 4:
+                coluna, linha = coluna + 3, linha + 3  # começa na de cima à direita
+            resultado.append([coluna, LINHAS - 1 - linha, direcao])
+    return resultado
+
+
+class EstadoConnect4(NamedTuple):
+    # Imutável: jogar() devolve um novo estado. pecas1 é o jogador 1 (+1 no
+    # board_state) e pecas2 o jogador 2 (-1)
+    pecas1: int = 0
+    pecas2: int = 0
+
+    @property
+    def ocupadas(self) -> int:
+        return self.pecas1 | self.pecas2
+
+    def mascara_validos(self) -> int:
+        # Um bit no topo de cada coluna que ainda aceita peça
+        return TOPO & ~(self.pecas1 | self.pecas2)
+
+    def validos(self) -> Tuple[int, ...]:
+        return _COLUNAS_LIVRES[TOPO & ~(self.pecas1 | self.pecas2)]
+
+    def valido(self, coluna: int) -> bool:
+        return 0 <= coluna < COLUNAS and not (self.pecas1 | self.pecas2) & TOPO & MASCARA_COLUNA[coluna]
+
+    def bit_do_lance(self, coluna: int) -> int:
+        # Casa onde a peça cai; 0 se a coluna está cheia
+        return ((self.pecas1 | self.pecas2) + FUNDO_COLUNA[coluna]) & MASCARA_COLUNA[coluna]
+
+    def jogar(self, coluna: int, jogador: int) -> 'EstadoConnect4':
+        if not 0 <= coluna < COLUNAS:
+            raise ValueError(f"Coluna inválida: {coluna}")
+        bit = ((self.pecas1 | self.pecas2) + FUNDO_COLUNA[coluna]) & MASCARA_COLUNA[coluna]
+        if not bit:
+            raise ValueError(f"Coluna cheia: {coluna}")
+        if jogador == 1:
+            return EstadoConnect4(self.pecas1 | bit, self.pecas2)
+        return EstadoConnect4(self.pecas1, self.pecas2 | bit)
+
+    def vencedor(self) -> int:
+        # 1, -1 ou 0 (ninguém fez 4 ainda)
+        if tem_quatro(self.pecas1):
+            return 1
+        if tem_quatro(self.pecas2):
+            return -1
+        return 0
+
+    def cheio(self) -> bool:
+        return (self.pecas1 | self.pecas2) == TABULEIRO_CHEIO
+
+    def pecas_jogadas(self) -> int:
+        return (self.pecas1 | self.pecas2).bit_count()
+
+    def trocar(self) -> 'EstadoConnect4':
+        return EstadoConnect4(self.pecas2, self.pecas1)
+
+    def matriz(self, dtype=np.float64) -> np.ndarray:
+        # (6, 7), linha 0 em cima, como o board_state dos notebooks
+        resultado = np.zeros((LINHAS, COLUNAS), dtype=dtype)
+        for bits, valor in ((self.pecas1, 1), (self.pecas2, -1)):
+            while bits:
+                bit = (bits & -bits).bit_length() - 1
+                bits &= bits - 1
+                coluna, linha = divmod(bit, ALTURA)
+                resultado[LINHAS - 1 - linha, coluna] = valor
+        return resultado
+
+    @classmethod
+    def de_matriz(cls, matriz) -> 'EstadoConnect4':
+        # Aceita lista de listas, array numpy ou tensor (qualquer coisa indexável 6x7);
+        # não confere se as peças estão "apoiadas"
+        pecas1 = pecas2 = 0
+        for i in range(LINHAS):
+            linha = matriz[i]
+            for j in range(COLUNAS):
+                valor = linha[j]
+                if valor == 0:
+                    continue
+                bit = 1 << (j * ALTURA + LINHAS - 1 - i)
+                if valor > 0:
+                    pecas1 |= bit
+                else:
+                    pecas2 |= bit
+        return cls(pecas1, pecas2)
+
+
+# Bit de cada casa na ordem do board_state achatado (linha 0 em cima), a ordem
+# que Board_to_input usa para a entrada de 43 valores dos modelos
+BITS_ENTRADA = np.array([j * ALTURA + LINHAS - 1 - i for i in range(LINHAS) for j in range(COLUNAS)], dtype=np.int64)
+
+
+def entradas_modelo(pecas1: np.ndarray, pecas2: np.ndarray, jogadores: np.ndarray) -> np.ndarray:
+    # Lote de estados -> (B, 43) float32 como Baches_to_input: as 42 casas (+1/-1/0)
+    # e o jogador da vez (1 ou -1, o -player*2+3 dos notebooks)
+    pecas1 = np.asarray(pecas1, dtype=np.int64)[:, None]
+    pecas2 = np.asarray(pecas2, dtype=np.int64)[:, None]
+    casas = ((pecas1 >> BITS_ENTRADA) & 1) - ((pecas2 >> BITS_ENTRADA) & 1)
+    entrada = np.empty((casas.shape[0], LINHAS * COLUNAS + 1), dtype=np.float32)
+    entrada[:, :-1] = casas
+    entrada[:, -1] = jogadores
+    return entrada
+
+
+def rollout(estado: EstadoConnect4, jogador: int, rng: random.Random = random) -> int:
+    # Partida aleatória a partir de estado com jogador na vez; devolve o vencedor
+    # (1, -1) ou 0 no empate. Tudo em inteiros locais, sem criar estados
+    # intermediários; o teste de 4 é o de tem_quatro, desenrolado.
+    atual, outro = (estado.pecas1, estado.pecas2) if jogador == 1 else (estado.pecas2, estado.pecas1)
+    if tem_quatro(outro):
+        return -jogador
+    if tem_quatro(atual):
+        return jogador
+    ocupadas = atual | outro
+    livres, mascara, fundo, aleatorio = _COLUNAS_LIVRES, MASCARA_COLUNA, FUNDO_COLUNA, rng.random
+    while ocupadas != TABULEIRO_CHEIO:
+        colunas = livres[TOPO & ~ocupadas]
+        coluna = colunas[int(aleatorio() * len(colunas))]
+        bit = (ocupadas + fundo[coluna]) & mascara[coluna]
+        ocupadas |= bit
+        atual |= bit
+        m = atual & (atual >> 1)
+        if m & (m >> 2):
+            return jogador
+        m = atual & (atual >> 7)
+        if m & (m >> 14):
+            return jogador
+        m = atual & (atual >> 6)
+        if m & (m >> 12):
+            return jogador
+        m = atual & (atual >> 8)
+        if m & (m >> 16):
+            return jogador
+        atual, outro = outro, atual
+        jogador = -jogador
+    return 0
+
+
+class Connect_4:
+    # Mesma interface do Connect_4 do notebook AlphaZero. board_state e
+    # available_moves são calculados a partir dos bits a cada acesso (listas
+    # novas, então quem remove itens delas não altera o jogo).
+    __slots__ = ('estado', 'vencedor', 'action_size')
+
+    def __init__(self, estado: EstadoConnect4 = EstadoConnect4()):
+        self.estado = estado
+        self.vencedor = estado.vencedor()
+        self.action_size = COLUNAS
+
+    def __copy__(self):
+        novo = object.__new__(type(self))
+        novo.estado = self.estado
+        novo.vencedor = self.vencedor
+        novo.action_size = self.action_size
+        return novo
+
+    def __deepcopy__(self, memo):
+        # O estado é imutável: a cópia "profunda" do MCTS custa o mesmo que a rasa
+        return self.__copy__()
+
+    @property
+    def board_state(self) -> np.ndarray:
+        return self.estado.matriz()
+
+    @board_state.setter
+    def board_state(self, matriz):
+        self.estado = EstadoConnect4.de_matriz(matriz)
+        self.vencedor = self.estado.vencedor()
+
+    @property
+    def available_moves(self) -> List[int]:
+        return list(self.estado.validos())
+
+    @available_moves.setter
+    def available_moves(self, movimentos):
+        # Os lances disponíveis saem do tabuleiro; a atribuição dos notebooks é redundante
+        pass
+
+    @property
+    def List_Connections_1(self) -> List[List[int]]:
+        return conexoes(self.estado.pecas1)
+
+    @property
+    def List_Connections_2(self) -> List[List[int]]:
+        return conexoes(self.estado.pecas2)
+
+    def get_next_state(self, player, action):
+        jogador = 1 if player == 1 else -1
+        self.estado = self.estado.jogar(int(action), jogador)
+        # Só o jogador que acabou de jogar pode ter feito 4
+        if not self.vencedor and tem_quatro(self.estado.pecas1 if jogador == 1 else self.estado.pecas2):
+            self.vencedor = jogador
+
+    def get_valid_moves(self) -> List[int]:
+        return list(self.estado.validos())
+
+    def check_win(self) -> bool:
+        return self.vencedor != 0
+
+    def get_value_and_terminated(self):
+        if self.vencedor:
+            return 1, True
+        if self.estado.cheio():
+            return 0, True
+        return 0, False
+
+    def get_opponent(self, player):
+        return -player
+
+    def change_perspective(self, player):
+        if player == -1:
+            self.estado = self.estado.trocar()
+            self.vencedor = -self.vencedor
+
+
+class Board(Connect_4):
+    # Mesma interface do Board do notebook V4 (jogadores 1 e 2, board_state em listas)
+    __slots__ = ()
+
+    @property
+    def board_state(self) -> List[List[int]]:
+        return self.estado.matriz(dtype=np.int8).tolist()
+
+    @board_state.setter
+    def board_state(self, matriz):
+        self.estado = EstadoConnect4.de_matriz(matriz)
+        self.vencedor = self.estado.vencedor()
+
+    def move(self, player, position):
+        self.get_next_state(player, position)
+
+
+# ---- Benchmark ----
+
+NOTEBOOK_REFERENCIA = 'AlphaZero_From_Scratch-Modified.ipynb'
+
+
+def carregar_referencia(caminho: Optional[str] = None, nome: str = 'Connect_4', escopo: Optional[dict] = None):
+    # Classe original de um notebook (por padrão o Connect_4 com listas e
+    # Check_Conections), executada a partir da célula que a define para medir
+    # contra o código que está de fato em uso
+    caminho = caminho or os.path.join(os.path.dirname(os.path.abspath(__file__)), NOTEBOOK_REFERENCIA)
+    with open(caminho, encoding='utf-8') as f:
+        notebook = json.load(f)
+    for celula in notebook['cells']:
+        fonte = ''.join(celula['source'])
+        if celula['cell_type'] == 'code' and f'class {nome}' in fonte:
+            variaveis = {'np': np, 'copy': copy, 'm': LINHAS, 'n': COLUNAS}
+            variaveis.update(escopo or {})
+            exec(compile(fonte, caminho, 'exec'), variaveis)
+            return variaveis[nome]
+    raise ValueError(f"{nome} não encontrado em {caminho}")
+
+
+def rollout_notebook(estado, rng: random.Random) -> float:
+    # Mesmo laço de Node.simulate: deepcopy do estado e lances aleatórios até o fim
+    valor, terminal = estado.get_value_and_terminated()
+    if terminal:
+        return -valor
+    rollout_state = copy.deepcopy(estado)
+    jogador = 1
+    while True:
+        rollout_state.get_next_state(jogador, rng.choice(rollout_state.get_valid_moves()))
+        valor, terminal = rollout_state.get_value_and_terminated()
+        if terminal:
+            return -valor if jogador == -1 else valor
+        jogador = -jogador
+
+
+def medir_rollouts(funcao: Callable[[random.Random], object], segundos: float) -> Dict:
+    rng = random.Random(0)
+    n = 0
+    inicio = time.perf_counter()
+    fim = inicio + segundos
+    while True:
+        for _ in range(50):
+            funcao(rng)
+        n += 50
+        agora = time.perf_counter()
+        if agora >= fim:
+            break
+    return {'rollouts': n, 'por_segundo': n / (agora - inicio)}
+
+
+def conferir(referencia: type, partidas: int, rng: random.Random) -> int:
+    # Joga as mesmas partidas aleatórias nas duas implementações e compara
+    # tabuleiro, lances válidos e fim de jogo a cada lance; devolve divergências
+    divergencias = 0
+    for _ in range(partidas):
+        antigo, novo = referencia(), Connect_4()
+        jogador = 1
+        while True:
+            if (sorted(antigo.get_valid_moves()) != novo.get_valid_moves()
+                    or not np.array_equal(antigo.board_state, novo.board_state)
+                    or antigo.get_value_and_terminated() != novo.get_value_and_terminated()):
+                divergencias += 1
+                break
+            if antigo.get_value_and_terminated()[1]:
+                break
+            acao = rng.choice(novo.get_valid_moves())
+            antigo.get_next_state(jogador, acao)
+            novo.get_next_state(jogador, acao)
+            jogador = -jogador
+    return divergencias
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rollouts/s do Connect-4: listas do notebook x bitboard")
+    parser.add_argument("--segundos", type=float, default=3.0, help="duração de cada caso")
+    parser.add_argument("--conferir", type=int, default=500, help="partidas aleatórias comparadas com o notebook")
+    parser.add_argument("--notebook", help=f"notebook com a classe Connect_4 original ({NOTEBOOK_REFERENCIA})")
+    parser.add_argument("--json", help="grava os resultados neste arquivo")
+    args = parser.parse_args()
+
+    referencia = carregar_referencia(args.notebook)
+    if args.conferir:
+        divergencias = conferir(referencia, args.conferir, random.Random(1))
+        print(f"Conferência: {args.conferir} partidas, {divergencias} divergências")
+
+    casos = [
+        ('notebook (listas)', lambda rng: rollout_notebook(referencia(), rng)),
+        ('Connect_4 bitboard', lambda rng: rollout_notebook(Connect_4(), rng)),
+        ('rollout() em bits', lambda rng: rollout(EstadoConnect4(), 1, rng)),
+    ]
+    resultados = []
+    for nome, funcao in casos:
+        resultado = medir_rollouts(funcao, args.segundos)
+        resultado['caso'] = nome
+        resultados.append(resultado)
+
+    base = resultados[0]['por_segundo']
+    print(f"{'caso':<20} {'rollouts/s':>12} {'x notebook':>11}")
+    for r in resultados:
+        print(f"{r['caso']:<20} {r['por_segundo']:>12.0f} {r['por_segundo'] / base:>10.1f}x")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'data': time.strftime('%Y-%m-%dT%H:%M:%S'), 'resultados': resultados}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,192 @@
+import time
+from dataclasses import dataclass
+from typing import Callable, FrozenSet, Optional
+
+import numpy as np
+
+# Controle da varredura dos LDRs durante o streaming (firmware com PROTO:...,SCAN):
+#   VARREDURA <amostras> <estabilização us> <entre linhas us>
+#   EXTRA <amostras> <casa>,<casa>,...   amostras a mais só nessas casas
+# Com o tabuleiro parado a varredura é rápida e com poucas amostras; as casas com
+# leitura perto de um limiar ganham amostras extras, e a média de todas só sobe
+# quando o rastreador de lances acusa ambiguidade.
+
+
+@dataclass(frozen=True)
+class PerfilVarredura:
+    nome: str
+    amostras: int
+    estabilizacao_us: int
+    entre_linhas_us: int
+
+    def comando(self) -> str:
+        return f"VARREDURA {self.amostras} {self.estabilizacao_us} {self.entre_linhas_us}"
+
+    def duracao(self, linhas: int) -> float:
+        # Tempo de uma leitura no firmware, sem casas extras (segundos)
+        passada = linhas * (self.estabilizacao_us + self.entre_linhas_us) + self.entre_linhas_us / 2
+        return self.amostras * passada / 1e6
+
+
+# O padrão é o do firmware (~1,9 s por leitura no 3x3); é com ele que a calibração mede o ruído
+PERFIL_PADRAO = PerfilVarredura('padrao', 20, 20000, 10000)
+PERFIL_RAPIDO = PerfilVarredura('rapido', 2, 1500, 500)
+PERFIL_PRECISO = PerfilVarredura('preciso', 8, 5000, 2000)
+
+
+class ControladorVarredura:
+    # Assinante dos eventos do BoardEngine: decide a cada frame e manda os comandos
+    # sem esperar a resposta (no máximo um em andamento), então o processamento
+    # dos frames nunca bloqueia na serial. perfil e extras só mudam quando o
+    # firmware confirma (VARREDURA_OK/EXTRA_OK): recusa ou timeout mantêm o
+    # estado anterior, que é o que a placa continua usando.
+    def __init__(self, engine, rapido: PerfilVarredura = PERFIL_RAPIDO, preciso: PerfilVarredura = PERFIL_PRECISO,
+                 amostras_extras: int = 8, margem_desvios: float = 3.0, fracao_maxima_extras: float = 0.25,
+                 duracao_preciso: float = 1.0, intervalo_extras: float = 0.25, timeout_comando: float = 2.0):
+        self.engine = engine
+        self.rapido = rapido
+        self.preciso = preciso
+        self.amostras_extras = amostras_extras
+        self.margem_desvios = margem_desvios
+        self.fracao_maxima_extras = fracao_maxima_extras
+        self.duracao_preciso = duracao_preciso
+        self.intervalo_extras = intervalo_extras
+        self.timeout_comando = timeout_comando
+
+        self.perfil: Optional[PerfilVarredura] = None
+        self.extras: FrozenSet[int] = frozenset()
+        self.ultimas_extras = 0.0
+        self.ambiguidades = self.contar_ambiguidades()
+        self.ultima_ambiguidade = float('-inf')
+        self.comando = None
+        self.enviado_em = 0.0
+        self.ajustes = 0
+
+    def iniciar(self):
+        self.engine.inscrever(self.ao_evento)
+        self._enviar_perfil(self.rapido)
+
+    def parar(self, restaurar: bool = True):
+        # restaurar=False quando a placa já reiniciou (reconexão) e voltou ao padrão sozinha
+        self.engine.cancelar_inscricao(self.ao_evento)
+        leitor = self.engine.leitor
+        if restaurar and leitor and leitor.ativo:
+            try:
+                leitor.executar("EXTRA 0", "EXTRA_OK", self.timeout_comando)
+                leitor.executar(PERFIL_PADRAO.comando(), "VARREDURA_OK", self.timeout_comando)
+            except Exception as e:
+                self.engine.log_message(f"Erro ao restaurar a varredura padrão: {e}")
+        self.comando = None
+        self.perfil = None
+        self.extras = frozenset()
+
+    def contar_ambiguidades(self) -> int:
+        # Leituras explicadas por mais de um lance (tabela) e crenças que não batem
+        # com a leitura (HMM)
+        total = self.engine.metricas.contadores.get('lances_ambiguos', 0)
+        if self.engine.rastreador:
+            total += self.engine.rastreador.rejeicoes
+        return total
+
+    def ao_evento(self, evento: str, dados: dict):
+        if evento == 'frame' and dados.get('matriz') is not None:
+            self.avaliar(dados['matriz'])
+
+    def avaliar(self, matriz: np.ndarray):
+        agora = time.monotonic()
+        ambiguidades = self.contar_ambiguidades()
+        if ambiguidades != self.ambiguidades:
+            self.ambiguidades = ambiguidades
+            self.ultima_ambiguidade = agora
+
+        perfil = self.preciso if agora - self.ultima_ambiguidade < self.duracao_preciso else self.rapido
+        if perfil is not self.perfil:
+            self._enviar_perfil(perfil)
+            return
+
+        if agora - self.ultimas_extras < self.intervalo_extras:
+            return
+        casas = self.casas_incertas(matriz)
+        if casas != self.extras:
+            lista = ",".join(str(k) for k in sorted(casas))
+            comando = f"EXTRA {self.amostras_extras} {lista}" if casas else "EXTRA 0"
+            if self._enviar(comando, "EXTRA_OK", lambda: setattr(self, 'extras', casas)):
+                self.ultimas_extras = agora
+
+    def casas_incertas(self, matriz: np.ndarray) -> FrozenSet[int]:
+        calibracao = self.engine.calibration_data
+        if calibracao is None or self.perfil is None:
+            return frozenset()
+
+        if calibracao.limiares_casas is not None and calibracao.limiares_casas.shape[1:] == matriz.shape:
+            limiares = calibracao.limiares_casas
+        else:
+            thresholds = calibracao.thresholds
+            limiares = np.array([thresholds['preto_branco'], thresholds['branco_vazio']])[:, None, None]
+
+        # Desvio medido na calibração (perfil padrão), escalado para as amostras atuais
+        desvio = max(stats.get('desvio', 0.0) for stats in calibracao.cluster_stats.values())
+        desvio *= np.sqrt(PERFIL_PADRAO.amostras / self.perfil.amostras)
+        distancia = np.min(np.abs(matriz[None].astype(float) - limiares), axis=0).ravel()
+        # Histerese: uma casa já com extras só sai com folga maior, sem alternar a cada leitura
+        margem = np.full(distancia.shape, self.margem_desvios * desvio)
+        margem[list(self.extras)] *= 1.5
+        casas = np.flatnonzero(distancia < margem)
+
+        # Muitas casas de uma vez é movimento (mão sobre o tabuleiro), não ruído
+        if len(casas) > self.fracao_maxima_extras * matriz.size:
+            return frozenset()
+        return frozenset(casas.tolist())
+
+    def _enviar_perfil(self, perfil: PerfilVarredura):
+        def confirmar():
+            self.perfil = perfil
+            self.engine.log_message(f"Varredura {perfil.nome}: {perfil.amostras} amostras, "
+                                    f"~{perfil.duracao(self.engine.linhas) * 1000:.0f} ms por leitura")
+        self._enviar(perfil.comando(), "VARREDURA_OK", confirmar)
+
+    def _enviar(self, texto: str, esperado: str, ao_confirmar: Callable[[], None]) -> bool:
+        # ao_confirmar roda (na thread do leitor) só quando a resposta esperada chega
+        leitor = self.engine.leitor
+        if leitor is None or not leitor.ativo:
+            return False
+        if self.comando is not None:
+            futuro = self.comando.futuro
+            if time.monotonic() - self.enviado_em < self.timeout_comando:
+                # Em andamento, ou recusado há pouco: não reenvia a cada frame
+                if not futuro.done() or futuro.exception() is not None:
+                    return False
+            elif not futuro.done():
+                try:
+                    # Sem resposta: conta como comando expirado e libera o próximo
+                    leitor.aguardar(self.comando, 0)
+                except TimeoutError:
+                    pass
+
+        def resposta(futuro):
+            if self.comando is None or self.comando.futuro is not futuro:
+                # Resposta atrasada depois de parar(): a placa vai ser restaurada
+                return
+            erro = futuro.exception()
+            if erro is None and esperado not in futuro.result().linha:
+                # Com IDs a recusa (ex.: VARREDURA_INVALIDA #n) também resolve o Future
+                erro = futuro.result().linha
+            if erro is None:
+                ao_confirmar()
+            else:
+                self.engine.metricas.incrementar('ajustes_varredura_recusados')
+                self.engine.log_message(f"Ajuste de varredura não aplicado ({texto}): {erro}")
+
+        self.comando = leitor.enviar_comando(texto, esperado)
+        self.enviado_em = time.monotonic()
+        self.ajustes += 1
+        self.engine.metricas.incrementar('ajustes_varredura')
+        self.comando.futuro.add_done_callback(resposta)
+        return True
+
+    def estatisticas(self) -> dict:
+        return {
+            'perfil': self.perfil.nome if self.perfil else None,
+            'casas_extras': sorted(self.extras),
+            'ajustes': self.ajustes,
+        }
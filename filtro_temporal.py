@@ -0,0 +1,116 @@
+from typing import Optional, Tuple
+
+import numpy as np
+
+MODO_EMA = 'ema'
+MODO_MEDIANA = 'mediana'
+
+
+def _por_casa(valores, linhas: int, colunas: int) -> np.ndarray:
+    valores = np.asarray(valores, dtype=float)
+    if valores.ndim == 1:
+        valores = valores[:, None, None]
+    return np.broadcast_to(valores, (2, linhas, colunas)).copy()
+
+
+class FiltroTemporal:
+    # Estágio entre os frames brutos e a detecção de movimento:
+    #  1. suaviza cada casa no tempo (EMA ou mediana numa janela deslizante);
+    #  2. classifica com histerese: uma casa só muda de classe quando a leitura
+    #     passa do limiar por mais que a banda, então oscilações em cima do
+    #     limiar não geram diferenças;
+    #  3. só confirma um estado do tabuleiro depois de K frames seguidos iguais
+    #     (mão passando por cima, LDR piscando e peça sendo arrastada são descartados).
+    # limiares e bandas: shape (2,) ou (2, linhas, colunas), [preto_branco, branco_vazio].
+    # Trabalha com faixas (quantos limiares a leitura atinge: 0, 1 ou 2), como o
+    # np.digitize do BoardEngine; quem usa converte para classes.
+    def __init__(self, limiares: np.ndarray, bandas: np.ndarray, linhas: int, colunas: int,
+                 modo: str = MODO_EMA, alfa: float = 0.5, janela: int = 5, frames_estaveis: int = 3):
+        if modo not in (MODO_EMA, MODO_MEDIANA):
+            raise ValueError(f"Modo de filtro desconhecido: {modo}")
+
+        self.limiares = _por_casa(limiares, linhas, colunas)
+        self.bandas = _por_casa(bandas, linhas, colunas)
+        self.modo = modo
+        self.alfa = alfa
+        self.frames_estaveis = max(1, frames_estaveis)
+
+        self.suavizado = np.zeros((linhas, colunas))
+        self.janela = np.zeros((max(1, janela), linhas, colunas))
+        self.posicao = 0
+        self.preenchidos = 0
+
+        self.faixas: Optional[np.ndarray] = None
+        self.candidato = np.zeros((linhas, colunas), dtype=np.int8)
+        self.contador = 0
+        self.confirmado: Optional[np.ndarray] = None
+
+        self.frames = 0
+        self.confirmacoes = 0
+        self.transientes = 0
+
+    def reiniciar(self):
+        self.posicao = 0
+        self.preenchidos = 0
+        self.faixas = None
+        self.contador = 0
+        self.confirmado = None
+
+    def suavizar(self, matriz: np.ndarray) -> np.ndarray:
+        if self.modo == MODO_EMA:
+            if self.preenchidos == 0:
+                self.suavizado[...] = matriz
+            else:
+                self.suavizado += self.alfa * (matriz - self.suavizado)
+            self.preenchidos = 1
+            return self.suavizado
+
+        self.janela[self.posicao] = matriz
+        self.posicao = (self.posicao + 1) % len(self.janela)
+        self.preenchidos = min(self.preenchidos + 1, len(self.janela))
+        np.median(self.janela[:self.preenchidos], axis=0, out=self.suavizado)
+        return self.suavizado
+
+    def faixas_com_histerese(self, valores: np.ndarray) -> np.ndarray:
+        # Quantos limiares a leitura ultrapassa com folga (mínimo) e sem folga (máximo);
+        # a faixa anterior é mantida enquanto estiver entre os dois
+        faixa_minima = (valores >= self.limiares[0] + self.bandas[0]).astype(np.int8) \
+            + (valores >= self.limiares[1] + self.bandas[1])
+        faixa_maxima = (valores >= self.limiares[0] - self.bandas[0]).astype(np.int8) \
+            + (valores >= self.limiares[1] - self.bandas[1])
+
+        if self.faixas is None:
+            self.faixas = (valores >= self.limiares[0]).astype(np.int8) + (valores >= self.limiares[1])
+        else:
+            np.clip(self.faixas, faixa_minima, faixa_maxima, out=self.faixas)
+        return self.faixas
+
+    def atualizar(self, matriz: np.ndarray) -> Tuple[np.ndarray, bool]:
+        # Devolve (faixas atuais, True se um novo estado estável foi confirmado agora)
+        self.frames += 1
+        faixas = self.faixas_com_histerese(self.suavizar(matriz))
+
+        if self.contador and np.array_equal(faixas, self.candidato):
+            self.contador += 1
+        else:
+            if self.contador and self.contador < self.frames_estaveis and \
+                    (self.confirmado is None or not np.array_equal(self.candidato, self.confirmado)):
+                self.transientes += 1
+            self.candidato[...] = faixas
+            self.contador = 1
+
+        novo = False
+        if self.contador == self.frames_estaveis and \
+                (self.confirmado is None or not np.array_equal(self.candidato, self.confirmado)):
+            self.confirmado = self.candidato.copy()
+            self.confirmacoes += 1
+            novo = True
+        return faixas, novo
+
+    def estatisticas(self) -> dict:
+        return {
+            'frames': self.frames,
+            'confirmacoes': self.confirmacoes,
+            'transientes': self.transientes,
+            'estavel_ha': self.contador,
+        }
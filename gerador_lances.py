@@ -0,0 +1,427 @@
+import argparse
+import time
+from functools import lru_cache
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+# Casas numeradas como no resto do projeto: k = i*colunas + j, linha 0 = lado das brancas.
+# As brancas avançam para linhas maiores (peão da linha 1 vai para a 2).
+
+PEAO, CAVALO, BISPO, TORRE, DAMA, REI = range(6)
+BRANCO, PRETO = 0, 1
+VAZIO = '·'
+
+# Letra da peça (maiúscula = branca) -> tipo
+PECAS_XADREZ = {'P': PEAO, 'N': CAVALO, 'B': BISPO, 'R': TORRE, 'Q': DAMA, 'K': REI}
+PECAS_ABC = {'A': DAMA, 'B': TORRE, 'C': BISPO}  # variante 3x3: A=Rainha, B=Torre, C=Bispo
+
+NORMAL, ROQUE_GRANDE, ROQUE_PEQUENO, EN_PASSANT = range(4)
+PROMOCOES = 'QRBN'
+
+DIRECOES_TORRE = ((1, 0), (-1, 0), (0, 1), (0, -1))
+DIRECOES_BISPO = ((1, 1), (1, -1), (-1, 1), (-1, -1))
+SALTOS_CAVALO = ((1, 2), (2, 1), (-1, 2), (-2, 1), (1, -2), (2, -1), (-1, -2), (-2, -1))
+SALTOS_REI = DIRECOES_TORRE + DIRECOES_BISPO
+
+FEN_INICIAL = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+
+class Lance(NamedTuple):
+    origem: int
+    destino: int
+    peca: str
+    captura: str = ''      # peça capturada ('' se nenhuma)
+    promocao: str = ''
+    especial: int = NORMAL
+
+
+def nome_casa(i: int, j: int, linhas: int, colunas: int) -> str:
+    # 8x8: coordenadas do xadrez (a1 = casa 0, lado das brancas); demais tamanhos:
+    # a notação do 3x3 original, coluna A.. e linha contada de baixo na tela
+    if (linhas, colunas) == (8, 8):
+        return f"{chr(97+j)}{i+1}"
+    return f"{chr(65+j)}{linhas-i}"
+
+
+def casa_de_nome(nome: str, linhas: int, colunas: int) -> int:
+    # Inverso de nome_casa ('e2' no 8x8, 'A3' nos demais); ValueError se não for uma casa
+    nome = nome.strip()
+    if len(nome) < 2 or not nome[1:].isdigit():
+        raise ValueError(f"Casa inválida: {nome!r}")
+    j = ord(nome[0].lower()) - 97
+    numero = int(nome[1:])
+    i = numero - 1 if (linhas, colunas) == (8, 8) else linhas - numero
+    if not (0 <= i < linhas and 0 <= j < colunas):
+        raise ValueError(f"Casa fora do tabuleiro: {nome!r}")
+    return i * colunas + j
+
+
+def bits(valor: int) -> Iterator[int]:
+    while valor:
+        menor = valor & -valor
+        yield menor.bit_length() - 1
+        valor ^= menor
+
+
+class TabelasAtaque:
+    # Máscaras pré-calculadas por casa: saltos de cavalo e rei, capturas de peão
+    # e os raios das peças deslizantes (o primeiro bloqueio corta o raio)
+    def __init__(self, linhas: int, colunas: int):
+        self.linhas = linhas
+        self.colunas = colunas
+        self.casas = linhas * colunas
+
+        self.cavalo = [self._saltos(k, SALTOS_CAVALO) for k in range(self.casas)]
+        self.rei = [self._saltos(k, SALTOS_REI) for k in range(self.casas)]
+        self.peao = [[self._saltos(k, ((1, -1), (1, 1))) for k in range(self.casas)],
+                     [self._saltos(k, ((-1, -1), (-1, 1))) for k in range(self.casas)]]
+
+        # (crescente, raio por casa): em raios crescentes o bloqueio mais próximo é o bit menor
+        self.raios_torre = [(d[0] > 0 or (d[0] == 0 and d[1] > 0), [self._raio(k, d) for k in range(self.casas)])
+                            for d in DIRECOES_TORRE]
+        self.raios_bispo = [(d[0] > 0, [self._raio(k, d) for k in range(self.casas)]) for d in DIRECOES_BISPO]
+
+    def _dentro(self, i: int, j: int) -> bool:
+        return 0 <= i < self.linhas and 0 <= j < self.colunas
+
+    def _saltos(self, casa: int, saltos) -> int:
+        i, j = divmod(casa, self.colunas)
+        mascara = 0
+        for di, dj in saltos:
+            if self._dentro(i + di, j + dj):
+                mascara |= 1 << ((i + di) * self.colunas + j + dj)
+        return mascara
+
+    def _raio(self, casa: int, direcao: Tuple[int, int]) -> int:
+        i, j = divmod(casa, self.colunas)
+        mascara = 0
+        i, j = i + direcao[0], j + direcao[1]
+        while self._dentro(i, j):
+            mascara |= 1 << (i * self.colunas + j)
+            i, j = i + direcao[0], j + direcao[1]
+        return mascara
+
+    @staticmethod
+    def _deslizante(casa: int, ocupadas: int, raios) -> int:
+        ataques = 0
+        for crescente, raio_por_casa in raios:
+            raio = raio_por_casa[casa]
+            bloqueios = raio & ocupadas
+            if bloqueios:
+                primeiro = (bloqueios & -bloqueios).bit_length() - 1 if crescente else bloqueios.bit_length() - 1
+                raio ^= raio_por_casa[primeiro]
+            ataques |= raio
+        return ataques
+
+    def bispo(self, casa: int, ocupadas: int) -> int:
+        return self._deslizante(casa, ocupadas, self.raios_bispo)
+
+    def torre(self, casa: int, ocupadas: int) -> int:
+        return self._deslizante(casa, ocupadas, self.raios_torre)
+
+    def ataques(self, tipo: int, casa: int, ocupadas: int) -> int:
+        if tipo == CAVALO:
+            return self.cavalo[casa]
+        if tipo == REI:
+            return self.rei[casa]
+        if tipo == BISPO:
+            return self.bispo(casa, ocupadas)
+        if tipo == TORRE:
+            return self.torre(casa, ocupadas)
+        return self.bispo(casa, ocupadas) | self.torre(casa, ocupadas)
+
+
+@lru_cache(maxsize=None)
+def tabelas_ataque(linhas: int, colunas: int) -> TabelasAtaque:
+    return TabelasAtaque(linhas, colunas)
+
+
+def variante_para(linhas: int, colunas: int) -> Dict[str, int]:
+    return PECAS_XADREZ if (linhas, colunas) == (8, 8) else PECAS_ABC
+
+
+class Posicao:
+    def __init__(self, linhas: int, colunas: int, pecas: Optional[Dict[str, int]] = None):
+        self.linhas = linhas
+        self.colunas = colunas
+        self.casas_total = linhas * colunas
+        self.tabelas = tabelas_ataque(linhas, colunas)
+        self.tipos = pecas or variante_para(linhas, colunas)
+
+        self.casas: List[str] = [VAZIO] * self.casas_total
+        self.bb = [[0] * 6, [0] * 6]
+        self.ocupadas = [0, 0]
+        self.vez = BRANCO
+        self.roques = 0          # bits: 1 = brancas grande, 2 = brancas pequeno, 4/8 = pretas
+        self.en_passant: Optional[int] = None
+
+        # Roque só no 8x8: rei na coluna e, torres nas colunas a e h
+        self.mascara_roque = [0] * self.casas_total
+        if colunas == 8 and REI in self.tipos.values():
+            topo = (linhas - 1) * colunas
+            for casa, direito in ((0, 1), (4, 3), (7, 2), (topo, 4), (topo + 4, 12), (topo + 7, 8)):
+                self.mascara_roque[casa] = direito
+
+    # ---- Construção ----
+
+    @classmethod
+    def de_matriz(cls, pecas: List[List[str]], brancas_jogam: bool = True,
+                  tipos: Optional[Dict[str, int]] = None) -> 'Posicao':
+        linhas, colunas = len(pecas), len(pecas[0])
+        posicao = cls(linhas, colunas, tipos)
+        for i, linha in enumerate(pecas):
+            for j, peca in enumerate(linha):
+                if peca != VAZIO:
+                    posicao._colocar(i * colunas + j, peca)
+        posicao.vez = BRANCO if brancas_jogam else PRETO
+
+        # Sem histórico, o roque vale se rei e torre ainda estão nas casas iniciais
+        if any(posicao.mascara_roque):
+            topo = (linhas - 1) * colunas
+            for base, rei, torre, grande, pequeno in ((0, 'K', 'R', 1, 2), (topo, 'k', 'r', 4, 8)):
+                if posicao.casas[base + 4] == rei:
+                    if posicao.casas[base] == torre:
+                        posicao.roques |= grande
+                    if posicao.casas[base + 7] == torre:
+                        posicao.roques |= pequeno
+        return posicao
+
+    @classmethod
+    def de_fen(cls, fen: str) -> 'Posicao':
+        # FEN padrão 8x8; a fileira 1 vira a linha 0 (lado das brancas)
+        campos = fen.split()
+        fileiras = campos[0].split('/')
+        linhas = []
+        for fileira in reversed(fileiras):
+            linha = []
+            for c in fileira:
+                linha.extend([VAZIO] * int(c) if c.isdigit() else [c])
+            linhas.append(linha)
+
+        posicao = cls.de_matriz(linhas, campos[1] == 'w' if len(campos) > 1 else True, PECAS_XADREZ)
+        posicao.roques = 0
+        for c in (campos[2] if len(campos) > 2 else '-'):
+            posicao.roques |= {'Q': 1, 'K': 2, 'q': 4, 'k': 8}.get(c, 0)
+        if len(campos) > 3 and campos[3] != '-':
+            posicao.en_passant = (int(campos[3][1]) - 1) * 8 + ord(campos[3][0]) - ord('a')
+        return posicao
+
+    def para_matriz(self) -> List[List[str]]:
+        return [self.casas[i * self.colunas:(i + 1) * self.colunas] for i in range(self.linhas)]
+
+    def codigo(self) -> Tuple[int, int]:
+        # Mesmo formato da TabelaTransicoes: (ocupadas, brancas)
+        return self.ocupadas[BRANCO] | self.ocupadas[PRETO], self.ocupadas[BRANCO]
+
+    def chave(self) -> tuple:
+        return tuple(self.casas), self.vez, self.roques, self.en_passant
+
+    def _colocar(self, casa: int, peca: str):
+        self.casas[casa] = peca
+        cor = BRANCO if peca.isupper() else PRETO
+        bit = 1 << casa
+        self.bb[cor][self.tipos[peca.upper()]] |= bit
+        self.ocupadas[cor] |= bit
+
+    def _remover(self, casa: int) -> str:
+        peca = self.casas[casa]
+        self.casas[casa] = VAZIO
+        cor = BRANCO if peca.isupper() else PRETO
+        bit = 1 << casa
+        self.bb[cor][self.tipos[peca.upper()]] ^= bit
+        self.ocupadas[cor] ^= bit
+        return peca
+
+    # ---- Ataques ----
+
+    def atacada(self, casa: int, por_cor: int) -> bool:
+        t = self.tabelas
+        bb = self.bb[por_cor]
+        if t.cavalo[casa] & bb[CAVALO] or t.rei[casa] & bb[REI]:
+            return True
+        # Peões de por_cor que atacam a casa estão onde um peão da outra cor capturaria
+        if t.peao[1 - por_cor][casa] & bb[PEAO]:
+            return True
+        ocupadas = self.ocupadas[BRANCO] | self.ocupadas[PRETO]
+        if bb[BISPO] | bb[DAMA] and t.bispo(casa, ocupadas) & (bb[BISPO] | bb[DAMA]):
+            return True
+        if bb[TORRE] | bb[DAMA] and t.torre(casa, ocupadas) & (bb[TORRE] | bb[DAMA]):
+            return True
+        return False
+
+    def em_xeque(self, cor: Optional[int] = None) -> bool:
+        cor = self.vez if cor is None else cor
+        rei = self.bb[cor][REI]
+        return bool(rei) and self.atacada(rei.bit_length() - 1, 1 - cor)
+
+    # ---- Geração ----
+
+    def lances_pseudo(self) -> Iterator[Lance]:
+        cor = self.vez
+        proprias = self.ocupadas[cor]
+        adversarias = self.ocupadas[1 - cor]
+        todas = proprias | adversarias
+        t = self.tabelas
+
+        for tipo, bb in enumerate(self.bb[cor]):
+            for origem in bits(bb):
+                peca = self.casas[origem]
+                if tipo == PEAO:
+                    yield from self._lances_peao(origem, peca, cor, adversarias, todas)
+                    continue
+                for destino in bits(t.ataques(tipo, origem, todas) & ~proprias):
+                    yield Lance(origem, destino, peca, self.casas[destino] if (adversarias >> destino) & 1 else '')
+
+        if self.roques and self.bb[cor][REI]:
+            yield from self._roques(cor, todas)
+
+    def _lances_peao(self, origem: int, peca: str, cor: int, adversarias: int, todas: int) -> Iterator[Lance]:
+        passo = self.colunas if cor == BRANCO else -self.colunas
+        linha_inicial = 1 if cor == BRANCO else self.linhas - 2
+        linha_promocao = self.linhas - 1 if cor == BRANCO else 0
+        promocoes = PROMOCOES if cor == BRANCO else PROMOCOES.lower()
+
+        destinos = []
+        um = origem + passo
+        if 0 <= um < self.casas_total and not (todas >> um) & 1:
+            destinos.append((um, ''))
+            dois = um + passo
+            if origem // self.colunas == linha_inicial and 0 <= dois < self.casas_total and not (todas >> dois) & 1:
+                destinos.append((dois, ''))
+        for destino in bits(self.tabelas.peao[cor][origem] & adversarias):
+            destinos.append((destino, self.casas[destino]))
+
+        for destino, captura in destinos:
+            if destino // self.colunas == linha_promocao:
+                for promocao in promocoes:
+                    yield Lance(origem, destino, peca, captura, promocao)
+            else:
+                yield Lance(origem, destino, peca, captura)
+
+        if self.en_passant is not None and (self.tabelas.peao[cor][origem] >> self.en_passant) & 1:
+            yield Lance(origem, self.en_passant, peca, 'p' if cor == BRANCO else 'P', '', EN_PASSANT)
+
+    def _roques(self, cor: int, todas: int) -> Iterator[Lance]:
+        base = 0 if cor == BRANCO else (self.linhas - 1) * self.colunas
+        grande, pequeno = (1, 2) if cor == BRANCO else (4, 8)
+        rei = base + 4
+        adversario = 1 - cor
+        peca = self.casas[rei]
+
+        if self.roques & pequeno and not todas & (0b11 << (base + 5)) \
+                and not any(self.atacada(c, adversario) for c in (rei, base + 5, base + 6)):
+            yield Lance(rei, base + 6, peca, '', '', ROQUE_PEQUENO)
+        if self.roques & grande and not todas & (0b111 << (base + 1)) \
+                and not any(self.atacada(c, adversario) for c in (rei, base + 3, base + 2)):
+            yield Lance(rei, base + 2, peca, '', '', ROQUE_GRANDE)
+
+    def lances_legais(self) -> List[Lance]:
+        # Com rei no tabuleiro, descarta lances que o deixam em xeque;
+        # sem rei (variante 3x3), todo lance pseudo-legal vale
+        cor = self.vez
+        if not self.bb[cor][REI]:
+            return list(self.lances_pseudo())
+
+        legais = []
+        for lance in self.lances_pseudo():
+            desfazer = self.jogar(lance)
+            if not self.em_xeque(cor):
+                legais.append(lance)
+            self.desfazer(lance, desfazer)
+        return legais
+
+    # ---- Fazer / desfazer ----
+
+    def casa_captura(self, lance: Lance) -> int:
+        if lance.especial == EN_PASSANT:
+            return lance.destino - (self.colunas if lance.peca.isupper() else -self.colunas)
+        return lance.destino
+
+    def jogar(self, lance: Lance) -> Tuple[int, Optional[int]]:
+        anterior = (self.roques, self.en_passant)
+
+        if lance.captura:
+            self._remover(self.casa_captura(lance))
+        self._remover(lance.origem)
+        self._colocar(lance.destino, lance.promocao or lance.peca)
+
+        if lance.especial in (ROQUE_GRANDE, ROQUE_PEQUENO):
+            base = lance.origem - 4
+            de, para = (base, base + 3) if lance.especial == ROQUE_GRANDE else (base + 7, base + 5)
+            self._colocar(para, self._remover(de))
+
+        self.en_passant = None
+        if self.tipos[lance.peca.upper()] == PEAO and abs(lance.destino - lance.origem) == 2 * self.colunas:
+            self.en_passant = (lance.origem + lance.destino) // 2
+        self.roques &= ~(self.mascara_roque[lance.origem] | self.mascara_roque[lance.destino])
+        self.vez = 1 - self.vez
+        return anterior
+
+    def desfazer(self, lance: Lance, anterior: Tuple[int, Optional[int]]):
+        self.vez = 1 - self.vez
+        self.roques, self.en_passant = anterior
+
+        if lance.especial in (ROQUE_GRANDE, ROQUE_PEQUENO):
+            base = lance.origem - 4
+            de, para = (base, base + 3) if lance.especial == ROQUE_GRANDE else (base + 7, base + 5)
+            self._colocar(de, self._remover(para))
+
+        self._remover(lance.destino)
+        self._colocar(lance.origem, lance.peca)
+        if lance.captura:
+            self._colocar(self.casa_captura(lance), lance.captura)
+
+    # ---- Perft ----
+
+    def perft(self, profundidade: int) -> int:
+        if profundidade == 0:
+            return 1
+        lances = self.lances_legais()
+        if profundidade == 1:
+            return len(lances)
+        total = 0
+        for lance in lances:
+            anterior = self.jogar(lance)
+            total += self.perft(profundidade - 1)
+            self.desfazer(lance, anterior)
+        return total
+
+
+def movimento_robo(lance: Lance, posicao: Posicao) -> List[int]:
+    # Vetor Movement do Automatic_Chess_Bot_V2.ino:
+    # {origem, destino, captura (0/1), casa da peça capturada, roque (0, 1 = grande, 2 = pequeno)}
+    roque = {ROQUE_GRANDE: 1, ROQUE_PEQUENO: 2}.get(lance.especial, 0)
+    return [lance.origem, lance.destino, int(bool(lance.captura)), posicao.casa_captura(lance), roque]
+
+
+def comando_robo(lance: Lance, posicao: Posicao) -> str:
+    return "MOVER " + ",".join(str(v) for v in movimento_robo(lance, posicao))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perft do gerador de lances")
+    parser.add_argument("--profundidade", type=int, default=4)
+    parser.add_argument("--fen", default=None, help="posição 8x8 (padrão: inicial)")
+    parser.add_argument("--3x3", dest="variante_3x3", action="store_true", help="variante 3x3 (A=Rainha, B=Torre, C=Bispo)")
+    parser.add_argument("--divide", action="store_true", help="mostra a contagem por lance na raiz")
+    args = parser.parse_args()
+
+    if args.variante_3x3:
+        posicao = Posicao.de_matriz([list('ABC'), [VAZIO] * 3, list('abc')])
+    else:
+        posicao = Posicao.de_fen(args.fen or FEN_INICIAL)
+
+    for profundidade in range(1, args.profundidade + 1):
+        inicio = time.perf_counter()
+        nos = posicao.perft(profundidade)
+        decorrido = time.perf_counter() - inicio
+        print(f"perft({profundidade}) = {nos:>10}  {decorrido:8.3f} s  {nos / max(decorrido, 1e-9):>10.0f} nós/s")
+
+    if args.divide:
+        for lance in posicao.lances_legais():
+            anterior = posicao.jogar(lance)
+            print(f"  {lance.origem:>2}->{lance.destino:<2} {lance.promocao or ''}: {posicao.perft(args.profundidade - 1)}")
+            posicao.desfazer(lance, anterior)
+
+
+if __name__ == "__main__":
+    main()
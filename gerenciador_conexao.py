@@ -0,0 +1,309 @@
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import serial.tools.list_ports
+
+from board_engine import AVISO_PRONTO, BoardEngine, parece_arduino
+from transporte import abrir_transporte
+
+# Conexão automática: descobre a placa entre as portas seriais (sondando as
+# candidatas em paralelo), lembra a última porta boa de cada tabuleiro pelo
+# número de série USB e, se o link cair (erro de leitura ou heartbeat sem
+# resposta), reconecta com backoff exponencial. O estado do jogo e a calibração
+# ficam no BoardEngine, então a partida continua sem recalibrar.
+
+ARQUIVO_PORTAS = 'portas.json'
+
+# Portas já abertas por algum tabuleiro deste processo: a sondagem de um não pode
+# abrir (e reiniciar) a placa de outro
+_portas_em_uso: Set[str] = set()
+_lock_portas = threading.Lock()
+
+
+def serie_da_porta(dispositivo: str) -> Optional[str]:
+    try:
+        for porta in serial.tools.list_ports.comports():
+            if porta.device == dispositivo:
+                return porta.serial_number
+    except Exception:
+        pass
+    return None
+
+
+def sondar(endereco: str, baud_rate: int, timeout: float) -> Optional[Tuple[object, str]]:
+    # Abre a porta e espera o aviso de pronto; devolve (porta aberta, linha do aviso)
+    try:
+        ser = abrir_transporte(endereco, baud_rate, timeout=0.5)
+    except Exception:
+        return None
+
+    prazo = time.monotonic() + timeout
+    try:
+        while time.monotonic() < prazo:
+            linha = ser.readline().decode('utf-8', errors='replace').strip()
+            if linha.startswith(AVISO_PRONTO):
+                return ser, linha
+    except Exception:
+        pass
+    ser.close()
+    return None
+
+
+def sondar_em_paralelo(enderecos: List[str], baud_rate: int,
+                       timeout: float) -> Optional[Tuple[str, object, str]]:
+    # A primeira porta que se anuncia vence; as outras são fechadas assim que respondem
+    if not enderecos:
+        return None
+
+    vencedor: List[Tuple[str, object, str]] = []
+    restantes = [len(enderecos)]
+    pronto = threading.Event()
+    lock = threading.Lock()
+
+    def tentar(endereco: str):
+        resultado = sondar(endereco, baud_rate, timeout)
+        with lock:
+            if resultado and not vencedor:
+                vencedor.append((endereco,) + resultado)
+            elif resultado:
+                resultado[0].close()
+            restantes[0] -= 1
+            if vencedor or restantes[0] == 0:
+                pronto.set()
+
+    executor = ThreadPoolExecutor(max_workers=len(enderecos), thread_name_prefix='sonda')
+    for endereco in enderecos:
+        executor.submit(tentar, endereco)
+    # Não espera as portas mais lentas: as threads terminam (e fecham) sozinhas
+    executor.shutdown(wait=False)
+    pronto.wait()
+    return vencedor[0] if vencedor else None
+
+
+class CachePortas:
+    # portas.json: {nome do tabuleiro: {'porta': dispositivo, 'serie': número de série USB}}
+    def __init__(self, diretorio: str):
+        self.caminho = os.path.join(diretorio, ARQUIVO_PORTAS)
+        self.lock = threading.Lock()
+
+    def _ler(self) -> Dict[str, dict]:
+        try:
+            with open(self.caminho, encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def obter(self, nome: str) -> Optional[dict]:
+        with self.lock:
+            return self._ler().get(nome)
+
+    def registrar(self, nome: str, porta: str, serie: Optional[str]):
+        with self.lock:
+            dados = self._ler()
+            if dados.get(nome) == {'porta': porta, 'serie': serie}:
+                return
+            dados[nome] = {'porta': porta, 'serie': serie}
+            os.makedirs(os.path.dirname(self.caminho) or '.', exist_ok=True)
+            temporario = self.caminho + ".tmp"
+            with open(temporario, 'w', encoding='utf-8') as f:
+                json.dump(dados, f, ensure_ascii=False, indent=2)
+            os.replace(temporario, self.caminho)
+
+
+class GerenciadorConexao:
+    # Uma thread de monitoramento por tabuleiro. ao_conectar é chamado (nessa
+    # thread) depois de cada conexão bem-sucedida, inclusive reconexões.
+    def __init__(self, engine: BoardEngine, intervalo_heartbeat: float = 2.0, falhas_heartbeat: int = 2,
+                 backoff_inicial: float = 0.1, backoff_maximo: float = 5.0,
+                 ao_conectar: Optional[Callable[[], None]] = None):
+        self.engine = engine
+        self.intervalo_heartbeat = intervalo_heartbeat
+        self.falhas_heartbeat = falhas_heartbeat
+        self.backoff_inicial = backoff_inicial
+        self.backoff_maximo = backoff_maximo
+        self.ao_conectar = ao_conectar
+        self.cache = CachePortas(engine.diretorio_perfis)
+
+        self.ativo = False
+        self.thread = None
+        self.acordar = threading.Event()
+        self.forcar = False
+        self.porta_em_uso: Optional[str] = None
+        # Streaming a retomar depois de uma queda: (max_fps, consumir) ou None
+        self.streaming_anterior: Optional[Tuple[float, bool]] = None
+        self.inicio_queda: Optional[float] = None
+        self.ultima_recuperacao_s: Optional[float] = None
+
+    @property
+    def nome_cache(self) -> str:
+        return self.engine.nome or 'padrao'
+
+    # ---- Descoberta ----
+
+    def candidatas(self) -> List[str]:
+        porta = self.engine.arduino_port
+        if '://' in porta:
+            # tcp:// e sim:// não têm o que descobrir
+            return [porta]
+
+        try:
+            portas = serial.tools.list_ports.comports()
+        except Exception:
+            portas = []
+        with _lock_portas:
+            ocupadas = set(_portas_em_uso)
+
+        # A placa deste tabuleiro pode ter voltado com outro nome de dispositivo
+        conhecida = self.cache.obter(self.nome_cache) or {}
+        if conhecida.get('serie'):
+            for p in portas:
+                if p.serial_number == conhecida['serie'] and p.device not in ocupadas:
+                    return [p.device]
+
+        enderecos = []
+        for dispositivo in [porta, conhecida.get('porta')] + [p.device for p in portas if parece_arduino(p)]:
+            if dispositivo and dispositivo not in enderecos and dispositivo not in ocupadas:
+                enderecos.append(dispositivo)
+        return enderecos
+
+    def conectar(self) -> bool:
+        engine = self.engine
+        if engine.connection_in_progress:
+            return False
+
+        enderecos = self.candidatas()
+        engine.log_message(f"Procurando o Arduino em: {', '.join(enderecos) or 'nenhuma porta'}")
+        encontrado = sondar_em_paralelo(enderecos, engine.baud_rate, engine.timeouts['PRONTO'])
+        if encontrado is None:
+            engine.log_message("Nenhuma porta respondeu")
+            engine.metricas.incrementar('falhas_conexao')
+            engine.emitir('conexao', estado='falha')
+            return False
+
+        endereco, ser, linha = encontrado
+        engine.arduino_port = endereco
+        if not engine.conectar(ser, linha):
+            return False
+
+        self._ocupar(endereco)
+        if '://' not in endereco:
+            self.cache.registrar(self.nome_cache, endereco, serie_da_porta(endereco))
+        if self.ao_conectar:
+            try:
+                self.ao_conectar()
+            except Exception as e:
+                engine.log_message(f"Erro após conectar: {e}")
+        return True
+
+    def _ocupar(self, endereco: Optional[str]):
+        with _lock_portas:
+            if self.porta_em_uso:
+                _portas_em_uso.discard(self.porta_em_uso)
+            self.porta_em_uso = endereco
+            if endereco:
+                _portas_em_uso.add(endereco)
+
+    # ---- Monitoramento ----
+
+    def iniciar(self):
+        if self.ativo:
+            return
+        self.ativo = True
+        self.thread = threading.Thread(target=self._monitorar, name="conexao", daemon=True)
+        self.thread.start()
+
+    def parar(self):
+        self.ativo = False
+        self.acordar.set()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2)
+        self.thread = None
+        self._ocupar(None)
+
+    def reconectar(self):
+        # Derruba a conexão atual e reconecta pelo caminho normal de recuperação
+        self.forcar = True
+        self.acordar.set()
+
+    def link_ativo(self) -> bool:
+        leitor = self.engine.leitor
+        return self.engine.connected and leitor is not None and leitor.ativo
+
+    def heartbeat(self) -> bool:
+        # Só testa um link calado e sem comandos em andamento (LER, CALIBRAR...)
+        leitor = self.engine.leitor
+        if time.monotonic() - leitor.ultima_mensagem < self.intervalo_heartbeat or leitor.pendentes:
+            return True
+        try:
+            leitor.executar("TEST", "TESTE_OK", self.engine.timeouts['TEST'])
+            return True
+        except Exception:
+            return False
+
+    def _monitorar(self):
+        perdidos = 0
+        espera = self.backoff_inicial
+        while self.ativo:
+            engine = self.engine
+            if self.forcar:
+                self.forcar = False
+                if self.link_ativo():
+                    self._perder("reconexão pedida")
+
+            if self.link_ativo():
+                espera = self.backoff_inicial
+                if engine.streaming:
+                    self.streaming_anterior = (engine.max_fps, engine.streaming_consumir)
+                elif not engine.connection_in_progress:
+                    self.streaming_anterior = None
+
+                perdidos = 0 if self.heartbeat() else perdidos + 1
+                if perdidos >= self.falhas_heartbeat:
+                    perdidos = 0
+                    self._perder("heartbeat sem resposta")
+                self.acordar.wait(0.1)
+                self.acordar.clear()
+                continue
+
+            if engine.connected:
+                self._perder("erro de leitura")
+            if engine.connection_in_progress:
+                self.acordar.wait(0.1)
+                self.acordar.clear()
+                continue
+
+            if self.conectar():
+                self._recuperado()
+                continue
+
+            self.acordar.wait(espera)
+            self.acordar.clear()
+            espera = min(espera * 2, self.backoff_maximo)
+
+    def _perder(self, motivo: str):
+        engine = self.engine
+        self.inicio_queda = time.perf_counter()
+        engine.log_message(f"Conexão perdida ({motivo}); reconectando...")
+        engine.metricas.incrementar('quedas')
+        engine.connected = False
+        if engine.streaming:
+            engine.streaming = False
+            engine.emitir('streaming', ativo=False)
+        engine.fechar_porta()
+        self._ocupar(None)
+        engine.emitir('conexao', estado='perdida')
+
+    def _recuperado(self):
+        engine = self.engine
+        if self.inicio_queda is not None:
+            self.ultima_recuperacao_s = time.perf_counter() - self.inicio_queda
+            self.inicio_queda = None
+            engine.log_message(f"Reconectado em {self.ultima_recuperacao_s * 1000:.0f} ms "
+                               f"(porta {engine.arduino_port}); partida e calibração mantidas")
+        if self.streaming_anterior:
+            max_fps, consumir = self.streaming_anterior
+            engine.iniciar_streaming(max_fps, consumir)
@@ -0,0 +1,134 @@
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+
+# Uma sessão é um diretório com segmentos .npy de tamanho fixo e um sessao.json:
+#   frames_00000.npy, frames_00001.npy, ...  (array estruturado, ver dtype_frames)
+#   sessao.json  {'linhas', 'colunas', 'frames_por_segmento', 'segmentos', 'inicio',
+#                 'calibracao', 'mapa_linhas'}
+# Os segmentos são memmaps criados zerados; linhas com tempo 0 nunca foram
+# escritas, então uma sessão interrompida é lida até o último frame gravado.
+
+FRAME_STREAM = 0
+FRAME_LER = 1
+
+
+def dtype_frames(linhas: int, colunas: int) -> np.dtype:
+    return np.dtype([('sequencia', '<i8'), ('tempo', '<f8'), ('tipo', 'u1'), ('matriz', '<u2', (linhas, colunas))])
+
+
+class GravadorFrames:
+    # Chamado pela thread de leitura a cada frame bruto: gravar() é só uma cópia
+    # para o memmap; o sistema operacional escreve as páginas no disco.
+    def __init__(self, diretorio: str, linhas: int, colunas: int, frames_por_segmento: int = 4096):
+        self.diretorio = diretorio
+        self.linhas = linhas
+        self.colunas = colunas
+        self.frames_por_segmento = frames_por_segmento
+        self.dtype = dtype_frames(linhas, colunas)
+        self.lock = threading.Lock()
+
+        self.meta = {
+            'linhas': linhas,
+            'colunas': colunas,
+            'frames_por_segmento': frames_por_segmento,
+            'segmentos': [],
+            'inicio': time.time(),
+            'calibracao': None,
+            'mapa_linhas': None,
+        }
+        self.segmento: Optional[np.memmap] = None
+        self.posicao = 0
+        self.gravados = 0
+
+        os.makedirs(diretorio, exist_ok=True)
+        self._novo_segmento()
+
+    def _novo_segmento(self):
+        if self.segmento is not None:
+            self.segmento.flush()
+        nome = f"frames_{len(self.meta['segmentos']):05d}.npy"
+        self.segmento = np.lib.format.open_memmap(os.path.join(self.diretorio, nome), mode='w+',
+                                                  dtype=self.dtype, shape=(self.frames_por_segmento,))
+        self.meta['segmentos'].append(nome)
+        self.posicao = 0
+        self._salvar_meta()
+
+    def _salvar_meta(self):
+        caminho = os.path.join(self.diretorio, 'sessao.json')
+        temporario = caminho + ".tmp"
+        with open(temporario, 'w', encoding='utf-8') as f:
+            json.dump(self.meta, f, ensure_ascii=False, indent=2)
+        os.replace(temporario, caminho)
+
+    def gravar(self, sequencia: int, tempo: float, matriz: np.ndarray, tipo: int = FRAME_STREAM):
+        with self.lock:
+            if self.segmento is None:
+                return
+            if self.posicao == self.frames_por_segmento:
+                self._novo_segmento()
+            linha = self.segmento[self.posicao]
+            linha['sequencia'] = sequencia
+            linha['tempo'] = tempo
+            linha['tipo'] = tipo
+            linha['matriz'] = matriz
+            self.posicao += 1
+            self.gravados += 1
+
+    def atualizar_meta(self, **dados):
+        with self.lock:
+            self.meta.update(dados)
+            self._salvar_meta()
+
+    def fechar(self):
+        with self.lock:
+            if self.segmento is not None:
+                self.segmento.flush()
+                self.segmento = None
+                self.meta['frames'] = self.gravados
+                self._salvar_meta()
+
+
+@dataclass
+class Sessao:
+    diretorio: str
+    meta: dict
+    frames: np.ndarray  # array estruturado (dtype_frames), em ordem de chegada
+
+    @property
+    def linhas(self) -> int:
+        return self.meta['linhas']
+
+    @property
+    def colunas(self) -> int:
+        return self.meta['colunas']
+
+    def duracao(self) -> float:
+        if len(self.frames) < 2:
+            return 0.0
+        return float(self.frames['tempo'][-1] - self.frames['tempo'][0])
+
+
+def carregar_sessao(diretorio: str) -> Sessao:
+    with open(os.path.join(diretorio, 'sessao.json'), encoding='utf-8') as f:
+        meta = json.load(f)
+
+    partes = []
+    for nome in meta['segmentos']:
+        caminho = os.path.join(diretorio, nome)
+        if not os.path.exists(caminho):
+            break
+        segmento = np.load(caminho, mmap_mode='r')
+        escritos = segmento[segmento['tempo'] > 0]
+        partes.append(escritos)
+        if len(escritos) < len(segmento):
+            break
+
+    dtype = dtype_frames(meta['linhas'], meta['colunas'])
+    frames = np.concatenate(partes) if partes else np.empty(0, dtype=dtype)
+    return Sessao(diretorio, meta, frames)
@@ -1,16 +1,40 @@
 // SISTEMA_REAL_3x3_ROBUSTO_V2.ino
+// O tamanho da matriz sai dos vetores de pinos (até 8x8, ex.: Mega com A0-A7)
 const int PINOS_LINHAS[] = {2, 3, 4};
 const int PINOS_COLUNAS[] = {A0, A1, A2};
-const int NUM_LINHAS = 3;
-const int NUM_COLUNAS = 3;
+const int NUM_LINHAS = sizeof(PINOS_LINHAS) / sizeof(PINOS_LINHAS[0]);
+const int NUM_COLUNAS = sizeof(PINOS_COLUNAS) / sizeof(PINOS_COLUNAS[0]);
 
-const int NUM_LEITURAS_MEDIA = 20;
-const int DELAY_ESTABILIZACAO = 20;
-const int DELAY_ENTRE_LINHAS = 10;
+// Parâmetros da varredura: os padrões valem até o host mandar VARREDURA/EXTRA
+const int NUM_LEITURAS_PADRAO = 20;
+const unsigned long ESTABILIZACAO_PADRAO_US = 20000;
+const unsigned long ENTRE_LINHAS_PADRAO_US = 10000;
+const int MAX_LEITURAS = 64;
+const unsigned long MAX_ESPERA_US = 100000;
+
+int num_leituras_media = NUM_LEITURAS_PADRAO;
+unsigned long estabilizacao_us = ESTABILIZACAO_PADRAO_US;
+unsigned long entre_linhas_us = ENTRE_LINHAS_PADRAO_US;
+// Amostras a mais só nas casas que o host pediu (perto de um limiar)
+uint8_t leituras_extras[NUM_LINHAS][NUM_COLUNAS];
 
 int leituras[NUM_LINHAS][NUM_COLUNAS];
 bool sistema_calibrado = false;
 
+// Protocolo dos frames: ASCII (DADOS:v1,v2,...) ou binário versão 1
+// [0xA5 0x5A][versão][linhas][colunas][seq u16][leituras u16...][CRC16 u16]
+const uint8_t VERSAO_BINARIA = 1;
+bool modo_binario = false;
+uint16_t sequencia_frame = 0;
+
+// Modo streaming: envia frames DADOS continuamente
+bool streaming = false;
+unsigned long intervalo_streaming = 100;
+unsigned long ultimo_frame = 0;
+
+// Comandos podem terminar com " #<id>"; o mesmo sufixo volta na resposta final
+String sufixo_id = "";
+
 void setup() {
   Serial.begin(115200);
   
@@ -20,9 +44,9 @@ void setup() {
   }
   
   // Configura TODOS os pinos digitais inicialmente como INPUT (alta impedância)
-  for (int i = 2; i <= 4; i++) {
-    pinMode(i, INPUT);
-    digitalWrite(i, LOW);
+  for (int i = 0; i < NUM_LINHAS; i++) {
+    pinMode(PINOS_LINHAS[i], INPUT);
+    digitalWrite(PINOS_LINHAS[i], LOW);
   }
   
   // Configura pinos analógicos
@@ -33,7 +57,10 @@ void setup() {
   Serial.flush();
   delay(2000);
   
-  Serial.println("ARDUINO_PRONTO_3X3_REAL_V2");
+  Serial.print("ARDUINO_PRONTO_3X3_REAL_V3 PROTO:ASCII,BIN1,CMDID,SCAN DIM:");
+  Serial.print(NUM_LINHAS);
+  Serial.print("x");
+  Serial.println(NUM_COLUNAS);
   Serial.println("Sistema 3x3 Real - Pronto");
 }
 
@@ -42,33 +69,150 @@ void loop() {
     String comando = Serial.readStringUntil('\n');
     comando.trim();
     
+    sufixo_id = "";
+    int pos_id = comando.lastIndexOf(" #");
+    if (pos_id >= 0) {
+      sufixo_id = comando.substring(pos_id);
+      comando = comando.substring(0, pos_id);
+    }
+    
     if (comando == "LER") {
       realizarLeituraIsolada();
-      enviarDadosBrutos();
-      Serial.println("LEITURA_CONCLUIDA");
+      enviarDados();
+      responder("LEITURA_CONCLUIDA");
     }
     else if (comando == "CALIBRAR") {
       calibrarSistema();
-      Serial.println("CALIBRACAO_CONCLUIDA");
+      responder("CALIBRACAO_CONCLUIDA");
     }
     else if (comando == "RESET") {
       sistema_calibrado = false;
-      Serial.println("RESET_CONCLUIDO");
+      num_leituras_media = NUM_LEITURAS_PADRAO;
+      estabilizacao_us = ESTABILIZACAO_PADRAO_US;
+      entre_linhas_us = ENTRE_LINHAS_PADRAO_US;
+      memset(leituras_extras, 0, sizeof(leituras_extras));
+      responder("RESET_CONCLUIDO");
     }
     else if (comando == "TEST") {
-      Serial.println("TESTE_OK");
+      responder("TESTE_OK");
+    }
+    else if (comando.startsWith("STREAM_ON")) {
+      int fps = comando.substring(9).toInt();
+      if (fps <= 0) fps = 10;
+      intervalo_streaming = 1000UL / fps;
+      streaming = true;
+      ultimo_frame = 0;
+      responder("STREAM_INICIADO");
+    }
+    else if (comando == "MODO BIN1") {
+      modo_binario = true;
+      responder("MODO_OK BIN1");
+    }
+    else if (comando == "MODO ASCII") {
+      modo_binario = false;
+      responder("MODO_OK ASCII");
+    }
+    else if (comando == "STREAM_OFF") {
+      streaming = false;
+      responder("STREAM_PARADO");
+    }
+    else if (comando.startsWith("VARREDURA")) {
+      // VARREDURA <amostras> <estabilização us> <entre linhas us>
+      long amostras = campo(comando, 1).toInt();
+      long estabilizacao = campo(comando, 2).toInt();
+      long entre_linhas = campo(comando, 3).toInt();
+      if (amostras >= 1 && amostras <= MAX_LEITURAS && estabilizacao >= 0 && estabilizacao <= (long)MAX_ESPERA_US
+          && entre_linhas >= 0 && entre_linhas <= (long)MAX_ESPERA_US && campo(comando, 3).length() > 0) {
+        num_leituras_media = amostras;
+        estabilizacao_us = estabilizacao;
+        entre_linhas_us = entre_linhas;
+        responder("VARREDURA_OK " + String(num_leituras_media) + " " + String(estabilizacao_us) + " " + String(entre_linhas_us));
+      } else {
+        responder("VARREDURA_INVALIDA");
+      }
+    }
+    else if (comando.startsWith("EXTRA")) {
+      // EXTRA <amostras> <casa>,<casa>,...  (casa = linha * colunas + coluna); "EXTRA 0" limpa
+      long amostras = constrain(campo(comando, 1).toInt(), 0, MAX_LEITURAS);
+      memset(leituras_extras, 0, sizeof(leituras_extras));
+      String casas = campo(comando, 2);
+      int marcadas = 0;
+      int inicio = 0;
+      while (amostras > 0 && inicio < (int)casas.length()) {
+        int fim = casas.indexOf(',', inicio);
+        if (fim < 0) fim = casas.length();
+        int casa = casas.substring(inicio, fim).toInt();
+        if (casa >= 0 && casa < NUM_LINHAS * NUM_COLUNAS) {
+          leituras_extras[casa / NUM_COLUNAS][casa % NUM_COLUNAS] = amostras;
+          marcadas++;
+        }
+        inicio = fim + 1;
+      }
+      responder("EXTRA_OK " + String(marcadas));
+    }
+    else if (comando.length() > 0) {
+      responder("COMANDO_DESCONHECIDO " + comando);
     }
     
     Serial.flush();
   }
-  delay(50);
+  
+  if (streaming) {
+    if (millis() - ultimo_frame >= intervalo_streaming) {
+      ultimo_frame = millis();
+      realizarLeituraIsolada();
+      enviarDados();
+    }
+  } else {
+    delay(50);
+  }
+}
+
+void responder(String resposta) {
+  Serial.print(resposta);
+  Serial.println(sufixo_id);
+}
+
+// Campo 'indice' de um comando separado por espaços ("" se não existir)
+String campo(const String &texto, int indice) {
+  int inicio = 0;
+  for (int k = 0; k <= indice; k++) {
+    while (inicio < (int)texto.length() && texto[inicio] == ' ') inicio++;
+    int fim = texto.indexOf(' ', inicio);
+    if (fim < 0) fim = texto.length();
+    if (k == indice) return texto.substring(inicio, fim);
+    inicio = fim;
+  }
+  return "";
+}
+
+// delayMicroseconds só é preciso até ~16 ms
+void esperarMicros(unsigned long us) {
+  if (us >= 1000) delay(us / 1000);
+  delayMicroseconds(us % 1000);
 }
 
 void realizarLeituraIsolada() {
   long leiturasAcumuladas[NUM_LINHAS][NUM_COLUNAS] = {0};
+  int amostras[NUM_LINHAS][NUM_COLUNAS] = {0};
   
-  for (int leitura = 0; leitura < NUM_LEITURAS_MEDIA; leitura++) {
+  int maxExtras = 0;
+  for (int linha = 0; linha < NUM_LINHAS; linha++) {
+    for (int coluna = 0; coluna < NUM_COLUNAS; coluna++) {
+      maxExtras = max(maxExtras, (int)leituras_extras[linha][coluna]);
+    }
+  }
+  int passes = num_leituras_media + maxExtras;
+  
+  for (int leitura = 0; leitura < passes; leitura++) {
     for (int linha = 0; linha < NUM_LINHAS; linha++) {
+      // Depois das amostras normais, só as linhas com casas que pediram extras
+      bool precisa = false;
+      for (int coluna = 0; coluna < NUM_COLUNAS; coluna++) {
+        if (leitura < num_leituras_media + leituras_extras[linha][coluna]) precisa = true;
+      }
+      if (!precisa) continue;
+      
       // PRIMEIRO: Coloca TODAS as linhas em LOW/INPUT para garantir isolamento
       for (int l = 0; l < NUM_LINHAS; l++) {
         if (l != linha) {
@@ -80,10 +224,11 @@ void realizarLeituraIsolada() {
       // AGORA ativa apenas a linha atual
       pinMode(PINOS_LINHAS[linha], OUTPUT);
       digitalWrite(PINOS_LINHAS[linha], HIGH);
-      delay(DELAY_ESTABILIZACAO);
+      esperarMicros(estabilizacao_us);
       
       // Leitura das colunas para esta linha
       for (int coluna = 0; coluna < NUM_COLUNAS; coluna++) {
+        if (leitura >= num_leituras_media + leituras_extras[linha][coluna]) continue;
         pinMode(PINOS_COLUNAS[coluna], OUTPUT);
         digitalWrite(PINOS_COLUNAS[coluna], LOW);
         pinMode(PINOS_COLUNAS[coluna], INPUT);
@@ -97,20 +242,22 @@ void realizarLeituraIsolada() {
         }
         int valor = analogRead(PINOS_COLUNAS[coluna]);
         leiturasAcumuladas[linha][coluna] += valor;
+        amostras[linha][coluna]++;
       }
       
       // Desativa a linha atual
       digitalWrite(PINOS_LINHAS[linha], LOW);
       pinMode(PINOS_LINHAS[linha], INPUT);
-      delay(DELAY_ENTRE_LINHAS);
+      esperarMicros(entre_linhas_us);
     }
-    delay(5);
+    // Pausa entre passadas: 5 ms com os parâmetros padrão
+    esperarMicros(entre_linhas_us / 2);
   }
   
-  // Calcula médias
+  // Calcula médias (cada casa com o próprio número de amostras)
   for (int linha = 0; linha < NUM_LINHAS; linha++) {
     for (int coluna = 0; coluna < NUM_COLUNAS; coluna++) {
-      leituras[linha][coluna] = leiturasAcumuladas[linha][coluna] / NUM_LEITURAS_MEDIA;
+      leituras[linha][coluna] = leiturasAcumuladas[linha][coluna] / max(1, amostras[linha][coluna]);
     }
   }
 }
@@ -118,8 +265,8 @@ void realizarLeituraIsolada() {
 void calibrarSistema() {
   Serial.println("CALIBRACAO: Iniciando calibração automática...");
   Serial.println("CALIBRACAO: Posicione peças BRANCAS na linha 0");
-  Serial.println("CALIBRACAO: Deixe VAZIO na linha 1");
-  Serial.println("CALIBRACAO: Posicione peças PRETAS na linha 2");
+  Serial.println("CALIBRACAO: Deixe VAZIAS as linhas do meio");
+  Serial.print("CALIBRACAO: Posicione peças PRETAS na linha "); Serial.println(NUM_LINHAS - 1);
   Serial.println("CALIBRACAO: Aguardando 5 segundos...");
   
   delay(5000);
@@ -134,15 +281,15 @@ void calibrarSistema() {
     for (int coluna = 0; coluna < NUM_COLUNAS; coluna++) {
       int valor = leituras[linha][coluna];
       
-      if (linha == 1) { // Linha do meio - vazia
-        somaVazio += valor;
-        countVazio++;
-      } else if (linha == 0) { // Linha superior - brancas
+      if (linha == 0) { // Linha superior - brancas
         somaBranco += valor;
         countBranco++;
-      } else if (linha == 2) { // Linha inferior - pretas
+      } else if (linha == NUM_LINHAS - 1) { // Linha inferior - pretas
         somaPreto += valor;
         countPreto++;
+      } else { // Linhas do meio - vazias
+        somaVazio += valor;
+        countVazio++;
       }
     }
   }
@@ -168,4 +315,44 @@ void enviarDadosBrutos() {
     }
   }
   Serial.println();
-}
\ No newline at end of file
+}
+
+void enviarDados() {
+  if (modo_binario) {
+    enviarFrameBinario();
+  } else {
+    enviarDadosBrutos();
+  }
+}
+
+// CRC-16/CCITT (poly 0x1021, início 0xFFFF), igual ao binascii.crc_hqx do host
+uint16_t atualizarCrc(uint16_t crc, uint8_t byte) {
+  crc ^= (uint16_t)byte << 8;
+  for (int i = 0; i < 8; i++) {
+    crc = (crc & 0x8000) ? (crc << 1) ^ 0x1021 : (crc << 1);
+  }
+  return crc;
+}
+
+void enviarFrameBinario() {
+  uint8_t cabecalho[7] = {
+    0xA5, 0x5A, VERSAO_BINARIA, NUM_LINHAS, NUM_COLUNAS,
+    (uint8_t)(sequencia_frame & 0xFF), (uint8_t)(sequencia_frame >> 8)
+  };
+  uint16_t crc = 0xFFFF;
+  for (int i = 2; i < 7; i++) crc = atualizarCrc(crc, cabecalho[i]);
+  Serial.write(cabecalho, 7);
+  
+  for (int i = 0; i < NUM_LINHAS; i++) {
+    for (int j = 0; j < NUM_COLUNAS; j++) {
+      uint8_t valor[2] = {(uint8_t)(leituras[i][j] & 0xFF), (uint8_t)(leituras[i][j] >> 8)};
+      crc = atualizarCrc(crc, valor[0]);
+      crc = atualizarCrc(crc, valor[1]);
+      Serial.write(valor, 2);
+    }
+  }
+  
+  uint8_t rodape[2] = {(uint8_t)(crc & 0xFF), (uint8_t)(crc >> 8)};
+  Serial.write(rodape, 2);
+  sequencia_frame++;
+}
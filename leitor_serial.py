@@ -0,0 +1,316 @@
+import itertools
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FuturesTimeoutError
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from gravador_frames import FRAME_LER
+from metricas import Metricas
+from protocolo_serial import ParserFrames
+
+
+@dataclass
+class RespostaComando:
+    linha: str
+    dados: Optional[np.ndarray] = None
+
+
+@dataclass
+class ComandoPendente:
+    id: int
+    nome: str
+    esperado: str
+    quer_dados: bool
+    futuro: Future
+    dados: Optional[np.ndarray] = None
+
+
+class ErroComando(Exception):
+    pass
+
+
+class LeitorSerial:
+    # Thread única que fica bloqueada na porta e despacha tudo o que chega:
+    # respostas vão para o Future do comando correspondente (pelo ID "#n" ou,
+    # em firmwares sem IDs, pela palavra esperada), frames de streaming vão para
+    # um buffer circular pré-alocado e o resto vai para ao_receber_linha.
+    def __init__(self, ser, linhas: int = 3, colunas: int = 3, capacidade: int = 32,
+                 max_fps: float = 10.0, ao_receber_linha: Optional[Callable[[str], None]] = None,
+                 ao_receber_frame: Optional[Callable[[], None]] = None, metricas: Optional[Metricas] = None):
+        self.ser = ser
+        self.capacidade = capacidade
+        self.max_fps = max_fps
+        self.ao_receber_linha = ao_receber_linha
+        # Avisa quem processa os frames fora de proximo_frame (ex.: servidor com vários tabuleiros)
+        self.ao_receber_frame = ao_receber_frame
+        # GravadorFrames opcional: recebe todo frame bruto, inclusive os de LER
+        self.gravador = None
+        # Tempos de espera pela porta e de decodificação, timeouts e frames inválidos
+        self.metricas = metricas
+        self.usar_ids = False
+
+        self.parser = ParserFrames(linhas, colunas)
+        self.frames = np.zeros((capacidade, linhas, colunas), dtype=np.uint16)
+        self.tempos = np.zeros(capacidade)
+        self.sequencias = np.zeros(capacidade, dtype=np.int64)
+        self.inicio = 0
+        self.quantidade = 0
+        self.saida = np.zeros((linhas, colunas), dtype=np.uint16)
+        self.cond = threading.Condition()
+
+        self.ids = itertools.count(1)
+        self.pendentes: Dict[int, ComandoPendente] = {}
+        self.lock_comandos = threading.Lock()
+        self.lock_escrita = threading.Lock()
+
+        self.sequencia = 0
+        self.frames_recebidos = 0
+        self.frames_consumidos = 0
+        self.frames_descartados = 0
+        self.comandos_expirados = 0
+        self.ultimo_consumo = 0.0
+        # Última mensagem completa (monotonic): o heartbeat só testa um link calado
+        self.ultima_mensagem = time.monotonic()
+
+        self.ativo = False
+        self.thread = None
+
+    def iniciar(self):
+        if self.ativo:
+            return
+        self.ativo = True
+        self.thread = threading.Thread(target=self._loop_leitura, daemon=True)
+        self.thread.start()
+
+    def parar(self):
+        self.ativo = False
+        with self.cond:
+            self.cond.notify_all()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2)
+        self.thread = None
+        self._falhar_pendentes(ErroComando("Leitor serial encerrado"))
+
+    # ---- Comandos ----
+
+    def enviar_comando(self, nome: str, esperado: str, quer_dados: bool = False) -> ComandoPendente:
+        comando = ComandoPendente(next(self.ids), nome, esperado, quer_dados, Future())
+        with self.lock_comandos:
+            self.pendentes[comando.id] = comando
+
+        texto = f"{nome} #{comando.id}\n" if self.usar_ids else f"{nome}\n"
+        try:
+            with self.lock_escrita:
+                self.ser.write(texto.encode())
+        except Exception as e:
+            self._remover(comando)
+            comando.futuro.set_exception(e)
+        return comando
+
+    def executar(self, nome: str, esperado: str, timeout: float, quer_dados: bool = False) -> RespostaComando:
+        # Bloqueia só até a resposta chegar (ou até o timeout deste comando)
+        return self.aguardar(self.enviar_comando(nome, esperado, quer_dados), timeout)
+
+    def esperar_linha(self, esperado: str) -> ComandoPendente:
+        # Para mensagens espontâneas do Arduino, como o aviso de pronto;
+        # registre antes de iniciar() para não perder a linha
+        comando = ComandoPendente(next(self.ids), '', esperado, False, Future())
+        with self.lock_comandos:
+            self.pendentes[comando.id] = comando
+        return comando
+
+    def aguardar_linha(self, esperado: str, timeout: float) -> RespostaComando:
+        return self.aguardar(self.esperar_linha(esperado), timeout)
+
+    def aguardar(self, comando: ComandoPendente, timeout: float) -> RespostaComando:
+        try:
+            return comando.futuro.result(timeout)
+        except FuturesTimeoutError:
+            self._remover(comando)
+            self.comandos_expirados += 1
+            if self.metricas:
+                self.metricas.incrementar('comandos_expirados')
+            raise TimeoutError(f"Timeout aguardando {comando.esperado}" +
+                               (f" ({comando.nome})" if comando.nome else ""))
+
+    def _remover(self, comando: ComandoPendente):
+        with self.lock_comandos:
+            self.pendentes.pop(comando.id, None)
+
+    def _falhar_pendentes(self, erro: Exception):
+        with self.lock_comandos:
+            pendentes = list(self.pendentes.values())
+            self.pendentes.clear()
+        for comando in pendentes:
+            if not comando.futuro.done():
+                comando.futuro.set_exception(erro)
+
+    def _despachar_linha(self, linha: str) -> bool:
+        id_resposta = None
+        texto = linha
+        partes = linha.rsplit(" #", 1)
+        if len(partes) == 2 and partes[1].isdigit():
+            texto, id_resposta = partes[0], int(partes[1])
+
+        with self.lock_comandos:
+            comando = None
+            if id_resposta is not None:
+                comando = self.pendentes.get(id_resposta)
+            else:
+                # Sem ID: o comando mais antigo que espera esta resposta
+                for pendente in self.pendentes.values():
+                    if pendente.esperado in texto:
+                        comando = pendente
+                        break
+            if comando is None:
+                return False
+            del self.pendentes[comando.id]
+
+        if texto.startswith("COMANDO_DESCONHECIDO"):
+            comando.futuro.set_exception(ErroComando(f"Comando não reconhecido pelo Arduino: {comando.nome}"))
+        else:
+            comando.futuro.set_result(RespostaComando(texto, comando.dados))
+        return True
+
+    def _comando_esperando_dados(self) -> Optional[ComandoPendente]:
+        with self.lock_comandos:
+            for comando in self.pendentes.values():
+                if comando.quer_dados and comando.dados is None:
+                    return comando
+        return None
+
+    # ---- Leitura ----
+
+    def _loop_leitura(self):
+        metricas = self.metricas
+        espera_desde = time.perf_counter()
+        invalidos = self.parser.frames_invalidos
+        while self.ativo:
+            try:
+                # read bloqueia até o timeout da porta, sem polling de in_waiting
+                mensagem = self.parser.ler_mensagem(self.ser)
+            except Exception as e:
+                if self.ao_receber_linha:
+                    self.ao_receber_linha(f"ERRO_LEITURA: {e}")
+                self.ativo = False
+                self._falhar_pendentes(e)
+                break
+
+            if metricas and self.parser.frames_invalidos != invalidos:
+                metricas.incrementar('frames_invalidos', self.parser.frames_invalidos - invalidos)
+                invalidos = self.parser.frames_invalidos
+            if mensagem is None:
+                continue
+            self.ultima_mensagem = time.monotonic()
+
+            if metricas:
+                # Espera desde a mensagem anterior até o primeiro byte; o resto é decodificação
+                fim = time.perf_counter()
+                metricas.observar('espera_serial', self.parser.inicio_mensagem - espera_desde)
+                metricas.observar('decodificacao', fim - self.parser.inicio_mensagem)
+                espera_desde = fim
+
+            tipo, conteudo = mensagem
+            if tipo == 'DADOS':
+                comando = self._comando_esperando_dados()
+                if comando is not None:
+                    comando.dados = conteudo.astype(int)
+                    if self.gravador:
+                        self.gravador.gravar(0, time.time(), conteudo, FRAME_LER)
+                else:
+                    self._empilhar_frame(conteudo)
+            elif not self._despachar_linha(conteudo) and self.ao_receber_linha:
+                self.ao_receber_linha(conteudo)
+
+        with self.cond:
+            self.cond.notify_all()
+
+    def _empilhar_frame(self, matriz: np.ndarray):
+        with self.cond:
+            if self.quantidade == self.capacidade:
+                # Buffer cheio: o frame mais antigo é sobrescrito
+                self.inicio = (self.inicio + 1) % self.capacidade
+                self.quantidade -= 1
+                self.frames_descartados += 1
+
+            slot = (self.inicio + self.quantidade) % self.capacidade
+            np.copyto(self.frames[slot], matriz)
+            self.sequencia += 1
+            self.sequencias[slot] = self.sequencia
+            self.tempos[slot] = time.time()
+            self.quantidade += 1
+            self.frames_recebidos += 1
+            sequencia, tempo = self.sequencia, self.tempos[slot]
+            self.cond.notify()
+
+        if self.gravador:
+            self.gravador.gravar(sequencia, tempo, matriz)
+        if self.ao_receber_frame:
+            self.ao_receber_frame()
+
+    def definir_binario(self, ativo: bool):
+        # Chamado quando o firmware aceita (ou deixa) o modo BIN1
+        with self.cond:
+            self.parser.definir_binario(ativo)
+
+    def redimensionar(self, linhas: int, colunas: int):
+        with self.cond:
+            binario = self.parser.binario
+            self.parser = ParserFrames(linhas, colunas)
+            self.parser.definir_binario(binario)
+            self.frames = np.zeros((self.capacidade, linhas, colunas), dtype=np.uint16)
+            self.saida = np.zeros((linhas, colunas), dtype=np.uint16)
+            self.inicio = 0
+            self.quantidade = 0
+
+    def limpar_frames(self):
+        with self.cond:
+            self.inicio = 0
+            self.quantidade = 0
+
+    def proximo_frame(self, timeout: float = 0.5) -> Optional[Tuple[int, float, np.ndarray]]:
+        # Entrega sempre o frame mais recente respeitando max_fps;
+        # frames intermediários são contados como descartados.
+        # A matriz devolvida é reutilizada a cada chamada.
+        intervalo = 1.0 / self.max_fps if self.max_fps > 0 else 0.0
+        espera = self.ultimo_consumo + intervalo - time.time()
+        if espera > 0:
+            time.sleep(espera)
+
+        with self.cond:
+            if not self.quantidade:
+                self.cond.wait(timeout)
+        return self.retirar_frame()
+
+    def retirar_frame(self) -> Optional[Tuple[int, float, np.ndarray]]:
+        # Versão sem espera de proximo_frame: o mais recente ou None
+        with self.cond:
+            if not self.quantidade:
+                return None
+
+            slot = (self.inicio + self.quantidade - 1) % self.capacidade
+            np.copyto(self.saida, self.frames[slot])
+            frame = (int(self.sequencias[slot]), float(self.tempos[slot]), self.saida)
+            self.frames_descartados += self.quantidade - 1
+            self.inicio = (slot + 1) % self.capacidade
+            self.quantidade = 0
+
+        self.frames_consumidos += 1
+        self.ultimo_consumo = time.time()
+        return frame
+
+    def estatisticas(self) -> dict:
+        return {
+            'recebidos': self.frames_recebidos,
+            'consumidos': self.frames_consumidos,
+            'descartados': self.frames_descartados,
+            'no_buffer': self.quantidade,
+            'invalidos': self.parser.frames_invalidos,
+            'bytes_descartados': self.parser.bytes_descartados,
+            'perdidos_no_link': self.parser.frames_perdidos,
+            'comandos_pendentes': len(self.pendentes),
+            'comandos_expirados': self.comandos_expirados,
+        }
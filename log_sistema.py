@@ -0,0 +1,94 @@
+import json
+import logging
+import logging.handlers
+import os
+import queue
+from typing import List, Optional, Sequence
+
+NOME_LOGGER = 'tabuleiro'
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class FormatadorJSON(logging.Formatter):
+    # Uma linha JSON por registro; campos estruturados vêm de extra={'campos': {...}}
+    def format(self, record: logging.LogRecord) -> str:
+        dados = {
+            'ts': record.created,
+            'nivel': record.levelname,
+            'logger': record.name,
+            'mensagem': record.getMessage(),
+        }
+        dados.update(getattr(record, 'campos', {}))
+        return json.dumps(dados, ensure_ascii=False, default=str)
+
+
+class HandlerFilaGUI(logging.Handler):
+    # Só enfileira o texto formatado; a interface drena em lotes na thread do Tk
+    def __init__(self, nivel: int = logging.INFO):
+        super().__init__(nivel)
+        self.fila = queue.SimpleQueue()
+        self.setFormatter(logging.Formatter("[%(asctime)s] %(message)s", datefmt="%H:%M:%S"))
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            self.fila.put(self.format(record))
+        except Exception:
+            self.handleError(record)
+
+    def drenar(self, maximo: int = 500) -> List[str]:
+        linhas = []
+        try:
+            while len(linhas) < maximo:
+                linhas.append(self.fila.get_nowait())
+        except queue.Empty:
+            pass
+        return linhas
+
+
+def configurar_logging(diretorio: Optional[str] = 'logs', console: bool = False,
+                       handlers_extras: Sequence[logging.Handler] = ()) -> logging.Logger:
+    # As threads de trabalho só colocam o registro numa fila (QueueHandler);
+    # a escrita nos destinos acontece na thread do QueueListener.
+    global _listener
+    encerrar_logging()
+
+    destinos = list(handlers_extras)
+
+    if diretorio:
+        os.makedirs(diretorio, exist_ok=True)
+
+        arquivo_texto = logging.handlers.RotatingFileHandler(
+            os.path.join(diretorio, 'tabuleiro.log'), maxBytes=1_000_000, backupCount=5, encoding='utf-8')
+        arquivo_texto.setLevel(logging.INFO)
+        arquivo_texto.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+        destinos.append(arquivo_texto)
+
+        arquivo_json = logging.handlers.RotatingFileHandler(
+            os.path.join(diretorio, 'tabuleiro.jsonl'), maxBytes=5_000_000, backupCount=5, encoding='utf-8')
+        arquivo_json.setLevel(logging.DEBUG)
+        arquivo_json.setFormatter(FormatadorJSON())
+        destinos.append(arquivo_json)
+
+    if console:
+        terminal = logging.StreamHandler()
+        terminal.setLevel(logging.INFO)
+        terminal.setFormatter(logging.Formatter("[%(asctime)s] %(message)s", datefmt="%H:%M:%S"))
+        destinos.append(terminal)
+
+    fila = queue.SimpleQueue()
+    logger = logging.getLogger(NOME_LOGGER)
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    logger.handlers = [logging.handlers.QueueHandler(fila)]
+
+    _listener = logging.handlers.QueueListener(fila, *destinos, respect_handler_level=True)
+    _listener.start()
+    return logger
+
+
+def encerrar_logging():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
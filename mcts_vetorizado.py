@@ -0,0 +1,378 @@
+import argparse
+import json
+import math
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from connect4_bitboard import (COLUNAS, FUNDO_COLUNA, MASCARA_COLUNA, TABULEIRO_CHEIO, EstadoConnect4,
+                               carregar_referencia, entradas_modelo, rollout, tem_quatro)
+
+# MCTS (PUCT) com a árvore em arrays numpy pré-alocados, indexados pelo id do nó.
+# Os filhos de um nó ficam em ids consecutivos (primeiro_filho .. +num_filhos),
+# então a seleção é uma conta vetorizada sobre uma fatia. As folhas são juntadas
+# em lotes com perda virtual (cada descida pendente conta como uma derrota no
+# caminho, desviando as próximas) e avaliadas de uma vez: por um modelo torch
+# como o Model_Connect_4 dos notebooks ou, sem modelo, por rollouts aleatórios.
+#
+# Convenção de valores: soma[no] é do ponto de vista de quem jogou o lance que
+# levou ao nó, então o pai escolhe o filho de maior Q direto. Os avaliadores
+# devolvem o valor para o jogador da vez na folha, em [-1, 1].
+
+NOS_POR_SIMULACAO = COLUNAS
+
+# Sinais da retropropagação por tamanho de caminho: a folha recebe -v, o pai +v...
+_SINAIS = [np.array([(-1.0 if (k - i) % 2 == 0 else 1.0) for i in range(k + 1)]) for k in range(64)]
+
+
+class AvaliadorRollout:
+    # Sem rede: priors uniformes nos lances válidos e valor pela média de
+    # rollouts aleatórios em bitboard (o Node.simulate dos notebooks)
+    def __init__(self, rollouts: int = 1, semente: Optional[int] = None):
+        self.rollouts = rollouts
+        self.rng = random.Random(semente)
+
+    def avaliar(self, pecas1: np.ndarray, pecas2: np.ndarray,
+                jogadores: np.ndarray) -> Tuple[Optional[np.ndarray], np.ndarray]:
+        valores = np.empty(len(jogadores))
+        for k in range(len(jogadores)):
+            estado = EstadoConnect4(int(pecas1[k]), int(pecas2[k]))
+            jogador = int(jogadores[k])
+            soma = 0
+            for _ in range(self.rollouts):
+                soma += rollout(estado, jogador, self.rng)
+            valores[k] = soma * jogador / self.rollouts
+        return None, valores
+
+
+class AvaliadorModelo:
+    # Modelo torch com a entrada de 43 valores dos notebooks (Board_to_input).
+    # Saída única (Model_Connect_4, sigmoide = chance do jogador 1 vencer): priors
+    # uniformes e valor 2p-1 do ponto de vista do jogador da vez. Saída (logits,
+    # valor) estilo AlphaZero: priors pelo softmax e valor já do jogador da vez.
+    def __init__(self, modelo, device: str = 'cpu'):
+        import torch  # só quem usa modelo precisa do torch
+        self.torch = torch
+        self.device = device
+        self.modelo = modelo.to(device).eval()
+
+    def avaliar(self, pecas1: np.ndarray, pecas2: np.ndarray,
+                jogadores: np.ndarray) -> Tuple[Optional[np.ndarray], np.ndarray]:
+        torch = self.torch
+        entrada = torch.from_numpy(entradas_modelo(pecas1, pecas2, jogadores)).to(self.device)
+        with torch.inference_mode():
+            saida = self.modelo(entrada)
+        if isinstance(saida, tuple):
+            logits, valor = saida
+            priors = torch.softmax(logits.reshape(len(jogadores), -1), dim=1).float().cpu().numpy()
+            return priors, valor.reshape(-1).double().cpu().numpy()
+        p = saida.reshape(-1).double().cpu().numpy()
+        return None, (2 * p - 1) * jogadores
+
+
+class MCTSVetorizado:
+    # capacidade = nós pré-alocados; cada folha expandida ocupa até 7. Cheia, a
+    # árvore para de crescer e as folhas só são reavaliadas.
+    def __init__(self, avaliador=None, c: float = 1.5, lote: int = 64, capacidade: int = 200_000,
+                 perda_virtual: float = 1.0):
+        self.avaliador = avaliador or AvaliadorRollout()
+        self.c = c
+        self.lote = lote
+        self.capacidade = capacidade
+        self.perda_virtual = perda_virtual
+
+        self.pecas1 = np.zeros(capacidade, dtype=np.int64)
+        self.pecas2 = np.zeros(capacidade, dtype=np.int64)
+        self.jogador = np.zeros(capacidade, dtype=np.int8)       # da vez no nó
+        self.pai = np.full(capacidade, -1, dtype=np.int32)
+        self.acao = np.full(capacidade, -1, dtype=np.int8)
+        self.primeiro_filho = np.full(capacidade, -1, dtype=np.int32)
+        self.num_filhos = np.zeros(capacidade, dtype=np.int8)
+        self.visitas = np.zeros(capacidade)
+        self.soma = np.zeros(capacidade)
+        # Visitas e soma já com a perda virtual das descidas pendentes, mantidas
+        # a cada alteração para a seleção ler uma fatia de cada
+        self.visitas_efetivas = np.zeros(capacidade)
+        self.soma_efetiva = np.zeros(capacidade)
+        self.prior = np.zeros(capacidade)
+        self.terminal = np.zeros(capacidade, dtype=bool)
+        self.valor_terminal = np.zeros(capacidade)               # para o jogador da vez
+        self.pendente = np.zeros(capacidade, dtype=bool)
+        self.n_nos = 0
+
+        self.estatisticas_busca: Dict[str, float] = {}
+
+    # ---- Árvore ----
+
+    def reiniciar(self, estado: EstadoConnect4, jogador: int):
+        # Só zera o que a busca lê antes de escrever; os arrays são reaproveitados
+        n = self.n_nos
+        for array in (self.visitas, self.soma, self.visitas_efetivas, self.soma_efetiva):
+            array[:n] = 0
+        self.num_filhos[:n] = 0
+        self.terminal[:n] = False
+        self.pendente[:n] = False
+        self.n_nos = 1
+        self.pecas1[0] = estado.pecas1
+        self.pecas2[0] = estado.pecas2
+        self.jogador[0] = jogador
+        self.pai[0] = -1
+        self.acao[0] = -1
+        self.prior[0] = 1.0
+        vencedor = estado.vencedor()
+        if vencedor or estado.cheio():
+            self.terminal[0] = True
+            self.valor_terminal[0] = vencedor * jogador
+
+    def _expandir(self, no: int, priors: Optional[np.ndarray]) -> bool:
+        pecas1 = int(self.pecas1[no])
+        pecas2 = int(self.pecas2[no])
+        validos = EstadoConnect4(pecas1, pecas2).validos()
+        k = len(validos)
+        if self.n_nos + k > self.capacidade:
+            return False
+
+        primeiro = self.n_nos
+        fim = primeiro + k
+        jogador = int(self.jogador[no])
+        ocupadas = pecas1 | pecas2
+        lista1, lista2, terminais, valores = [], [], [], []
+        for coluna in validos:
+            bit = (ocupadas + FUNDO_COLUNA[coluna]) & MASCARA_COLUNA[coluna]
+            if jogador == 1:
+                minhas = pecas1 | bit
+                lista1.append(minhas)
+                lista2.append(pecas2)
+            else:
+                minhas = pecas2 | bit
+                lista1.append(pecas1)
+                lista2.append(minhas)
+            # Só quem acabou de jogar pode ter feito 4: o da vez no filho perdeu
+            if tem_quatro(minhas):
+                terminais.append(True)
+                valores.append(-1.0)
+            else:
+                terminais.append(ocupadas | bit == TABULEIRO_CHEIO)
+                valores.append(0.0)
+        self.pecas1[primeiro:fim] = lista1
+        self.pecas2[primeiro:fim] = lista2
+        self.terminal[primeiro:fim] = terminais
+        self.valor_terminal[primeiro:fim] = valores
+        self.jogador[primeiro:fim] = -jogador
+        self.pai[primeiro:fim] = no
+        self.acao[primeiro:fim] = validos
+
+        if priors is None:
+            self.prior[primeiro:fim] = 1.0 / k
+        else:
+            p = priors[list(validos)]
+            total = p.sum()
+            self.prior[primeiro:fim] = p / total if total > 0 else 1.0 / k
+        self.primeiro_filho[no] = primeiro
+        self.num_filhos[no] = k
+        self.n_nos += k
+        return True
+
+    def _descer(self) -> List[int]:
+        no = 0
+        caminho = [0]
+        c = self.c
+        while True:
+            k = self.num_filhos[no]
+            if k == 0:
+                return caminho
+            f = self.primeiro_filho[no]
+            fim = f + k
+            # PUCT: Q + c * P * sqrt(N pai) / (1 + N), Q = 0 nos filhos não visitados
+            n = self.visitas_efetivas[f:fim]
+            pontos = self.soma_efetiva[f:fim] / np.maximum(n, 1) + \
+                (c * math.sqrt(self.visitas_efetivas[no])) * self.prior[f:fim] / (n + 1)
+            no = f + int(pontos.argmax())
+            caminho.append(no)
+
+    def _aplicar_virtual(self, indices: np.ndarray):
+        self.visitas_efetivas[indices] += 1
+        self.soma_efetiva[indices] -= self.perda_virtual
+
+    def _retropropagar(self, indices: np.ndarray, valor: float, com_virtual: bool):
+        valores = _SINAIS[len(indices) - 1] * valor
+        self.soma[indices] += valores
+        self.visitas[indices] += 1
+        if com_virtual:
+            # A visita pendente vira a real: só troca a derrota virtual pelo valor
+            self.soma_efetiva[indices] += valores + self.perda_virtual
+        else:
+            self.soma_efetiva[indices] += valores
+            self.visitas_efetivas[indices] += 1
+
+    # ---- Busca ----
+
+    def buscar(self, estado: EstadoConnect4, jogador: int = 1, simulacoes: int = 800) -> np.ndarray:
+        # Distribuição de visitas dos lances da raiz (como MCTS.search dos notebooks)
+        inicio = time.perf_counter()
+        self.reiniciar(estado, jogador)
+        feitas = 0
+        lotes = 0
+        colisoes = 0
+        avaliadas = 0
+
+        while feitas < simulacoes:
+            if self.terminal[0]:
+                break
+            folhas: List[np.ndarray] = []
+            while len(folhas) < self.lote and feitas + len(folhas) < simulacoes:
+                caminho = np.array(self._descer())
+                folha = caminho[-1]
+                if self.terminal[folha]:
+                    self._retropropagar(caminho, self.valor_terminal[folha], False)
+                    feitas += 1
+                    continue
+                if self.pendente[folha]:
+                    # A perda virtual não desviou desta folha: avalia o que já juntou
+                    colisoes += 1
+                    break
+                self.pendente[folha] = True
+                self._aplicar_virtual(caminho)
+                folhas.append(caminho)
+            if not folhas:
+                continue
+
+            ids = np.array([caminho[-1] for caminho in folhas])
+            priors, valores = self.avaliador.avaliar(self.pecas1[ids], self.pecas2[ids],
+                                                     self.jogador[ids].astype(np.float32))
+            lotes += 1
+            avaliadas += len(folhas)
+            for k, caminho in enumerate(folhas):
+                folha = caminho[-1]
+                self._expandir(folha, None if priors is None else priors[k])
+                self.pendente[folha] = False
+                self._retropropagar(caminho, float(valores[k]), True)
+            feitas += len(folhas)
+
+        visitas = np.zeros(COLUNAS)
+        k = self.num_filhos[0]
+        if k:
+            f = self.primeiro_filho[0]
+            visitas[self.acao[f:f + k]] = self.visitas[f:f + k]
+        duracao = time.perf_counter() - inicio
+        self.estatisticas_busca = {
+            'simulacoes': feitas,
+            'segundos': duracao,
+            'simulacoes_por_segundo': feitas / duracao if duracao > 0 else 0.0,
+            'nos': self.n_nos,
+            'lotes': lotes,
+            'lote_medio': avaliadas / lotes if lotes else 0.0,
+            'colisoes': colisoes,
+        }
+        total = visitas.sum()
+        return visitas / total if total else visitas
+
+    def valores_raiz(self) -> np.ndarray:
+        # Q médio de cada lance da raiz, do ponto de vista de quem joga na raiz
+        valores = np.full(COLUNAS, np.nan)
+        k = self.num_filhos[0]
+        if k:
+            f = self.primeiro_filho[0]
+            valores[self.acao[f:f + k]] = self.soma[f:f + k] / np.maximum(self.visitas[f:f + k], 1)
+        return valores
+
+
+class MCTS:
+    # Mesma interface do MCTS do notebook AlphaZero: args = {'C', 'num_searches'}
+    # e opcionais 'batch_size', 'model' (torch) e 'device'. O estado é o do
+    # notebook em perspectiva neutra (jogador da vez = +1), objeto de
+    # connect4_bitboard ou qualquer um com board_state. O C aqui é o do PUCT,
+    # não o do UCB do notebook.
+    def __init__(self, game, args: dict):
+        self.game = game
+        self.args = args
+        avaliador = AvaliadorModelo(args['model'], args.get('device', 'cpu')) if args.get('model') is not None else None
+        self.motor = MCTSVetorizado(avaliador, c=args.get('C', 1.5), lote=args.get('batch_size', 64),
+                                    capacidade=args['num_searches'] * NOS_POR_SIMULACAO + 1)
+
+    def search(self, state) -> np.ndarray:
+        estado = getattr(state, 'estado', None)
+        if estado is None:
+            estado = EstadoConnect4.de_matriz(state.board_state)
+        return self.motor.buscar(estado, 1, self.args['num_searches'])
+
+
+# ---- Benchmark ----
+
+def medir_notebook(classe_jogo, simulacoes: int, buscas: int) -> Dict:
+    # MCTS original do notebook (Node com deepcopy, UCB em laço, rollouts)
+    MCTSNotebook = carregar_referencia(nome='MCTS')
+    mcts = MCTSNotebook(classe_jogo(), {'C': 1.41, 'num_searches': simulacoes})
+    inicio = time.perf_counter()
+    for _ in range(buscas):
+        mcts.search(classe_jogo())
+    duracao = time.perf_counter() - inicio
+    return {'simulacoes_por_segundo': simulacoes * buscas / duracao}
+
+
+def medir_vetorizado(avaliador, lote: int, simulacoes: int, buscas: int) -> Dict:
+    motor = MCTSVetorizado(avaliador, lote=lote, capacidade=simulacoes * NOS_POR_SIMULACAO + 1)
+    motor.buscar(EstadoConnect4(), 1, min(simulacoes, 64))  # aquecimento
+    total = 0
+    duracao = 0.0
+    lote_medio = 0.0
+    for _ in range(buscas):
+        motor.buscar(EstadoConnect4(), 1, simulacoes)
+        total += motor.estatisticas_busca['simulacoes']
+        duracao += motor.estatisticas_busca['segundos']
+        lote_medio += motor.estatisticas_busca['lote_medio'] / buscas
+    return {'simulacoes_por_segundo': total / duracao, 'lote_medio': lote_medio,
+            'bytes_por_no': sum(getattr(motor, nome).itemsize for nome in vars(motor)
+                                if isinstance(getattr(motor, nome), np.ndarray))}
+
+
+def carregar_modelo(caminho: Optional[str]):
+    # Model_Connect_4 com pesos aleatórios ou o layers3 pré-treinado
+    import modelos_connect4
+    if caminho:
+        return modelos_connect4.carregar_modelo(caminho, 'layers3')
+    return modelos_connect4.Model_Connect_4()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulações/s do MCTS: notebook x árvore em arrays")
+    parser.add_argument("--simulacoes", type=int, default=400, help="simulações por busca")
+    parser.add_argument("--buscas", type=int, default=3)
+    parser.add_argument("--lotes", type=int, nargs="+", default=[1, 32, 64, 128, 256])
+    parser.add_argument("--modelo", help="pesos do Model_Connect_4_layers3 (ex.: C4_pretrained_Model_v2.pth); "
+                                         "sem ele usa um Model_Connect_4 com pesos aleatórios")
+    parser.add_argument("--sem-modelo", action="store_true", help="só rollouts")
+    parser.add_argument("--json", help="grava os resultados neste arquivo")
+    args = parser.parse_args()
+
+    from connect4_bitboard import Connect_4
+    resultados = []
+
+    def registrar(caso: str, resultado: Dict):
+        resultado['caso'] = caso
+        resultados.append(resultado)
+        print(f"{caso:<34} {resultado['simulacoes_por_segundo']:>12.0f} sim/s")
+
+    registrar('notebook, Connect_4 do notebook', medir_notebook(carregar_referencia(), args.simulacoes, args.buscas))
+    registrar('notebook, Connect_4 bitboard', medir_notebook(Connect_4, args.simulacoes, args.buscas))
+    registrar('arrays, rollouts', medir_vetorizado(AvaliadorRollout(semente=0), 64, args.simulacoes, args.buscas))
+
+    if not args.sem_modelo:
+        try:
+            modelo = carregar_modelo(args.modelo)
+        except ImportError:
+            print("torch não instalado: casos com modelo pulados")
+        else:
+            avaliador = AvaliadorModelo(modelo)
+            for lote in args.lotes:
+                registrar(f'arrays, modelo, lote {lote}', medir_vetorizado(avaliador, lote, args.simulacoes, args.buscas))
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'data': time.strftime('%Y-%m-%dT%H:%M:%S'), 'resultados': resultados}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
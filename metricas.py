@@ -0,0 +1,199 @@
+import json
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional
+
+# Limites dos buckets em segundos: 1 us a ~8 s, dobrando (24 buckets + infinito).
+# Buckets fixos deixam observar() em um bisect e um incremento, sem alocação.
+LIMITES = tuple(1e-6 * 2 ** k for k in range(24))
+
+PREFIXO = 'tabuleiro'
+
+DESCRICOES = {
+    'espera_serial': "Tempo bloqueado esperando o primeiro byte de uma mensagem",
+    'decodificacao': "Leitura e decodificação de uma mensagem depois do primeiro byte",
+    'classificacao': "Classificação das casas (com filtro ou HMM quando ativos)",
+    'inferencia': "Detecção de lance a partir da classificação",
+    'frame_total': "Processamento completo de um frame no host",
+    'atualizacao_gui': "Redesenho dos tabuleiros na interface",
+    'lote_inferencia': "Execução do modelo para um lote do serviço de inferência",
+    'espera_inferencia': "Tempo de um pedido na fila do serviço de inferência até a avaliação",
+}
+
+
+class Histograma:
+    # Sem lock: incrementos concorrentes raros podem se perder, o que não muda
+    # os percentis; em troca observar() custa menos de um microssegundo
+    def __init__(self):
+        self.contagens = [0] * (len(LIMITES) + 1)
+        self.soma = 0.0
+        self.contagem = 0
+
+    def observar(self, segundos: float):
+        self.contagens[bisect_left(LIMITES, segundos)] += 1
+        self.soma += segundos
+        self.contagem += 1
+
+    def quantil(self, q: float) -> float:
+        # Limite superior do bucket que contém o quantil (estimativa conservadora)
+        if self.contagem == 0:
+            return 0.0
+        alvo = q * self.contagem
+        acumulado = 0
+        for limite, contagem in zip(LIMITES, self.contagens):
+            acumulado += contagem
+            if acumulado >= alvo:
+                return limite
+        return float('inf')
+
+    def resumo(self) -> dict:
+        return {
+            'n': self.contagem,
+            'media_ms': self.soma / self.contagem * 1000 if self.contagem else 0.0,
+            'p50_ms': self.quantil(0.5) * 1000,
+            'p99_ms': self.quantil(0.99) * 1000,
+        }
+
+
+class Metricas:
+    # Registro de um tabuleiro: histogramas de tempo e contadores.
+    # Com ativo=False as chamadas retornam na hora; pode ser trocado a qualquer momento.
+    def __init__(self, rotulos: Optional[Dict[str, str]] = None, ativo: bool = True):
+        self.rotulos = rotulos or {}
+        self.ativo = ativo
+        self.histogramas: Dict[str, Histograma] = {}
+        self.contadores: Dict[str, int] = {}
+        self.lock = threading.Lock()
+        self.inicio = time.time()
+
+    def observar(self, nome: str, segundos: float):
+        if not self.ativo:
+            return
+        histograma = self.histogramas.get(nome)
+        if histograma is None:
+            with self.lock:
+                histograma = self.histogramas.setdefault(nome, Histograma())
+        histograma.observar(segundos)
+
+    def incrementar(self, nome: str, quantidade: int = 1):
+        # Contadores de falha contam mesmo com as métricas desligadas
+        self.contadores[nome] = self.contadores.get(nome, 0) + quantidade
+
+    @contextmanager
+    def cronometro(self, nome: str):
+        if not self.ativo:
+            yield
+            return
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(nome, time.perf_counter() - inicio)
+
+    def zerar(self):
+        with self.lock:
+            self.histogramas.clear()
+            self.contadores.clear()
+            self.inicio = time.time()
+
+    def instantaneo(self) -> dict:
+        return {
+            'ativo': self.ativo,
+            'rotulos': self.rotulos,
+            'histogramas': {nome: h.resumo() for nome, h in list(self.histogramas.items())},
+            'contadores': dict(self.contadores),
+        }
+
+
+def _rotulos_texto(rotulos: Dict[str, str], extra: str = '') -> str:
+    pares = ['%s="%s"' % (chave, str(valor).replace('\\', '\\\\').replace('"', '\\"')) for chave, valor in rotulos.items()]
+    if extra:
+        pares.append(extra)
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def texto_prometheus(registros: Iterable[Metricas]) -> str:
+    # Formato de exposição em texto do Prometheus; um HELP/TYPE por métrica,
+    # com uma série por tabuleiro (rótulos de cada registro)
+    registros = list(registros)
+    linhas: List[str] = []
+
+    nomes = sorted({nome for r in registros for nome in r.histogramas})
+    for nome in nomes:
+        metrica = f"{PREFIXO}_{nome}_segundos"
+        linhas.append(f"# HELP {metrica} {DESCRICOES.get(nome, nome)}")
+        linhas.append(f"# TYPE {metrica} histogram")
+        for registro in registros:
+            histograma = registro.histogramas.get(nome)
+            if histograma is None:
+                continue
+            acumulado = 0
+            for limite, contagem in zip(LIMITES, histograma.contagens):
+                acumulado += contagem
+                le = 'le="%.6g"' % limite
+                linhas.append(f"{metrica}_bucket{_rotulos_texto(registro.rotulos, le)} {acumulado}")
+            le = 'le="+Inf"'
+            linhas.append(f"{metrica}_bucket{_rotulos_texto(registro.rotulos, le)} {histograma.contagem}")
+            linhas.append(f"{metrica}_sum{_rotulos_texto(registro.rotulos)} {histograma.soma:.9f}")
+            linhas.append(f"{metrica}_count{_rotulos_texto(registro.rotulos)} {histograma.contagem}")
+
+    nomes = sorted({nome for r in registros for nome in r.contadores})
+    for nome in nomes:
+        metrica = f"{PREFIXO}_{nome}_total"
+        linhas.append(f"# TYPE {metrica} counter")
+        for registro in registros:
+            if nome in registro.contadores:
+                linhas.append(f"{metrica}{_rotulos_texto(registro.rotulos)} {registro.contadores[nome]}")
+
+    return "\n".join(linhas) + "\n"
+
+
+class ServidorMetricas:
+    # HTTP local para coletores: GET /metrics (texto Prometheus) e /metrics.json;
+    # POST /ativo com corpo "1" ou "0" liga/desliga a coleta de tempos.
+    def __init__(self, registros: Callable[[], Iterable[Metricas]], porta: int = 9108, host: str = '127.0.0.1'):
+        self.registros = registros
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.startswith('/metrics.json'):
+                    corpo = json.dumps([r.instantaneo() for r in servidor.registros()], ensure_ascii=False)
+                    self._responder(200, corpo, 'application/json; charset=utf-8')
+                elif self.path.startswith('/metrics'):
+                    self._responder(200, texto_prometheus(servidor.registros()), 'text/plain; version=0.0.4; charset=utf-8')
+                else:
+                    self._responder(404, "não encontrado\n", 'text/plain; charset=utf-8')
+
+            def do_POST(self):
+                if not self.path.startswith('/ativo'):
+                    self._responder(404, "não encontrado\n", 'text/plain; charset=utf-8')
+                    return
+                tamanho = int(self.headers.get('Content-Length', 0))
+                ativo = self.rfile.read(tamanho).strip() not in (b'0', b'false', b'')
+                for registro in servidor.registros():
+                    registro.ativo = ativo
+                self._responder(200, f"ativo={int(ativo)}\n", 'text/plain; charset=utf-8')
+
+            def _responder(self, status: int, corpo: str, tipo: str):
+                dados = corpo.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', tipo)
+                self.send_header('Content-Length', str(len(dados)))
+                self.end_headers()
+                self.wfile.write(dados)
+
+            def log_message(self, formato, *args):
+                pass  # Sem uma linha de log por coleta
+
+        self.http = ThreadingHTTPServer((host, porta), Handler)
+        self.porta = self.http.server_address[1]
+        self.thread = threading.Thread(target=self.http.serve_forever, name="metricas-http", daemon=True)
+        self.thread.start()
+
+    def encerrar(self):
+        self.http.shutdown()
+        self.http.server_close()
@@ -0,0 +1,433 @@
+import argparse
+import random
+import time
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+
+from connect4_bitboard import (ALTURA, COLUNAS, FUNDO_COLUNA, LINHAS, MASCARA_COLUNA, EstadoConnect4,
+                               entradas_modelo, tem_quatro)
+
+# minimax e minimax_pretraining do notebook Connect_4_ML_V4 sobre o bitboard:
+# mesmos valores (1 = vitória do jogador 1, 0 = do jogador 2, 0,5 empate ou
+# sem vantagem), mesma ordem de lances, mesmos cortes alpha-beta e a mesma
+# booleana "End_Node". Os filhos são estados imutáveis, sem deepcopy de listas.
+#
+# Jogadores: 1 e -1 (o 1 e o 2 do notebook). A avaliação nas folhas recebe o
+# jogador da vez como 1/-1, a mesma codificação do treino (-player*2+3); o
+# notebook passava 1/2 nesse ponto.
+
+Avaliacao = Callable[[EstadoConnect4, int], float]
+
+
+def minimax(estado: EstadoConnect4, jogador: int, profundidade: int, avaliar: Optional[Avaliacao] = None,
+            alpha: float = 0.0, beta: float = 1.0,
+            rng: random.Random = random) -> Tuple[float, Optional[int], bool]:
+    # avaliar=None é o minimax_pretraining (folhas não terminais valem 0,5)
+    if tem_quatro(estado.pecas1):
+        return 1, None, True
+    if tem_quatro(estado.pecas2):
+        return 0, None, True
+    validos = estado.validos()
+    if not validos:
+        return 0.5, None, True
+    if profundidade == 0:
+        if avaliar is None:
+            return 0.5, None, False
+        return avaliar(estado, jogador), None, False
+
+    fim_de_jogo = True
+    melhor = validos[int(rng.random() * len(validos))]
+    if jogador == 1:  # maximiza
+        atual = 0
+        for lance in validos:
+            valor, _, terminal = minimax(estado.jogar(lance, 1), -1, profundidade - 1, avaliar, alpha, beta, rng)
+            if valor == 1:
+                return 1, lance, terminal
+            if valor > atual:
+                fim_de_jogo = False
+                atual = valor
+                melhor = lance
+            alpha = max(alpha, atual)
+            if beta <= alpha:
+                break
+    else:
+        atual = 1
+        for lance in validos:
+            valor, _, terminal = minimax(estado.jogar(lance, -1), 1, profundidade - 1, avaliar, alpha, beta, rng)
+            if valor == 0:
+                return 0, lance, terminal
+            if valor < atual:
+                fim_de_jogo = False
+                atual = valor
+                melhor = lance
+            beta = min(beta, atual)
+            if beta <= alpha:
+                break
+    return atual, melhor, fim_de_jogo
+
+
+def avaliacao_do_modelo(modelo) -> Avaliacao:
+    # Folha do minimax pelo modelo (uma posição por chamada, como no notebook)
+    import torch
+
+    def avaliar(estado: EstadoConnect4, jogador: int) -> float:
+        entrada = torch.from_numpy(entradas_modelo([estado.pecas1], [estado.pecas2], [jogador]))
+        with torch.inference_mode():
+            return modelo(entrada).item()
+    return avaliar
+
+
+# ---- Busca com tabela de transposição ----
+#
+# Negamax com os valores do notebook vistos pelo jogador da vez (v para o
+# jogador 1, 1 - v para o 2), janela alpha-beta em [0, 1]. A tabela de
+# transposição é endereçada por hash Zobrist (um número aleatório por casa e
+# jogador, mais um para o jogador da vez, combinados por XOR a cada lance),
+# tem tamanho fixo e guarda valor exato ou limite inferior/superior; numa
+# colisão de índice fica a entrada mais profunda, a não ser que seja de uma
+# busca anterior. Como as folhas também entram na tabela, cada posição passa
+# pelo modelo uma vez só. Ordem dos lances: o da tabela, os killers da ply, o
+# histórico de cortes e, no empate, do centro para as bordas.
+
+EXATO, INFERIOR, SUPERIOR = 0, 1, 2
+
+ORDEM_CENTRO = (3, 2, 4, 1, 5, 0, 6)
+BONUS_CENTRO = tuple(COLUNAS - ORDEM_CENTRO.index(c) for c in range(COLUNAS))
+
+# Valor que só depende de fins de jogo (4 em linha ou tabuleiro cheio) vale em
+# qualquer profundidade: entra na tabela com esta
+PROFUNDIDADE_PROVADA = COLUNAS * LINHAS + 1
+
+# Relógio consultado a cada tantos nós (perf_counter em todo nó custaria caro)
+INTERVALO_RELOGIO = 256
+
+
+class _TempoEsgotado(Exception):
+    pass
+
+
+@dataclass
+class ResultadoBusca:
+    valor: float            # do ponto de vista do jogador 1, como no notebook
+    lance: Optional[int]
+    terminal: bool          # resultado provado (vitória, derrota ou empate forçado)
+    profundidade: int
+    nos: int
+    segundos: float
+    acertos_tt: float       # fração das consultas que acharam a posição na tabela
+
+    @property
+    def nos_por_segundo(self) -> float:
+        return self.nos / self.segundos if self.segundos > 0 else 0.0
+
+    def como_notebook(self) -> Tuple[float, Optional[int], bool]:
+        return self.valor, self.lance, self.terminal
+
+
+class BuscaMinimax:
+    # tamanho_tt: entradas da tabela (potência de 2); a tabela e o histórico
+    # seguem de um lance para o outro da mesma partida
+    def __init__(self, avaliar: Optional[Avaliacao] = None, tamanho_tt: int = 1 << 20, semente: int = 0):
+        self.avaliar = avaliar
+        rng = random.Random(semente)
+        self.zobrist = {j: [rng.getrandbits(64) for _ in range(COLUNAS * ALTURA)] for j in (1, -1)}
+        self.zobrist_vez = rng.getrandbits(64)
+
+        bits = max(1, (tamanho_tt - 1).bit_length())
+        self.mascara_tt = (1 << bits) - 1
+        tamanho = 1 << bits
+        self.tt_chave = [0] * tamanho
+        self.tt_profundidade = [-1] * tamanho
+        self.tt_valor = [0.0] * tamanho
+        self.tt_tipo = [EXATO] * tamanho
+        self.tt_lance = [-1] * tamanho
+        self.tt_geracao = [0] * tamanho
+        self.geracao = 0
+
+        self.killers: List[List[int]] = [[-1, -1] for _ in range(COLUNAS * LINHAS + 1)]
+        self.historico = {1: [0] * COLUNAS, -1: [0] * COLUNAS}
+        self.nos = 0
+        self.consultas_tt = 0
+        self.acertos_tt = 0
+        self.prazo = float('inf')
+
+    def hash(self, estado: EstadoConnect4, jogador: int) -> int:
+        h = self.zobrist_vez if jogador == -1 else 0
+        for pecas, chaves in ((estado.pecas1, self.zobrist[1]), (estado.pecas2, self.zobrist[-1])):
+            while pecas:
+                bit = pecas & -pecas
+                h ^= chaves[bit.bit_length() - 1]
+                pecas ^= bit
+        return h
+
+    def limpar(self):
+        n = self.mascara_tt + 1
+        self.tt_chave = [0] * n
+        self.tt_profundidade = [-1] * n
+        self.killers = [[-1, -1] for _ in range(COLUNAS * LINHAS + 1)]
+        self.historico = {1: [0] * COLUNAS, -1: [0] * COLUNAS}
+
+    def _ordenar(self, validos: Tuple[int, ...], jogador: int, ply: int, lance_tt: int) -> List[int]:
+        killers = self.killers[ply]
+        historico = self.historico[jogador]
+
+        def prioridade(c: int) -> float:
+            if c == lance_tt:
+                return 1e12
+            if c == killers[0]:
+                return 1e11
+            if c == killers[1]:
+                return 1e10
+            return historico[c] * 8 + BONUS_CENTRO[c]
+        return sorted(validos, key=prioridade, reverse=True)
+
+    def _negamax(self, estado: EstadoConnect4, jogador: int, h: int, profundidade: int,
+                 alpha: float, beta: float, ply: int) -> Tuple[float, int, bool]:
+        # Devolve (valor, lance, provado); provado = o valor (ou limite) veio só de
+        # fins de jogo, nunca da avaliação heurística
+        self.nos += 1
+        if self.nos % INTERVALO_RELOGIO == 0 and time.perf_counter() > self.prazo:
+            raise _TempoEsgotado()
+
+        # Só quem acabou de jogar pode ter feito 4
+        if tem_quatro(estado.pecas2 if jogador == 1 else estado.pecas1):
+            return 0.0, -1, True
+        validos = estado.validos()
+        if not validos:
+            return 0.5, -1, True
+
+        indice = h & self.mascara_tt
+        lance_tt = -1
+        self.consultas_tt += 1
+        if self.tt_chave[indice] == h and self.tt_profundidade[indice] >= 0:
+            self.acertos_tt += 1
+            lance_tt = self.tt_lance[indice]
+            if self.tt_profundidade[indice] >= profundidade:
+                valor, tipo = self.tt_valor[indice], self.tt_tipo[indice]
+                if tipo == EXATO or (tipo == INFERIOR and valor >= beta) or (tipo == SUPERIOR and valor <= alpha):
+                    return valor, lance_tt, self.tt_profundidade[indice] == PROFUNDIDADE_PROVADA
+
+        if profundidade == 0:
+            if self.avaliar is None:
+                valor = 0.5
+            else:
+                p = self.avaliar(estado, jogador)
+                valor = p if jogador == 1 else 1 - p
+            self._guardar(indice, h, 0, valor, EXATO, -1)
+            return valor, -1, False
+
+        alpha_inicial = alpha
+        melhor_valor, melhor_lance = -1.0, -1
+        provado = True
+        ocupadas = estado.pecas1 | estado.pecas2
+        chaves = self.zobrist[jogador]
+        for lance in self._ordenar(validos, jogador, ply, lance_tt):
+            bit = (ocupadas + FUNDO_COLUNA[lance]) & MASCARA_COLUNA[lance]
+            if jogador == 1:
+                filho = EstadoConnect4(estado.pecas1 | bit, estado.pecas2)
+            else:
+                filho = EstadoConnect4(estado.pecas1, estado.pecas2 | bit)
+            h_filho = h ^ chaves[bit.bit_length() - 1] ^ self.zobrist_vez
+            valor_filho, _, filho_provado = self._negamax(filho, -jogador, h_filho, profundidade - 1,
+                                                          1.0 - beta, 1.0 - alpha, ply + 1)
+            valor = 1.0 - valor_filho
+            provado = provado and filho_provado
+            if valor > melhor_valor:
+                melhor_valor, melhor_lance = valor, lance
+            if valor > alpha:
+                alpha = valor
+            if alpha >= beta:
+                killers = self.killers[ply]
+                if killers[0] != lance:
+                    killers[1], killers[0] = killers[0], lance
+                self.historico[jogador][lance] += profundidade * profundidade
+                break
+
+        if melhor_valor <= alpha_inicial:
+            tipo = SUPERIOR
+        elif melhor_valor >= beta:
+            tipo = INFERIOR
+        else:
+            tipo = EXATO
+        self._guardar(indice, h, PROFUNDIDADE_PROVADA if provado else profundidade, melhor_valor, tipo, melhor_lance)
+        return melhor_valor, melhor_lance, provado
+
+    def _guardar(self, indice: int, h: int, profundidade: int, valor: float, tipo: int, lance: int):
+        # Prefere a mais profunda; entradas de buscas anteriores sempre cedem o lugar
+        if (self.tt_geracao[indice] == self.geracao and self.tt_chave[indice] != h
+                and self.tt_profundidade[indice] > profundidade):
+            return
+        self.tt_chave[indice] = h
+        self.tt_profundidade[indice] = profundidade
+        self.tt_valor[indice] = valor
+        self.tt_tipo[indice] = tipo
+        self.tt_lance[indice] = lance
+        self.tt_geracao[indice] = self.geracao
+
+    def buscar(self, estado: EstadoConnect4, jogador: int, tempo: Optional[float] = None,
+               profundidade_maxima: int = COLUNAS * LINHAS) -> ResultadoBusca:
+        # Aprofundamento iterativo: profundidade 1, 2, ... até acabar o tempo, a
+        # profundidade máxima ou o resultado estar provado. Fica o resultado da
+        # última profundidade completa (a primeira sempre completa).
+        inicio = time.perf_counter()
+        self.geracao += 1
+        self.nos = self.consultas_tt = self.acertos_tt = 0
+        self.prazo = float('inf')
+        restantes = COLUNAS * LINHAS - estado.pecas_jogadas()
+        h = self.hash(estado, jogador)
+
+        valor, lance, completa, provado = 0.5, None, 0, False
+        for profundidade in range(1, max(1, min(profundidade_maxima, restantes)) + 1):
+            try:
+                v, melhor, provado = self._negamax(estado, jogador, h, profundidade, 0.0, 1.0, 0)
+            except _TempoEsgotado:
+                break
+            valor, lance, completa = v, (melhor if melhor >= 0 else None), profundidade
+            if tempo is not None:
+                self.prazo = inicio + tempo
+                if time.perf_counter() > self.prazo:
+                    break
+            if provado:
+                break
+
+        duracao = time.perf_counter() - inicio
+        if lance is None and estado.validos():
+            lance = estado.validos()[0]
+        provado = provado or completa >= restantes
+        return ResultadoBusca(
+            valor=valor if jogador == 1 else 1.0 - valor,
+            lance=lance,
+            terminal=provado,
+            profundidade=completa,
+            nos=self.nos,
+            segundos=duracao,
+            acertos_tt=self.acertos_tt / self.consultas_tt if self.consultas_tt else 0.0,
+        )
+
+
+# ---- play_against_model e model_test com tempo por lance ----
+
+SIMBOLOS = {1: 'X', -1: 'O', 0: '.'}
+
+
+def imprimir_tabuleiro(estado: EstadoConnect4):
+    for linha in estado.matriz(dtype=np.int8):
+        print(' '.join(SIMBOLOS[int(v)] for v in linha))
+    print(' '.join(str(c) for c in range(COLUNAS)))
+
+
+def play_against_model(modelo, tempo_por_lance: float = 1.0, jogador_humano: int = 2):
+    # O play_against_model do notebook com BuscaMinimax: o modelo responde em
+    # até tempo_por_lance segundos, com a profundidade que couber
+    busca = BuscaMinimax(avaliacao_do_modelo(modelo) if modelo is not None else None)
+    humano = 1 if jogador_humano == 1 else -1
+    while input('New game? Y/N:') in ('y', 'Y'):
+        busca.limpar()
+        estado = EstadoConnect4()
+        jogador = 1
+        while estado.validos() and not estado.vencedor():
+            if jogador == humano:
+                try:
+                    lance = int(input('Your move:'))
+                except ValueError:
+                    lance = -1
+                if not estado.valido(lance):
+                    print('Invalid move')
+                    continue
+            else:
+                resultado = busca.buscar(estado, jogador, tempo_por_lance)
+                lance = resultado.lance
+                print(f"{resultado.valor:.3f} Model' move: {lance} (profundidade {resultado.profundidade}, "
+                      f"{resultado.nos_por_segundo:.0f} nós/s, TT {resultado.acertos_tt:.0%})")
+            estado = estado.jogar(lance, jogador)
+            imprimir_tabuleiro(estado)
+            jogador = -jogador
+
+        vencedor = estado.vencedor()
+        if vencedor == humano:
+            print('You won!')
+        elif vencedor:
+            print('The model won')
+        else:
+            print('Draw')
+
+
+def model_test(modelo, partidas: int, tempo_por_lance: float = 0.05, profundidade_maxima: int = 42,
+               semente: int = 0) -> Tuple[float, float, float, float]:
+    # Mesmas quatro taxas do model_test do notebook, com as posições rotuladas
+    # pela busca sem modelo (o minimax_pretraining) limitada a tempo_por_lance
+    import torch
+    from autojogo import jogar_partida  # autojogo importa este módulo
+
+    busca = BuscaMinimax()
+    rng = random.Random(semente)
+    estatisticas = {'lances': 0, 'nos': 0, 'segundos': 0.0, 'maior_s': 0.0, 'acertos': 0.0}
+
+    def rotular(estado: EstadoConnect4, jogador: int):
+        resultado = busca.buscar(estado, jogador, tempo_por_lance, profundidade_maxima)
+        estatisticas['lances'] += 1
+        estatisticas['nos'] += resultado.nos
+        estatisticas['segundos'] += resultado.segundos
+        estatisticas['maior_s'] = max(estatisticas['maior_s'], resultado.segundos)
+        estatisticas['acertos'] += resultado.acertos_tt
+        # Sem modelo os valores são 0, 0,5 ou 1, como no notebook
+        return resultado.como_notebook()
+
+    jogos = [jogar_partida(None, 0, 0.5, rng, rotular) for _ in range(partidas)]
+    pecas1 = [p for jogo in jogos for p in jogo[0]]
+    pecas2 = [p for jogo in jogos for p in jogo[1]]
+    jogadores = [j for jogo in jogos for j in jogo[2]]
+    alvos = np.array([a for jogo in jogos for a in jogo[3]])
+    with torch.inference_mode():
+        previsto = modelo(torch.from_numpy(entradas_modelo(pecas1, pecas2, jogadores))).reshape(-1).numpy()
+
+    lances = max(estatisticas['lances'], 1)
+    print(f"{lances} lances rotulados: {estatisticas['nos'] / max(estatisticas['segundos'], 1e-9):.0f} nós/s, "
+          f"TT {estatisticas['acertos'] / lances:.0%}, maior tempo por lance {estatisticas['maior_s'] * 1000:.0f} ms")
+
+    perto = np.abs(alvos - previsto) < 0.25
+    meio, um, zero = alvos == 0.5, alvos == 1, alvos == 0
+    lados = (um & (previsto > 0.5)).sum() + (zero & (previsto < 0.5)).sum()
+    return (perto[meio].mean() if meio.any() else 0.0,
+            perto[um].mean() if um.any() else 0.0,
+            perto[zero].mean() if zero.any() else 0.0,
+            lados / (um.sum() + zero.sum()) if (um | zero).any() else 0.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Minimax do Connect-4 com tabela de transposição e tempo por lance")
+    parser.add_argument("--tempo", type=float, default=1.0, help="segundos por lance")
+    parser.add_argument("--modelo", help="pesos do Model_Connect_4_layers3 (ex.: C4_pretrained_Model_v2.pth)")
+    parser.add_argument("--jogar", type=int, choices=[1, 2], help="jogar contra o modelo como jogador 1 ou 2")
+    parser.add_argument("--testar", type=int, default=0, help="model_test com esta quantidade de partidas")
+    parser.add_argument("--comparar", type=int, default=0,
+                        help="profundidade para comparar com o minimax do notebook na posição inicial")
+    args = parser.parse_args()
+
+    modelo = None
+    if args.modelo:
+        import modelos_connect4
+        modelo = modelos_connect4.carregar_modelo(args.modelo)
+
+    if args.comparar:
+        inicio = time.perf_counter()
+        valor, lance, _ = minimax(EstadoConnect4(), 1, args.comparar)
+        duracao = time.perf_counter() - inicio
+        print(f"minimax profundidade {args.comparar}: valor {valor}, lance {lance}, {duracao * 1000:.0f} ms")
+        busca = BuscaMinimax(avaliacao_do_modelo(modelo) if modelo is not None else None)
+        r = busca.buscar(EstadoConnect4(), 1, profundidade_maxima=args.comparar)
+        print(f"BuscaMinimax profundidade {r.profundidade}: valor {r.valor}, lance {r.lance}, "
+              f"{r.segundos * 1000:.0f} ms, {r.nos} nós, {r.nos_por_segundo:.0f} nós/s, TT {r.acertos_tt:.0%}")
+
+    if args.testar:
+        if modelo is None:
+            parser.error("--testar precisa de --modelo")
+        print(model_test(modelo, args.testar, args.tempo))
+    if args.jogar:
+        play_against_model(modelo, args.tempo, args.jogar)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+import torch
+from torch import nn
+
+from connect4_bitboard import COLUNAS, LINHAS
+
+# Modelos de avaliação do Connect-4 do notebook Connect_4_ML_V4, para poderem
+# ser importados pelos processos de autojogo e pelo serviço de inferência.
+# Entrada: as 42 casas (+1/-1/0, linha 0 em cima) e o jogador da vez (1 ou -1);
+# saída: sigmoide = chance do jogador 1 vencer (0,5 empate).
+
+ENTRADAS = LINHAS * COLUNAS + 1
+
+
+class Model_Connect_4(nn.Module):
+    # Quatro camadas (43 -> 100 -> 100 -> 100 -> 1)
+    def __init__(self):
+        super().__init__()
+        self.layer_1 = nn.Linear(in_features=ENTRADAS, out_features=100)
+        self.layer_2 = nn.Linear(in_features=100, out_features=100)
+        self.layer_3 = nn.Linear(in_features=100, out_features=100)
+        self.layer_4 = nn.Linear(in_features=100, out_features=1)
+        self.relu = nn.ReLU()
+        self.sigmoid = nn.Sigmoid()
+
+    def forward(self, x):
+        return torch.squeeze(self.sigmoid(self.layer_4(self.relu(self.layer_3(self.relu(self.layer_2(self.relu(self.layer_1(x)))))))))
+
+
+class Model_Connect_4_layers3(nn.Module):
+    # Três camadas (43 -> 100 -> 100 -> 1); é a arquitetura do C4_pretrained_Model_v2.pth
+    def __init__(self):
+        super().__init__()
+        self.layer_1 = nn.Linear(in_features=ENTRADAS, out_features=100)
+        self.layer_2 = nn.Linear(in_features=100, out_features=100)
+        self.layer_3 = nn.Linear(in_features=100, out_features=1)
+        self.relu = nn.ReLU()
+        self.sigmoid = nn.Sigmoid()
+
+    def forward(self, x):
+        return torch.squeeze(self.sigmoid(self.layer_3(self.relu(self.layer_2(self.relu(self.layer_1(x)))))))
+
+
+MODELOS = {
+    'layers4': Model_Connect_4,
+    'layers3': Model_Connect_4_layers3,
+}
+
+
+def carregar_modelo(caminho: str, arquitetura: str = 'layers3', device: str = 'cpu') -> nn.Module:
+    modelo = MODELOS[arquitetura]()
+    modelo.load_state_dict(torch.load(caminho, map_location=device))
+    return modelo.to(device).eval()
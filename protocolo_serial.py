@@ -0,0 +1,206 @@
+import binascii
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+
+# Frame binário (versão 1), todos os campos little-endian:
+#   [0xA5 0x5A] [versão u8] [linhas u8] [colunas u8] [sequência u16]
+#   [linhas*colunas leituras u16] [CRC-16/CCITT u16]
+# O CRC (poly 0x1021, início 0xFFFF) cobre da versão até o fim das leituras.
+SYNC = b"\xA5\x5A"
+VERSAO_BINARIA = 1
+TAMANHO_CABECALHO = 7
+TAMANHO_CRC = 2
+
+MODO_ASCII = "ASCII"
+MODO_BINARIO = "BIN1"
+
+# Em modo binário, "linhas" maiores que isto são lixo entre frames
+MAXIMO_LINHA = 512
+
+
+def crc16_ccitt(dados, crc: int = 0xFFFF) -> int:
+    # binascii.crc_hqx é o CRC-CCITT não refletido, implementado em C
+    return binascii.crc_hqx(dados, crc)
+
+
+def tamanho_frame(linhas: int, colunas: int) -> int:
+    return TAMANHO_CABECALHO + 2 * linhas * colunas + TAMANHO_CRC
+
+
+def montar_frame_binario(matriz: np.ndarray, sequencia: int) -> bytes:
+    # Usado pelo simulador e pelos testes de bancada; o Arduino monta o mesmo frame
+    linhas, colunas = matriz.shape
+    corpo = bytes([VERSAO_BINARIA, linhas, colunas]) + int(sequencia & 0xFFFF).to_bytes(2, 'little')
+    corpo += np.ascontiguousarray(matriz, dtype='<u2').tobytes()
+    return SYNC + corpo + crc16_ccitt(corpo).to_bytes(2, 'little')
+
+
+def decodificar_ascii(linha: str, linhas: int, colunas: int) -> np.ndarray:
+    dados_str = linha.replace("DADOS:", "")
+    lista_valores = [int(x) for x in dados_str.split(",")]
+    return np.array(lista_valores).reshape(linhas, colunas)
+
+
+class ParserFrames:
+    # Lê frames direto num buffer pré-alocado; a matriz devolvida é uma visão
+    # desse buffer e é sobrescrita no próximo frame (copie se precisar guardar).
+    # Em modo binário (BIN1 negociado) nada vai para readline: o parser procura
+    # A5 5A byte a byte e monta as linhas de texto (respostas de comando) só com
+    # bytes imprimíveis. Um frame inválido devolve o corpo para "sobra", que é
+    # reexaminada a partir do byte seguinte ao SYNC ruim antes de ler a porta.
+    def __init__(self, linhas: int = 3, colunas: int = 3):
+        self.linhas = linhas
+        self.colunas = colunas
+        self.tamanho = tamanho_frame(linhas, colunas)
+
+        self.buffer = bytearray(self.tamanho)
+        self.buffer[0:2] = SYNC
+        self.mv = memoryview(self.buffer)
+        self.mv_corpo = self.mv[2:]
+        self.mv_crc = self.mv[2:self.tamanho - TAMANHO_CRC]
+
+        self.matriz = np.frombuffer(self.buffer, dtype='<u2', count=linhas * colunas,
+                                    offset=TAMANHO_CABECALHO).reshape(linhas, colunas)
+
+        self.binario = False
+        self.sobra = bytearray()
+        self.linha = bytearray()
+
+        self.sequencia = -1
+        self.frames_validos = 0
+        self.frames_invalidos = 0
+        self.bytes_descartados = 0
+        self.inicio_mensagem = 0.0
+        self.frames_perdidos = 0
+
+    def definir_binario(self, ativo: bool):
+        self.binario = ativo
+        self.sobra.clear()
+        self.linha.clear()
+
+    def _ler_byte(self, ser) -> int:
+        # -1 em timeout
+        if self.sobra:
+            return self.sobra.pop(0)
+        b = ser.read(1)
+        return b[0] if b else -1
+
+    def _frame_invalido(self, lidos: int):
+        self.frames_invalidos += 1
+        if self.binario:
+            self.sobra[:0] = self.mv_corpo[:lidos]
+
+    def ler_frame_binario(self, ser) -> Optional[np.ndarray]:
+        # Chamado depois que o SYNC já foi consumido da porta
+        lidos = 0
+        restante = len(self.mv_corpo)
+        if self.sobra:
+            lidos = min(len(self.sobra), restante)
+            self.mv_corpo[:lidos] = self.sobra[:lidos]
+            del self.sobra[:lidos]
+        while lidos < restante:
+            n = ser.readinto(self.mv_corpo[lidos:] if lidos else self.mv_corpo)
+            if not n:
+                # Frame cortado por timeout
+                self._frame_invalido(lidos)
+                return None
+            lidos += n
+
+        versao, linhas, colunas = self.buffer[2], self.buffer[3], self.buffer[4]
+        if versao != VERSAO_BINARIA or linhas != self.linhas or colunas != self.colunas:
+            self._frame_invalido(lidos)
+            return None
+
+        crc_recebido = self.buffer[-2] | (self.buffer[-1] << 8)
+        if crc16_ccitt(self.mv_crc) != crc_recebido:
+            self._frame_invalido(lidos)
+            return None
+
+        sequencia = self.buffer[5] | (self.buffer[6] << 8)
+        if self.sequencia >= 0:
+            self.frames_perdidos += (sequencia - self.sequencia - 1) & 0xFFFF
+        self.sequencia = sequencia
+        self.frames_validos += 1
+        return self.matriz
+
+    def ler_mensagem(self, ser) -> Optional[Tuple[str, object]]:
+        # Retorna ('DADOS', matriz) para frames (binários ou ASCII),
+        # ('LINHA', texto) para as demais respostas, ou None em timeout.
+        if self.binario:
+            return self._ler_mensagem_binaria(ser)
+
+        primeiro = ser.read(1)
+        if not primeiro:
+            return None
+        # Marca o fim da espera pela porta: daqui em diante é leitura/decodificação
+        self.inicio_mensagem = time.perf_counter()
+
+        if primeiro == SYNC[:1]:
+            segundo = ser.read(1)
+            if segundo == SYNC[1:]:
+                matriz = self.ler_frame_binario(ser)
+                return ('DADOS', matriz) if matriz is not None else None
+            primeiro += segundo
+
+        return self._interpretar_linha(primeiro + ser.readline())
+
+    def _ler_mensagem_binaria(self, ser) -> Optional[Tuple[str, object]]:
+        linha = self.linha
+        b = self._ler_byte(ser)
+        if b < 0:
+            return None
+        self.inicio_mensagem = time.perf_counter()
+        while b >= 0:
+            if b == 0xA5:
+                seguinte = self._ler_byte(ser)
+                if seguinte == 0x5A:
+                    self.bytes_descartados += len(linha)
+                    linha.clear()
+                    matriz = self.ler_frame_binario(ser)
+                    return ('DADOS', matriz) if matriz is not None else None
+                if seguinte < 0:
+                    # Timeout entre A5 e o próximo byte: o A5 é reexaminado depois
+                    self.sobra.append(b)
+                    return None
+                # A5 solto: lixo, e o byte seguinte é examinado de novo
+                self.bytes_descartados += len(linha) + 1
+                linha.clear()
+                b = seguinte
+                continue
+            if b == 0x0A:
+                if linha:
+                    mensagem = self._interpretar_linha(linha)
+                    linha.clear()
+                    if mensagem is not None:
+                        return mensagem
+            elif b >= 0x20 or b in (0x09, 0x0D):
+                # Texto (UTF-8 incluído); as leituras u16 têm byte alto 0-3 e
+                # cortam qualquer "linha" montada com pedaços de frame
+                linha.append(b)
+                if len(linha) > MAXIMO_LINHA:
+                    self.bytes_descartados += len(linha)
+                    linha.clear()
+            else:
+                self.bytes_descartados += len(linha) + 1
+                linha.clear()
+            b = self._ler_byte(ser)
+        # Timeout no meio de uma linha: o que já chegou fica em self.linha
+        return None
+
+    def _interpretar_linha(self, dados) -> Optional[Tuple[str, object]]:
+        linha = bytes(dados).decode('utf-8', errors='ignore').strip()
+        if not linha:
+            return None
+
+        if linha.startswith("DADOS:"):
+            try:
+                valores = decodificar_ascii(linha, self.linhas, self.colunas)
+            except ValueError:
+                return ('LINHA', linha)
+            self.matriz[...] = valores
+            self.frames_validos += 1
+            return ('DADOS', self.matriz)
+
+        return ('LINHA', linha)
@@ -0,0 +1,157 @@
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from tabela_transicoes import Codigo, TabelaTransicoes
+
+# Ordem das classes igual à do board_engine: 0 = vazio, 1 = branco, 2 = preto
+CLASSES_CLUSTER = ('vazio', 'branco', 'preto')
+
+
+class ModeloSensores:
+    # Verossimilhança de cada leitura dada a classe da casa: gaussiana com média e
+    # desvio do cluster da calibração, escalada pelo ganho do LDR da casa.
+    # O z² é limitado para que uma sombra de mão (leitura fora de todos os clusters)
+    # pese igual em todas as hipóteses em vez de decidir sozinha.
+    def __init__(self, cluster_stats: Dict, ganhos: Optional[np.ndarray] = None, z2_maximo: float = 25.0):
+        medias = np.array([cluster_stats[c]['media'] for c in CLASSES_CLUSTER], dtype=float)
+        desvios = np.array([max(cluster_stats[c].get('desvio', 0.0), 1.0) for c in CLASSES_CLUSTER])
+        ganhos = np.ones((1, 1)) if ganhos is None else np.asarray(ganhos, dtype=float)
+
+        self.medias = medias[:, None, None] * ganhos[None]
+        self.desvios = desvios[:, None, None] * ganhos[None]
+        self.log_desvios = np.log(self.desvios)
+        self.z2_maximo = z2_maximo
+
+    def log_verossimilhancas(self, matriz: np.ndarray) -> np.ndarray:
+        # shape (3, linhas, colunas): log p(leitura | classe) por casa
+        z2 = ((matriz[None] - self.medias) / self.desvios) ** 2
+        return -0.5 * np.minimum(z2, self.z2_maximo) - self.log_desvios
+
+    def classes_provaveis(self, matriz: np.ndarray) -> np.ndarray:
+        # Classe mais próxima (em z, sem limite) de cada casa, achatada
+        return (((matriz[None] - self.medias) / self.desvios) ** 2).reshape(3, -1).argmin(axis=0)
+
+
+class RastreadorHMM:
+    # Filtro forward sobre os estados ocultos "posição atual" e "posição após
+    # cada lance legal do lado que joga" (o feixe). A cada frame:
+    #   alfa_0 <- logaddexp(alfa_0 + log(1 - p), soma(alfa_k) + log(p)) + ll_0
+    #   alfa_k <- logaddexp(alfa_k + log(1 - p), alfa_0 + log(p / N)) + ll_k
+    # (p = chance de um lance por frame; a peça volta à origem com a mesma chance)
+    # e ll_k sai de ll_0 somando só as casas que o lance k altera (duas num lance
+    # simples, três no en passant, quatro no roque).
+    # Lances que os sensores não distinguem (promoções) formam um só estado.
+    # Quando a posterior de um estado passa de limiar_confianca e a leitura do
+    # frame não contradiz nenhuma casa dele, seus lances são confirmados com essa
+    # confiança e o feixe recomeça da nova posição. A segunda condição segura
+    # lances feitos em duas etapas (roque com o rei já movido e a torre não):
+    # enquanto nenhuma hipótese explica todas as casas, nada é confirmado.
+    def __init__(self, tabela: TabelaTransicoes, modelo: ModeloSensores, prob_movimento: float = 0.05,
+                 limiar_confianca: float = 0.995, peso_observacao: float = 0.5, poda: float = 1e-9):
+        self.tabela = tabela
+        self.modelo = modelo
+        self.prob_movimento = prob_movimento
+        self.log_ficar = np.log1p(-prob_movimento)
+        self.log_voltar = np.log(prob_movimento)
+        self.limiar_confianca = limiar_confianca
+        # Frames seguidos não são independentes (mesma mão, mesma sombra): tempera a evidência
+        self.peso_observacao = peso_observacao
+        self.log_poda = np.log(poda)
+
+        self.codigo: Optional[Codigo] = None
+        self.brancas_jogam = True
+        self.classes_base = None
+        self.estados: Tuple[tuple, ...] = ()
+        self.casas_alteradas = self.classes_novas = None
+        self.log_alfa = np.zeros(1)
+
+        self.frames = 0
+        self.confirmacoes = 0
+        self.rejeicoes = 0
+
+    def reiniciar(self, codigo: Codigo, brancas_jogam: bool, posicao=None):
+        self.codigo = codigo
+        self.brancas_jogam = brancas_jogam
+        self.classes_base = self._classes(codigo)
+
+        tabela = self.tabela.tabela(codigo, brancas_jogam, posicao)
+        self.estados = tuple(tabela.values())
+
+        # Casas que cada estado muda em relação à posição atual, em matriz (N, max)
+        # preenchida com a casa 0 sem mudança (contribuição nula)
+        alteracoes = [np.flatnonzero(self._classes(observado) != self.classes_base) for observado in tabela]
+        largura = max((len(a) for a in alteracoes), default=0)
+        self.casas_alteradas = np.zeros((len(alteracoes), largura), dtype=np.intp)
+        self.classes_novas = np.tile(self.classes_base[0], (len(alteracoes), largura))
+        for k, (observado, casas) in enumerate(zip(tabela, alteracoes)):
+            self.casas_alteradas[k, :len(casas)] = casas
+            self.classes_novas[k, :len(casas)] = self._classes(observado)[casas]
+
+        # Índice 0 = ninguém jogou ainda; 1..N = cada estado
+        self.log_alfa = np.full(len(self.estados) + 1, -np.inf)
+        self.log_alfa[0] = 0.0
+
+    def _classes(self, codigo: Codigo) -> np.ndarray:
+        ocupadas, brancas = codigo
+        return np.array([1 if (brancas >> k) & 1 else 2 if (ocupadas >> k) & 1 else 0
+                         for k in range(self.tabela.casas)], dtype=np.intp)
+
+    def posterior(self) -> np.ndarray:
+        return np.exp(self.log_alfa)
+
+    def atualizar(self, matriz: np.ndarray, codigo: Codigo, brancas_jogam: bool,
+                  posicao=None) -> Optional[Tuple[tuple, float]]:
+        # Devolve (lances do estado, confiança) quando um estado é confirmado neste frame
+        if codigo != self.codigo or brancas_jogam != self.brancas_jogam:
+            self.reiniciar(codigo, brancas_jogam, posicao)
+
+        self.frames += 1
+        ll = self.modelo.log_verossimilhancas(matriz).reshape(3, -1) * self.peso_observacao
+        casas = np.arange(ll.shape[1])
+        ll_atual = ll[self.classes_base, casas]
+        ll_0 = ll_atual.sum()
+
+        ll_k = ll_0 + (ll[self.classes_novas, self.casas_alteradas]
+                       - ll_atual[self.casas_alteradas]).sum(axis=1)
+
+        alfa_0 = self.log_alfa[0]
+        if len(self.estados):
+            entrada = alfa_0 + np.log(self.prob_movimento / len(self.estados))
+            volta = np.logaddexp.reduce(self.log_alfa[1:]) + self.log_voltar
+            self.log_alfa[1:] = np.logaddexp(self.log_alfa[1:] + self.log_ficar, entrada) + ll_k
+            self.log_alfa[0] = np.logaddexp(alfa_0 + self.log_ficar, volta) + ll_0
+        else:
+            self.log_alfa[0] = alfa_0 + ll_0
+
+        # Normaliza e poda o feixe: lances desprezíveis ficam em -inf até receberem
+        # massa de novo pela entrada (o estado 0 nunca é podado)
+        self.log_alfa -= np.logaddexp.reduce(self.log_alfa)
+        podados = self.log_alfa[1:] < self.log_poda
+        self.log_alfa[1:][podados] = -np.inf
+        self.log_alfa -= np.logaddexp.reduce(self.log_alfa)
+
+        melhor = int(np.argmax(self.log_alfa))
+        confianca = float(np.exp(self.log_alfa[melhor]))
+        if melhor == 0 or confianca < self.limiar_confianca:
+            return None
+
+        # Classe mais provável de cada casa neste frame contra as classes do estado
+        classes = self.classes_base.copy()
+        classes[self.casas_alteradas[melhor - 1]] = self.classes_novas[melhor - 1]
+        if not np.array_equal(self.modelo.classes_provaveis(matriz), classes):
+            self.rejeicoes += 1
+            return None
+
+        self.confirmacoes += 1
+        return self.estados[melhor - 1], confianca
+
+    def estatisticas(self) -> dict:
+        posterior = self.posterior()
+        return {
+            'frames': self.frames,
+            'confirmacoes': self.confirmacoes,
+            'rejeicoes': self.rejeicoes,
+            'hipoteses': int(np.count_nonzero(posterior)),
+            'prob_sem_lance': float(posterior[0]) if len(posterior) else 1.0,
+        }
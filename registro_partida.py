@@ -0,0 +1,298 @@
+import argparse
+import glob
+import json
+import os
+import queue
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from gerador_lances import EN_PASSANT, ROQUE_GRANDE, ROQUE_PEQUENO, Lance, Posicao, nome_casa
+
+# Uma partida por arquivo JSONL, só com acréscimos:
+#   {'tipo': 'inicio', 'linhas', 'colunas', 'pecas', 'vez_das_brancas', 'tabuleiro', 't'}
+#   {'tipo': 'lance', 'n', 'origem', 'destino', 'peca', 'captura', 'promocao', 'especial',
+#    'pecas', 'vez_das_brancas', 'confianca', 'matriz', 't'}
+#   {'tipo': 'fim', 'resultado', 't'}
+# Cada lance leva o estado resultante, então retomar não depende de reaplicar regras;
+# uma última linha cortada por queda do processo é ignorada na leitura.
+
+_FIM_FILA = object()
+_carimbo_lock = threading.Lock()
+_ultimo_carimbo = 0
+
+
+def arquivo_partida(id_tabuleiro: str, diretorio: str = 'partidas') -> str:
+    # Carimbo em milissegundos e sempre crescente: duas partidas no mesmo instante
+    # (iniciar_registro seguido de nova_partida) não caem no mesmo arquivo, e o nome
+    # continua ordenando as partidas para ultima_partida
+    global _ultimo_carimbo
+    nome = re.sub(r'[^A-Za-z0-9_.-]+', '_', id_tabuleiro).strip('_')
+    with _carimbo_lock:
+        carimbo = max(time.time_ns() // 1_000_000, _ultimo_carimbo + 1)
+        while True:
+            segundos, ms = divmod(carimbo, 1000)
+            caminho = os.path.join(diretorio, f"{nome}_{time.strftime('%Y%m%d-%H%M%S', time.localtime(segundos))}"
+                                              f"-{ms:03d}.jsonl")
+            if not os.path.exists(caminho):
+                break
+            carimbo += 1
+        _ultimo_carimbo = carimbo
+    return caminho
+
+
+def ultima_partida(id_tabuleiro: str, diretorio: str = 'partidas') -> Optional[str]:
+    nome = re.sub(r'[^A-Za-z0-9_.-]+', '_', id_tabuleiro).strip('_')
+    # O carimbo de data no nome ordena as partidas
+    arquivos = sorted(glob.glob(os.path.join(glob.escape(diretorio), f"{glob.escape(nome)}_*.jsonl")))
+    return arquivos[-1] if arquivos else None
+
+
+def dados_lance(lance, antes: List[List[str]]) -> dict:
+    # lance: Lance do gerador_lances ou Movimento da tabela (sem identidade de peça,
+    # que então sai do estado anterior)
+    origem = divmod(lance.origem, len(antes[0]))
+    destino = divmod(lance.destino, len(antes[0]))
+    captura = lance.captura if isinstance(lance.captura, str) else \
+        (antes[destino[0]][destino[1]] if lance.captura else '')
+    return {
+        'origem': lance.origem,
+        'destino': lance.destino,
+        'peca': getattr(lance, 'peca', antes[origem[0]][origem[1]]),
+        'captura': captura,
+        'promocao': getattr(lance, 'promocao', ''),
+        'especial': getattr(lance, 'especial', None),
+    }
+
+
+class RegistroPartida:
+    # Quem joga só enfileira o registro; uma thread escreve, com flush + fsync a
+    # cada `lote` registros ou a cada `intervalo_fsync` segundos (o que vier
+    # antes). Uma queda perde no máximo esse intervalo, e o loop de leitura
+    # nunca espera pelo disco.
+    def __init__(self, caminho: str, lote: int = 32, intervalo_fsync: float = 0.5, lances: int = 0):
+        self.caminho = caminho
+        self.lote = lote
+        self.intervalo_fsync = intervalo_fsync
+        self.lances = lances
+        self.escritos = 0
+        self.fsyncs = 0
+
+        diretorio = os.path.dirname(caminho)
+        if diretorio:
+            os.makedirs(diretorio, exist_ok=True)
+        self.fila = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self._loop, name="registro-partida", daemon=True)
+        self.thread.start()
+
+    @classmethod
+    def nova(cls, caminho: str, linhas: int, colunas: int, pecas: List[List[str]], vez_das_brancas: bool,
+             tabuleiro: str = '', **opcoes) -> 'RegistroPartida':
+        registro = cls(caminho, **opcoes)
+        registro.registrar({'tipo': 'inicio', 'linhas': linhas, 'colunas': colunas, 'pecas': pecas,
+                            'vez_das_brancas': vez_das_brancas, 'tabuleiro': tabuleiro})
+        return registro
+
+    def registrar(self, registro: dict):
+        registro.setdefault('t', time.time())
+        self.fila.put(registro)
+
+    def registrar_lance(self, lance, antes: List[List[str]], depois: List[List[str]], vez_das_brancas: bool,
+                        confianca: Optional[float] = None, matriz=None):
+        self.lances += 1
+        registro = {'tipo': 'lance', 'n': self.lances}
+        registro.update(dados_lance(lance, antes))
+        registro.update({'pecas': depois, 'vez_das_brancas': vez_das_brancas, 'confianca': confianca, 'matriz': matriz})
+        self.registrar(registro)
+
+    def encerrar(self, resultado: str = '*'):
+        self.registrar({'tipo': 'fim', 'resultado': resultado})
+        self.fechar()
+
+    def fechar(self):
+        # Esvazia a fila e sincroniza; a partida continua retomável se não houve 'fim'
+        if self.thread.is_alive():
+            self.fila.put(_FIM_FILA)
+            self.thread.join(timeout=5)
+
+    def _loop(self):
+        with open(self.caminho, 'a', encoding='utf-8') as arquivo:
+            pendentes = 0
+            ultimo_fsync = time.monotonic()
+            while True:
+                try:
+                    registro = self.fila.get(timeout=self.intervalo_fsync)
+                except queue.Empty:
+                    registro = None
+
+                if registro is _FIM_FILA:
+                    break
+                if registro is not None:
+                    if registro.get('matriz') is not None:
+                        registro['matriz'] = registro['matriz'].tolist()
+                    arquivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+                    self.escritos += 1
+                    pendentes += 1
+
+                if pendentes and (pendentes >= self.lote or time.monotonic() - ultimo_fsync >= self.intervalo_fsync):
+                    arquivo.flush()
+                    os.fsync(arquivo.fileno())
+                    self.fsyncs += 1
+                    pendentes = 0
+                    ultimo_fsync = time.monotonic()
+
+            arquivo.flush()
+            os.fsync(arquivo.fileno())
+            self.fsyncs += 1
+
+    def estatisticas(self) -> dict:
+        return {'lances': self.lances, 'escritos': self.escritos, 'fsyncs': self.fsyncs}
+
+
+@dataclass
+class Partida:
+    caminho: str
+    cabecalho: dict
+    lances: List[dict] = field(default_factory=list)
+    resultado: Optional[str] = None
+    linhas_descartadas: int = 0
+    # Bytes até o fim da última linha válida; retomar corta o arquivo aqui antes de acrescentar
+    tamanho_valido: int = 0
+
+    @property
+    def encerrada(self) -> bool:
+        return self.resultado is not None
+
+    @property
+    def pecas(self) -> List[List[str]]:
+        return self.lances[-1]['pecas'] if self.lances else self.cabecalho['pecas']
+
+    @property
+    def vez_das_brancas(self) -> bool:
+        return self.lances[-1]['vez_das_brancas'] if self.lances else self.cabecalho['vez_das_brancas']
+
+    def posicao(self) -> Optional[Posicao]:
+        # Reaplica os lances com regras para recuperar roque e en passant;
+        # None se a partida foi gravada sem o gerador de lances
+        if any(l.get('especial') is None for l in self.lances):
+            return None
+        try:
+            posicao = Posicao.de_matriz(self.cabecalho['pecas'], self.cabecalho['vez_das_brancas'])
+            for l in self.lances:
+                posicao.jogar(Lance(l['origem'], l['destino'], l['peca'], l['captura'], l['promocao'], l['especial']))
+        except (KeyError, IndexError):
+            return None
+        return posicao
+
+
+def ler_partida(caminho: str) -> Optional[Partida]:
+    partida = None
+    tamanho = 0
+    with open(caminho, 'rb') as f:
+        for linha in f:
+            try:
+                if not linha.endswith(b"\n"):
+                    raise ValueError("linha sem fim")
+                registro = json.loads(linha)
+            except ValueError:
+                # Linha incompleta da queda do processo: o que vem depois não é confiável
+                if partida is not None:
+                    partida.linhas_descartadas += 1
+                break
+            tamanho += len(linha)
+            tipo = registro.get('tipo')
+            if tipo == 'inicio':
+                partida = Partida(caminho, registro)
+            elif partida is None:
+                continue
+            elif tipo == 'lance':
+                partida.lances.append(registro)
+            elif tipo == 'fim':
+                partida.resultado = registro.get('resultado', '*')
+            partida.tamanho_valido = tamanho
+    return partida
+
+
+def truncar_partida(partida: Partida):
+    # Descarta o resto corrompido para que os próximos registros fiquem legíveis
+    if os.path.getsize(partida.caminho) > partida.tamanho_valido:
+        with open(partida.caminho, 'r+b') as f:
+            f.truncate(partida.tamanho_valido)
+
+
+def texto_lance(registro: dict, linhas: int, colunas: int) -> str:
+    if registro.get('especial') == ROQUE_PEQUENO:
+        return "O-O"
+    if registro.get('especial') == ROQUE_GRANDE:
+        return "O-O-O"
+
+    origem = nome_casa(*divmod(registro['origem'], colunas), linhas, colunas)
+    destino = nome_casa(*divmod(registro['destino'], colunas), linhas, colunas)
+    # 8x8: notação algébrica longa (Ng1-f3, e2-e4); no 3x3 a letra vai sempre
+    xadrez = (linhas, colunas) == (8, 8)
+    peca = registro['peca'].upper() if xadrez else registro['peca']
+    if peca == 'P' and xadrez:
+        peca = ''
+    texto = f"{peca}{origem}{'x' if registro['captura'] else '-'}{destino}"
+    if registro.get('promocao'):
+        texto += f"={registro['promocao'].upper() if xadrez else registro['promocao']}"
+    if registro.get('especial') == EN_PASSANT:
+        texto += " e.p."
+    return texto
+
+
+def exportar_pgn(partida: Partida) -> str:
+    # Notação longa: no 8x8 com as coordenadas do xadrez; nos demais tamanhos com as
+    # casas do projeto (coluna A.., linha contada de baixo), já que as peças A/B/C não têm SAN
+    cabecalho = partida.cabecalho
+    linhas, colunas = cabecalho['linhas'], cabecalho['colunas']
+    resultado = partida.resultado or '*'
+    tags = [
+        ('Event', 'Chess-Bot'),
+        ('Site', cabecalho.get('tabuleiro', '')),
+        ('Date', time.strftime('%Y.%m.%d', time.localtime(cabecalho.get('t', 0)))),
+        ('Board', f"{linhas}x{colunas}"),
+        ('Position', '/'.join(''.join(linha) for linha in cabecalho['pecas'])),
+        ('Result', resultado),
+    ]
+
+    texto = []
+    numero = 1
+    brancas = cabecalho['vez_das_brancas']
+    if partida.lances and not brancas:
+        texto.append("1...")
+    for registro in partida.lances:
+        if brancas:
+            texto.append(f"{numero}.")
+        texto.append(texto_lance(registro, linhas, colunas))
+        if not brancas:
+            numero += 1
+        brancas = not brancas
+    texto.append(resultado)
+
+    return "\n".join(f'[{nome} "{valor}"]' for nome, valor in tags) + "\n\n" + " ".join(texto) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lê uma partida gravada")
+    parser.add_argument("arquivo")
+    parser.add_argument("--estado", action="store_true", help="mostra o tabuleiro final em vez do PGN")
+    args = parser.parse_args()
+
+    partida = ler_partida(args.arquivo)
+    if partida is None:
+        print("Arquivo sem partida")
+        return
+    if args.estado:
+        print(f"{len(partida.lances)} lances, vez das {'brancas' if partida.vez_das_brancas else 'pretas'}"
+              f"{' (encerrada)' if partida.encerrada else ''}")
+        for linha in partida.pecas:
+            print(''.join(linha))
+    else:
+        print(exportar_pgn(partida), end='')
+
+
+if __name__ == "__main__":
+    main()
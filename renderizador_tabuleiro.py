@@ -0,0 +1,119 @@
+import tkinter as tk
+from typing import Callable, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+from gerador_lances import EN_PASSANT, ROQUE_GRANDE, ROQUE_PEQUENO
+
+CORES_CATEGORIA = {'branco': "blue", 'preto': "red", 'vazio': "gray"}
+COR_DESTAQUE = "#F6E05E"
+
+
+def casas_do_lance(lance, colunas: int) -> Set[int]:
+    # Casas tocadas por um lance: origem e destino, mais a torre no roque e o
+    # peão capturado no en passant (Movimento da tabela só tem origem/destino)
+    casas = {lance.origem, lance.destino}
+    especial = getattr(lance, 'especial', 0)
+    if especial == EN_PASSANT:
+        casas.add(lance.destino - (colunas if lance.peca.isupper() else -colunas))
+    elif especial in (ROQUE_GRANDE, ROQUE_PEQUENO):
+        inicio_linha = lance.origem - lance.origem % colunas
+        torre = inicio_linha if especial == ROQUE_GRANDE else inicio_linha + colunas - 1
+        casas.update((torre, (lance.origem + lance.destino) // 2))
+    return casas
+
+
+class RenderizadorTabuleiro:
+    # Desenha os dois canvas (valores brutos e peças) uma vez por tamanho e
+    # depois só reconfigura os itens cujo conteúdo mudou desde o último desenho.
+    # Roda só na thread do Tk; quem chama decide a frequência.
+    def __init__(self, raw_canvas: tk.Canvas, pieces_canvas: tk.Canvas):
+        self.raw_canvas = raw_canvas
+        self.pieces_canvas = pieces_canvas
+        self.linhas = 0
+        self.colunas = 0
+        self.raw_itens: List[int] = []
+        self.peca_itens: List[int] = []
+        self.destaque_itens: List[Tuple[int, int]] = []
+        self.raw_desenhado: Optional[np.ndarray] = None
+        self.pecas_desenhadas: List[Optional[str]] = []
+        self.destacadas: Set[int] = set()
+        self.itens_alterados = 0
+
+    def criar(self, linhas: int, colunas: int):
+        self.linhas = linhas
+        self.colunas = colunas
+        self.raw_itens = []
+        self.peca_itens = []
+        self.destaque_itens = []
+
+        # Casas encolhem para o tabuleiro 8x8 caber no mesmo espaço
+        cell_size = min(70, 560 // max(linhas, colunas))
+        margin = 20
+        fonte_raw = max(7, cell_size // 7)
+        fonte_peca = max(9, cell_size // 5)
+
+        largura = 2 * margin + colunas * cell_size
+        altura = 2 * margin + linhas * cell_size
+        for canvas in (self.raw_canvas, self.pieces_canvas):
+            canvas.delete("all")
+            canvas.config(width=largura, height=altura)
+
+        for i in range(linhas):
+            for j in range(colunas):
+                x1 = margin + j * cell_size
+                y1 = margin + i * cell_size
+                x2 = x1 + cell_size
+                y2 = y1 + cell_size
+                centro = (x1 + cell_size / 2, y1 + cell_size / 2)
+
+                color = "#F0D9B5" if (i + j) % 2 == 0 else "#B58863"
+
+                # Moldura do último lance, escondida até ser usada; fica abaixo do texto
+                destaques = []
+                for canvas in (self.raw_canvas, self.pieces_canvas):
+                    canvas.create_rectangle(x1, y1, x2, y2, fill=color, outline="black", width=1)
+                    destaques.append(canvas.create_rectangle(x1 + 2, y1 + 2, x2 - 2, y2 - 2, outline=COR_DESTAQUE,
+                                                             width=4, state=tk.HIDDEN))
+                self.destaque_itens.append(tuple(destaques))
+
+                self.raw_itens.append(self.raw_canvas.create_text(*centro, text="---", font=("Arial", fonte_raw)))
+                self.peca_itens.append(self.pieces_canvas.create_text(*centro, text="?",
+                                                                      font=("Arial", fonte_peca, "bold")))
+
+        self.raw_desenhado = None
+        self.pecas_desenhadas = [None] * (linhas * colunas)
+        self.destacadas = set()
+
+    def desenhar_valores(self, matriz: np.ndarray):
+        if matriz.shape != (self.linhas, self.colunas):
+            return
+        if self.raw_desenhado is None:
+            alteradas = range(self.linhas * self.colunas)
+            self.raw_desenhado = np.empty(self.linhas * self.colunas, dtype=matriz.dtype)
+        else:
+            alteradas = np.flatnonzero(self.raw_desenhado != matriz.ravel())
+        for k in alteradas:
+            self.raw_canvas.itemconfig(self.raw_itens[k], text=str(matriz.flat[k]))
+        self.raw_desenhado[:] = matriz.ravel()
+        self.itens_alterados += len(alteradas)
+
+    def desenhar_pecas(self, pecas: List[List[str]], categoria: Callable[[str], str]):
+        for i, linha in enumerate(pecas[:self.linhas]):
+            for j, peca in enumerate(linha[:self.colunas]):
+                k = i * self.colunas + j
+                if self.pecas_desenhadas[k] == peca:
+                    continue
+                cor = CORES_CATEGORIA.get(categoria(peca), "black")
+                self.pieces_canvas.itemconfig(self.peca_itens[k], text=peca, fill=cor)
+                self.pecas_desenhadas[k] = peca
+                self.itens_alterados += 1
+
+    def destacar(self, casas: Iterable[int]):
+        casas = {k for k in casas if 0 <= k < len(self.destaque_itens)}
+        for k in self.destacadas ^ casas:
+            estado = tk.NORMAL if k in casas else tk.HIDDEN
+            raw, peca = self.destaque_itens[k]
+            self.raw_canvas.itemconfig(raw, state=estado)
+            self.pieces_canvas.itemconfig(peca, state=estado)
+        self.destacadas = casas
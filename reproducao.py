@@ -0,0 +1,189 @@
+import argparse
+import difflib
+import json
+import logging
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+import numpy as np
+
+from board_engine import BoardEngine, CalibrationData, INFERENCIA_HMM
+from gravador_frames import FRAME_LER, Sessao, carregar_sessao
+from registro_partida import dados_lance, texto_lance
+
+# Reprodução offline de uma sessão gravada (gravador_frames): os frames passam
+# pela calibração, classificação e detecção de lances do BoardEngine sem serial,
+# o mais rápido possível ou no ritmo original. O resultado pode ser comparado
+# com um arquivo golden de lances esperados.
+
+
+@dataclass
+class ResultadoReproducao:
+    frames: int = 0
+    segundos: float = 0.0
+    lances: List[dict] = field(default_factory=list)
+    tempos_ms: List[float] = field(default_factory=list)
+
+    @property
+    def fps(self) -> float:
+        return self.frames / self.segundos if self.segundos > 0 else 0.0
+
+    def resumo(self) -> dict:
+        tempos = np.array(self.tempos_ms) if self.tempos_ms else np.zeros(1)
+        return {
+            'frames': self.frames,
+            'segundos': self.segundos,
+            'fps': self.fps,
+            'lances': len(self.lances),
+            'frame_p50_ms': float(np.percentile(tempos, 50)),
+            'frame_p99_ms': float(np.percentile(tempos, 99)),
+        }
+
+
+def calibrar_da_sessao(engine: BoardEngine, sessao: Sessao, recalibrar: bool) -> int:
+    # Devolve quantos frames LER foram consumidos pela calibração
+    if not recalibrar and sessao.meta.get('calibracao'):
+        engine.calibration_data = CalibrationData.de_dict(sessao.meta['calibracao'])
+        mapa = sessao.meta.get('mapa_linhas')
+        engine.mapa_linhas = {int(i): tipo for i, tipo in mapa.items()} if mapa else None
+        return 0
+
+    # Os LER antes do primeiro frame de streaming são os da calibração; sem eles,
+    # os primeiros frames de streaming (tabuleiro na posição inicial)
+    tipos = sessao.frames['tipo']
+    primeiro_stream = int(np.argmax(tipos != FRAME_LER)) if np.any(tipos != FRAME_LER) else len(tipos)
+    if primeiro_stream > 0:
+        frames = sessao.frames['matriz'][:primeiro_stream]
+    else:
+        frames = sessao.frames['matriz'][:engine.amostras_calibracao]
+    engine.processar_calibracao_por_luminosidade(frames.astype(float))
+    return primeiro_stream
+
+
+def reproduzir(sessao: Sessao, engine: Optional[BoardEngine] = None, tempo_real: bool = False,
+               recalibrar: bool = False) -> ResultadoReproducao:
+    engine = engine or BoardEngine(sessao.linhas, sessao.colunas, porta='reproducao')
+    resultado = ResultadoReproducao()
+
+    inicio_calibracao = calibrar_da_sessao(engine, sessao, recalibrar)
+    if not engine.calibration_data:
+        raise ValueError("Sessão sem calibração utilizável")
+
+    estado = {'antes': None, 'sequencia': 0}
+
+    def ao_evento(evento: str, dados: dict):
+        if evento == 'movimento' and dados.get('lance') is not None:
+            registro = dados_lance(dados['lance'], estado['antes'])
+            registro['sequencia'] = estado['sequencia']
+            registro['texto'] = texto_lance(registro, sessao.linhas, sessao.colunas)
+            registro['confianca'] = dados.get('confianca')
+            resultado.lances.append(registro)
+
+    engine.inscrever(ao_evento)
+    frames = sessao.frames[inicio_calibracao:]
+    tempo_gravado0 = float(frames['tempo'][0]) if len(frames) else 0.0
+    inicio = time.perf_counter()
+    try:
+        for frame in frames:
+            if tempo_real:
+                atraso = (float(frame['tempo']) - tempo_gravado0) - (time.perf_counter() - inicio)
+                if atraso > 0:
+                    time.sleep(atraso)
+
+            estado['antes'] = engine.estado_anterior
+            estado['sequencia'] = int(frame['sequencia'])
+            t0 = time.perf_counter()
+            # LER avulso já vem com a média do firmware; streaming passa pelo filtro/HMM
+            engine.processar_dados_completos(frame['matriz'], estado['sequencia'],
+                                             filtrar=frame['tipo'] != FRAME_LER)
+            resultado.tempos_ms.append((time.perf_counter() - t0) * 1000)
+            resultado.frames += 1
+    finally:
+        resultado.segundos = time.perf_counter() - inicio
+        engine.cancelar_inscricao(ao_evento)
+    return resultado
+
+
+def salvar_golden(resultado: ResultadoReproducao, caminho: str):
+    with open(caminho, 'w', encoding='utf-8') as f:
+        json.dump({'lances': [{'sequencia': l['sequencia'], 'texto': l['texto']} for l in resultado.lances]},
+                  f, ensure_ascii=False, indent=2)
+
+
+def comparar_golden(resultado: ResultadoReproducao, caminho: str) -> dict:
+    # Compara a sequência de lances (texto); para os que batem, mede o atraso em frames
+    with open(caminho, encoding='utf-8') as f:
+        esperados = json.load(f)['lances']
+
+    obtidos = resultado.lances
+    comparador = difflib.SequenceMatcher(a=[l['texto'] for l in esperados], b=[l['texto'] for l in obtidos],
+                                         autojunk=False)
+    faltando, extras, atrasos = [], [], []
+    for operacao, a0, a1, b0, b1 in comparador.get_opcodes():
+        if operacao == 'equal':
+            atrasos.extend(obtidos[b0 + k]['sequencia'] - esperados[a0 + k]['sequencia'] for k in range(a1 - a0))
+        else:
+            faltando.extend(esperados[a0:a1])
+            extras.extend(obtidos[b0:b1])
+
+    return {
+        'iguais': not faltando and not extras,
+        'faltando': faltando,
+        'extras': extras,
+        'atraso_medio_frames': float(np.mean(atrasos)) if atrasos else 0.0,
+        'atraso_maximo_frames': int(np.max(np.abs(atrasos))) if atrasos else 0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reproduz uma sessão de frames gravada")
+    parser.add_argument("sessao", help="diretório gravado com --gravar")
+    parser.add_argument("--tempo-real", action="store_true", help="respeita os intervalos gravados")
+    parser.add_argument("--recalibrar", action="store_true", help="calibra com os frames gravados em vez do perfil da sessão")
+    parser.add_argument("--hmm", action="store_true", help="rastreador HMM em vez do filtro temporal")
+    parser.add_argument("--sem-regras", action="store_true", help="não valida os lances com o gerador de lances")
+    parser.add_argument("--golden", help="compara os lances detectados com este arquivo")
+    parser.add_argument("--salvar-golden", help="grava os lances detectados como golden")
+    args = parser.parse_args()
+
+    # Os logs por frame custariam mais que o próprio processamento
+    logging.getLogger('tabuleiro').setLevel(logging.WARNING)
+
+    sessao = carregar_sessao(args.sessao)
+    engine = BoardEngine(sessao.linhas, sessao.colunas, porta='reproducao')
+    if args.hmm:
+        engine.modo_inferencia = INFERENCIA_HMM
+    engine.validar_regras = not args.sem_regras
+
+    print(f"Sessão {args.sessao}: {len(sessao.frames)} frames {sessao.linhas}x{sessao.colunas}, "
+          f"{sessao.duracao():.1f} s gravados")
+    resultado = reproduzir(sessao, engine, args.tempo_real, args.recalibrar)
+
+    resumo = resultado.resumo()
+    print(f"{resumo['frames']} frames em {resumo['segundos']:.3f} s: {resumo['fps']:.0f} frames/s "
+          f"(p50 {resumo['frame_p50_ms']:.3f} ms, p99 {resumo['frame_p99_ms']:.3f} ms por frame)")
+    for lance in resultado.lances:
+        confianca = f" ({lance['confianca']:.3f})" if lance['confianca'] is not None else ""
+        print(f"  #{lance['sequencia']}: {lance['texto']}{confianca}")
+
+    if args.salvar_golden:
+        salvar_golden(resultado, args.salvar_golden)
+        print(f"Golden salvo em {args.salvar_golden}")
+
+    if args.golden:
+        diferencas = comparar_golden(resultado, args.golden)
+        if diferencas['iguais']:
+            print(f"Igual ao golden (atraso médio {diferencas['atraso_medio_frames']:+.1f} frames, "
+                  f"máximo {diferencas['atraso_maximo_frames']})")
+        else:
+            for lance in diferencas['faltando']:
+                print(f"  - faltando #{lance['sequencia']}: {lance['texto']}")
+            for lance in diferencas['extras']:
+                print(f"  + extra    #{lance['sequencia']}: {lance['texto']}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
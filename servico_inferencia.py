@@ -0,0 +1,329 @@
+import argparse
+import queue
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import torch
+from torch import nn
+
+import modelos_connect4
+from connect4_bitboard import EstadoConnect4, entradas_modelo
+from metricas import Metricas, ServidorMetricas
+
+# Serviço de avaliação de posições para o minimax e o MCTS: os pedidos de
+# várias threads (buscas, partidas) entram numa fila e uma thread do serviço
+# junta o que chegar até max_lote posições ou espera_max segundos depois do
+# primeiro pedido, e roda o modelo uma vez para o lote inteiro sob
+# torch.inference_mode. Na frente do modelo há um cache LRU pela chave da
+# posição (bitboards + jogador da vez), e pedidos iguais em andamento são
+# atendidos pela mesma avaliação. Tempos e contadores vão para um Metricas,
+# exportável pelo ServidorMetricas.
+
+ARQUIVO_PADRAO = 'C4_pretrained_Model_v2.pth'
+
+
+def chave_posicao(pecas1: int, pecas2: int, jogador: int) -> int:
+    # Bitboards de 49 bits: cabem lado a lado num inteiro, sem colisão
+    return (pecas1 << 50) | (pecas2 << 1) | (jogador == 1)
+
+
+def preparar_modelo(caminho: str = ARQUIVO_PADRAO, arquitetura: str = 'layers3', torchscript: bool = False,
+                    quantizar: bool = False, device: str = 'cpu') -> nn.Module:
+    # .pt = TorchScript já salvo; .pth = state_dict das classes dos notebooks,
+    # opcionalmente quantizado (Linear em int8, só CPU) e compilado com trace + freeze
+    if caminho.endswith('.pt'):
+        return torch.jit.load(caminho, map_location=device).eval()
+    modelo = modelos_connect4.carregar_modelo(caminho, arquitetura, device)
+    if quantizar:
+        modelo = torch.ao.quantization.quantize_dynamic(modelo, {nn.Linear}, dtype=torch.qint8)
+    if torchscript:
+        exemplo = torch.zeros(2, modelos_connect4.ENTRADAS, device=device)
+        modelo = torch.jit.freeze(torch.jit.trace(modelo, exemplo))
+    return modelo
+
+
+class ServicoEncerrado(RuntimeError):
+    pass
+
+
+class _Pedido:
+    __slots__ = ('chave', 'pecas1', 'pecas2', 'jogador', 'futuro', 'chegada')
+
+    def __init__(self, chave: int, estado: EstadoConnect4, jogador: int, futuro: Future):
+        self.chave = chave
+        self.pecas1 = estado.pecas1
+        self.pecas2 = estado.pecas2
+        self.jogador = jogador
+        self.futuro = futuro
+        self.chegada = time.perf_counter()
+
+
+class ServicoInferencia:
+    # Saída do modelo: chance do jogador 1 vencer (sigmoide), como nos notebooks
+    def __init__(self, modelo: nn.Module, max_lote: int = 256, espera_max: float = 0.002,
+                 tamanho_cache: int = 200_000, device: str = 'cpu', metricas: Optional[Metricas] = None):
+        self.modelo = modelo
+        self.max_lote = max_lote
+        self.espera_max = espera_max
+        self.tamanho_cache = tamanho_cache
+        self.device = device
+        self.metricas = metricas or Metricas(rotulos={'servico': 'inferencia'})
+
+        self.fila: "queue.Queue[Optional[_Pedido]]" = queue.Queue()
+        self.cache: "OrderedDict[int, float]" = OrderedDict()
+        self.em_andamento: Dict[int, Future] = {}
+        self.lock = threading.Lock()
+
+        self.posicoes_avaliadas = 0
+        self.lotes = 0
+        self.segundos_modelo = 0.0
+        self.inicio = time.perf_counter()
+
+        self.ativo = True
+        self.thread = threading.Thread(target=self._processar, name="inferencia", daemon=True)
+        self.thread.start()
+
+    # ---- Pedidos ----
+
+    def pedir(self, estado: EstadoConnect4, jogador: int) -> Future:
+        chave = chave_posicao(estado.pecas1, estado.pecas2, jogador)
+        with self.lock:
+            # Sob o lock, com o put: nenhum pedido entra na fila depois do sinal de fim
+            if not self.ativo:
+                raise ServicoEncerrado("Serviço de inferência encerrado")
+            valor = self.cache.get(chave)
+            if valor is not None:
+                self.cache.move_to_end(chave)
+                self.metricas.incrementar('acertos_cache')
+                futuro = Future()
+                futuro.set_result(valor)
+                return futuro
+            futuro = self.em_andamento.get(chave)
+            if futuro is not None:
+                # A mesma posição já está na fila: espera a mesma avaliação
+                self.metricas.incrementar('pedidos_agrupados')
+                return futuro
+            self.metricas.incrementar('faltas_cache')
+            futuro = Future()
+            self.em_andamento[chave] = futuro
+            self.fila.put(_Pedido(chave, estado, jogador, futuro))
+        return futuro
+
+    def avaliar_posicao(self, estado: EstadoConnect4, jogador: int) -> float:
+        # Mesma assinatura das avaliações de minimax_connect4 (BuscaMinimax, minimax)
+        return self.pedir(estado, jogador).result()
+
+    def avaliar_posicoes(self, pecas1, pecas2, jogadores) -> np.ndarray:
+        futuros = [self.pedir(EstadoConnect4(int(p1), int(p2)), int(j))
+                   for p1, p2, j in zip(pecas1, pecas2, jogadores)]
+        return np.array([f.result() for f in futuros])
+
+    # ---- Lotes ----
+
+    def _juntar(self) -> Tuple[List[_Pedido], bool]:
+        # Devolve o lote e se o sinal de fim (None) foi visto
+        primeiro = self.fila.get()
+        if primeiro is None:
+            return [], True
+        lote = [primeiro]
+        prazo = time.perf_counter() + self.espera_max
+        while len(lote) < self.max_lote:
+            restante = prazo - time.perf_counter()
+            try:
+                pedido = self.fila.get(timeout=restante) if restante > 0 else self.fila.get_nowait()
+            except queue.Empty:
+                break
+            if pedido is None:
+                return lote, True
+            lote.append(pedido)
+        return lote, False
+
+    def _processar(self):
+        fim_da_fila = False
+        while not fim_da_fila:
+            lote, fim_da_fila = self._juntar()
+            if lote:
+                self._avaliar_lote(lote)
+        self._falhar_pendentes()
+
+    def _avaliar_lote(self, lote: List[_Pedido]):
+        try:
+            inicio = time.perf_counter()
+            entrada = entradas_modelo([p.pecas1 for p in lote], [p.pecas2 for p in lote], [p.jogador for p in lote])
+            entrada = torch.from_numpy(entrada).to(self.device)
+            with torch.inference_mode():
+                saida = self.modelo(entrada).reshape(-1).float().cpu().numpy()
+            fim = time.perf_counter()
+        except Exception as e:
+            with self.lock:
+                for pedido in lote:
+                    self.em_andamento.pop(pedido.chave, None)
+            for pedido in lote:
+                pedido.futuro.set_exception(e)
+            self.metricas.incrementar('falhas_inferencia')
+            return
+
+        self.metricas.observar('lote_inferencia', fim - inicio)
+        self.lotes += 1
+        self.posicoes_avaliadas += len(lote)
+        self.segundos_modelo += fim - inicio
+        with self.lock:
+            for pedido, valor in zip(lote, saida.tolist()):
+                self.cache[pedido.chave] = valor
+                self.em_andamento.pop(pedido.chave, None)
+            while len(self.cache) > self.tamanho_cache:
+                self.cache.popitem(last=False)
+        for pedido, valor in zip(lote, saida.tolist()):
+            pedido.futuro.set_result(valor)
+            self.metricas.observar('espera_inferencia', fim - pedido.chegada)
+        self.metricas.incrementar('lotes_inferencia')
+        self.metricas.incrementar('posicoes_avaliadas', len(lote))
+
+    def _falhar_pendentes(self):
+        # Ao sair: o que ainda estiver na fila ou em andamento falha em vez de travar quem espera
+        erro = ServicoEncerrado("Serviço de inferência encerrado")
+        with self.lock:
+            while True:
+                try:
+                    self.fila.get_nowait()
+                except queue.Empty:
+                    break
+            pendentes = list(self.em_andamento.values())
+            self.em_andamento.clear()
+        for futuro in pendentes:
+            if not futuro.done():
+                futuro.set_exception(erro)
+
+    def encerrar(self):
+        with self.lock:
+            if self.ativo:
+                self.ativo = False
+                self.fila.put(None)
+        self.thread.join(timeout=2)
+
+    def estatisticas(self) -> dict:
+        contadores = self.metricas.contadores
+        acertos = contadores.get('acertos_cache', 0) + contadores.get('pedidos_agrupados', 0)
+        pedidos = acertos + contadores.get('faltas_cache', 0)
+        duracao = time.perf_counter() - self.inicio
+        return {
+            'pedidos': pedidos,
+            'taxa_acerto_cache': acertos / pedidos if pedidos else 0.0,
+            'posicoes_avaliadas': self.posicoes_avaliadas,
+            'lotes': self.lotes,
+            'lote_medio': self.posicoes_avaliadas / self.lotes if self.lotes else 0.0,
+            'posicoes_por_segundo_modelo': self.posicoes_avaliadas / self.segundos_modelo if self.segundos_modelo else 0.0,
+            'pedidos_por_segundo': pedidos / duracao if duracao > 0 else 0.0,
+            'cache': len(self.cache),
+        }
+
+
+class AvaliadorServico:
+    # Avaliador do MCTSVetorizado (mcts_vetorizado) usando o serviço: priors
+    # uniformes e valor 2p-1 do ponto de vista do jogador da vez
+    def __init__(self, servico: ServicoInferencia):
+        self.servico = servico
+
+    def avaliar(self, pecas1: np.ndarray, pecas2: np.ndarray,
+                jogadores: np.ndarray) -> Tuple[Optional[np.ndarray], np.ndarray]:
+        p = self.servico.avaliar_posicoes(pecas1, pecas2, jogadores)
+        return None, (2 * p - 1) * np.asarray(jogadores)
+
+
+# ---- Benchmark ----
+
+def posicoes_aleatorias(n: int, semente: int) -> List[Tuple[EstadoConnect4, int]]:
+    rng = random.Random(semente)
+    posicoes = []
+    while len(posicoes) < n:
+        estado, jogador = EstadoConnect4(), 1
+        for _ in range(rng.randint(2, 16)):
+            estado = estado.jogar(rng.choice(estado.validos()), jogador)
+            jogador = -jogador
+            if estado.vencedor():
+                break
+        if not estado.vencedor():
+            posicoes.append((estado, jogador))
+    return posicoes
+
+
+def buscar_em_threads(avaliar, posicoes: List[Tuple[EstadoConnect4, int]], threads: int, tempo: float) -> dict:
+    # Uma BuscaMinimax por thread, cada uma com a sua parte das posições
+    from minimax_connect4 import BuscaMinimax
+
+    nos = [0] * threads
+
+    def trabalhar(k: int):
+        busca = BuscaMinimax(avaliar, tamanho_tt=1 << 16)
+        for estado, jogador in posicoes[k::threads]:
+            nos[k] += busca.buscar(estado, jogador, tempo).nos
+
+    inicio = time.perf_counter()
+    trabalhos = [threading.Thread(target=trabalhar, args=(k,)) for k in range(threads)]
+    for t in trabalhos:
+        t.start()
+    for t in trabalhos:
+        t.join()
+    duracao = time.perf_counter() - inicio
+    return {'nos_por_segundo': sum(nos) / duracao, 'segundos': duracao}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serviço de inferência em lote com cache para o Connect-4")
+    parser.add_argument("--modelo", default=ARQUIVO_PADRAO)
+    parser.add_argument("--arquitetura", default='layers3', choices=sorted(modelos_connect4.MODELOS))
+    parser.add_argument("--torchscript", action="store_true")
+    parser.add_argument("--quantizar", action="store_true", help="Linear em int8 (quantização dinâmica, CPU)")
+    parser.add_argument("--salvar-torchscript", help="grava o modelo preparado (.pt) e sai")
+    parser.add_argument("--max-lote", type=int, default=256)
+    parser.add_argument("--espera-ms", type=float, default=2.0)
+    parser.add_argument("--cache", type=int, default=200_000)
+    parser.add_argument("--threads", type=int, default=8, help="buscas simultâneas no benchmark")
+    parser.add_argument("--posicoes", type=int, default=32)
+    parser.add_argument("--tempo", type=float, default=0.2, help="segundos por busca")
+    parser.add_argument("--metricas-porta", type=int, help="expõe /metrics nesta porta")
+    args = parser.parse_args()
+
+    modelo = preparar_modelo(args.modelo, args.arquitetura, args.torchscript or bool(args.salvar_torchscript),
+                             args.quantizar)
+    if args.salvar_torchscript:
+        modelo.save(args.salvar_torchscript)
+        print(f"Modelo salvo em {args.salvar_torchscript}")
+        return
+
+    posicoes = posicoes_aleatorias(args.posicoes, 0)
+
+    # Antes: cada folha chama o modelo sozinha, como o minimax do notebook
+    def direto(estado: EstadoConnect4, jogador: int) -> float:
+        entrada = torch.from_numpy(entradas_modelo([estado.pecas1], [estado.pecas2], [jogador]))
+        with torch.inference_mode():
+            return modelo(entrada).item()
+
+    antes = buscar_em_threads(direto, posicoes, args.threads, args.tempo)
+    print(f"Modelo direto:  {antes['nos_por_segundo']:.0f} nós/s")
+
+    servico = ServicoInferencia(modelo, args.max_lote, args.espera_ms / 1000, args.cache)
+    servidor = ServidorMetricas(lambda: [servico.metricas], args.metricas_porta) if args.metricas_porta else None
+    try:
+        depois = buscar_em_threads(servico.avaliar_posicao, posicoes, args.threads, args.tempo)
+        e = servico.estatisticas()
+        print(f"Com o serviço: {depois['nos_por_segundo']:.0f} nós/s; {e['pedidos']} pedidos, "
+              f"cache {e['taxa_acerto_cache']:.0%}, lote médio {e['lote_medio']:.1f}, "
+              f"modelo a {e['posicoes_por_segundo_modelo']:.0f} posições/s")
+        resumo = servico.metricas.histogramas.get('espera_inferencia')
+        if resumo:
+            r = resumo.resumo()
+            print(f"Espera por avaliação: p50 {r['p50_ms']:.2f} ms, p99 {r['p99_ms']:.2f} ms")
+    finally:
+        servico.encerrar()
+        if servidor:
+            servidor.encerrar()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+import argparse
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+import serial.tools.list_ports
+
+from board_engine import BoardEngine, parece_arduino
+from log_sistema import configurar_logging, encerrar_logging
+from metricas import ServidorMetricas
+
+
+def descobrir_portas() -> List[str]:
+    return [porta.device for porta in serial.tools.list_ports.comports() if parece_arduino(porta)]
+
+
+class TabuleiroServidor:
+    # Um BoardEngine (calibração, estado e vez próprios) mais as métricas do servidor
+    def __init__(self, engine: BoardEngine, janela_latencias: int = 1000):
+        self.engine = engine
+        self.latencias = deque(maxlen=janela_latencias)
+        self.frames_processados = 0
+        self.movimentos = 0
+        self.agendado = False
+        self.lock = threading.Lock()
+
+        engine.inscrever(self.ao_evento)
+
+    def ao_evento(self, evento: str, dados: dict):
+        if evento == 'movimento':
+            self.movimentos += 1
+
+
+class ServidorTabuleiros:
+    # Vários tabuleiros num processo só. Cada porta mantém a thread de leitura do
+    # seu LeitorSerial (bloqueada em I/O), mas o processamento dos frames roda num
+    # pool pequeno e compartilhado: a chegada de um frame só agenda o tabuleiro,
+    # e um tabuleiro nunca é processado por dois trabalhadores ao mesmo tempo.
+    def __init__(self, linhas: int = 3, colunas: int = 3, max_fps: float = 10.0, trabalhadores: int = 2):
+        self.linhas = linhas
+        self.colunas = colunas
+        self.max_fps = max_fps
+        self.pool = ThreadPoolExecutor(max_workers=trabalhadores, thread_name_prefix='tabuleiros')
+        self.tabuleiros: Dict[str, TabuleiroServidor] = {}
+        self.inicio = time.time()
+
+    def adicionar(self, porta: str, nome: Optional[str] = None) -> TabuleiroServidor:
+        nome = nome or f"t{len(self.tabuleiros) + 1}"
+        engine = BoardEngine(self.linhas, self.colunas, porta=porta, nome=nome)
+        tabuleiro = TabuleiroServidor(engine)
+        engine.ao_receber_frame = lambda: self.agendar(tabuleiro)
+        self.tabuleiros[nome] = tabuleiro
+        return tabuleiro
+
+    def conectar_todos(self, calibrar: bool = False) -> int:
+        # O handshake espera o Arduino reiniciar; em paralelo, N placas custam o tempo de uma
+        def preparar(tabuleiro: TabuleiroServidor) -> bool:
+            engine = tabuleiro.engine
+            if not engine.conectar():
+                return False
+            if calibrar:
+                engine.calibrar()
+            engine.iniciar_streaming(self.max_fps, consumir=False)
+            return engine.streaming
+
+        with ThreadPoolExecutor(max_workers=max(1, len(self.tabuleiros))) as conexoes:
+            resultados = list(conexoes.map(preparar, self.tabuleiros.values()))
+        self.inicio = time.time()
+        return sum(resultados)
+
+    def agendar(self, tabuleiro: TabuleiroServidor):
+        # Chamado na thread de leitura do tabuleiro a cada frame recebido
+        with tabuleiro.lock:
+            if tabuleiro.agendado:
+                return
+            tabuleiro.agendado = True
+        self.pool.submit(self.processar, tabuleiro)
+
+    def processar(self, tabuleiro: TabuleiroServidor):
+        while True:
+            try:
+                latencia = tabuleiro.engine.processar_frame_pendente()
+            except Exception as e:
+                tabuleiro.engine.log_message(f"Erro ao processar frame: {e}")
+                latencia = None
+
+            if latencia is None:
+                with tabuleiro.lock:
+                    # Checa de novo sob o lock: um frame pode ter chegado agora
+                    leitor = tabuleiro.engine.leitor
+                    if not leitor or not leitor.quantidade:
+                        tabuleiro.agendado = False
+                        return
+                continue
+
+            tabuleiro.latencias.append(latencia)
+            tabuleiro.frames_processados += 1
+
+    def estatisticas(self) -> dict:
+        decorrido = max(time.time() - self.inicio, 1e-9)
+        por_tabuleiro = {}
+        total = 0
+        for nome, tabuleiro in self.tabuleiros.items():
+            latencias = np.array(tabuleiro.latencias) * 1000
+            leitor = tabuleiro.engine.leitor
+            por_tabuleiro[nome] = {
+                'porta': tabuleiro.engine.arduino_port,
+                'conectado': tabuleiro.engine.connected,
+                'frames': tabuleiro.frames_processados,
+                'fps': tabuleiro.frames_processados / decorrido,
+                'latencia_p50_ms': float(np.percentile(latencias, 50)) if len(latencias) else None,
+                'latencia_p99_ms': float(np.percentile(latencias, 99)) if len(latencias) else None,
+                'descartados': leitor.frames_descartados if leitor else 0,
+                'movimentos': tabuleiro.movimentos,
+            }
+            total += tabuleiro.frames_processados
+
+        return {
+            'tabuleiros': len(self.tabuleiros),
+            'frames': total,
+            'fps_total': total / decorrido,
+            'por_tabuleiro': por_tabuleiro,
+        }
+
+    def encerrar(self):
+        for tabuleiro in self.tabuleiros.values():
+            tabuleiro.engine.fechar()
+        self.pool.shutdown(wait=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vários tabuleiros num único processo")
+    parser.add_argument("portas", nargs="*", help="portas/endereços; sem nenhum, descobre as placas conectadas")
+    parser.add_argument("--sim", type=int, default=0, help="adiciona N tabuleiros simulados (sim://)")
+    parser.add_argument("--linhas", type=int, default=3)
+    parser.add_argument("--colunas", type=int, default=3)
+    parser.add_argument("--fps", type=float, default=10.0)
+    parser.add_argument("--trabalhadores", type=int, default=2)
+    parser.add_argument("--calibrar", action="store_true")
+    parser.add_argument("--intervalo", type=float, default=5.0, help="segundos entre relatórios")
+    parser.add_argument("--metricas-porta", type=int, help="expõe /metrics (Prometheus) de todos os tabuleiros nesta porta")
+    args = parser.parse_args()
+
+    configurar_logging()
+    portas = list(args.portas)
+    portas += [f"sim://{args.linhas}x{args.colunas}?fps={args.fps}" for _ in range(args.sim)]
+    if not portas:
+        portas = descobrir_portas()
+    if not portas:
+        print("Nenhuma placa encontrada")
+        return
+
+    servidor = ServidorTabuleiros(args.linhas, args.colunas, args.fps, args.trabalhadores)
+    for porta in portas:
+        servidor.adicionar(porta)
+
+    servidor_metricas = None
+    if args.metricas_porta:
+        # Uma série por tabuleiro, rotulada com o nome dele
+        servidor_metricas = ServidorMetricas(lambda: [t.engine.metricas for t in servidor.tabuleiros.values()],
+                                             args.metricas_porta)
+    ativos = servidor.conectar_todos(calibrar=args.calibrar)
+    print(f"{ativos}/{len(portas)} tabuleiros em streaming")
+
+    try:
+        while True:
+            time.sleep(args.intervalo)
+            stats = servidor.estatisticas()
+            print(f"Total: {stats['frames']} frames, {stats['fps_total']:.1f} frames/s")
+            for nome, t in stats['por_tabuleiro'].items():
+                p50 = f"{t['latencia_p50_ms']:.2f}" if t['latencia_p50_ms'] is not None else "-"
+                p99 = f"{t['latencia_p99_ms']:.2f}" if t['latencia_p99_ms'] is not None else "-"
+                print(f"  {nome} {t['porta']}: {t['fps']:.1f} frames/s, latência p50 {p50} ms, "
+                      f"p99 {p99} ms, descartados {t['descartados']}, movimentos {t['movimentos']}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.encerrar()
+        if servidor_metricas:
+            servidor_metricas.encerrar()
+        encerrar_logging()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+import argparse
+import socket
+import threading
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+
+from protocolo_serial import montar_frame_binario
+from transporte import TransporteTCP
+
+# Leitura média de cada categoria no LDR (0 = vazio, 1 = branco, 2 = preto).
+# A casa vazia recebe mais luz; a peça preta é a que mais bloqueia.
+NIVEIS_CATEGORIA = np.array([900.0, 500.0, 100.0])
+
+# Varredura padrão do firmware; 'ruido' é o desvio da média dessas 20 amostras
+AMOSTRAS_PADRAO = 20
+ESTABILIZACAO_PADRAO_US = 20000
+ENTRE_LINHAS_PADRAO_US = 10000
+
+
+class SimuladorArduino:
+    # Fala o mesmo protocolo do interface_3x3_Diodos.ino (LER, CALIBRAR, RESET,
+    # TEST, STREAM_ON/OFF, MODO, VARREDURA, EXTRA, sufixo " #id") sobre qualquer
+    # transporte. O ruído cai com a raiz do número de amostras de cada casa; com
+    # tempo_varredura, a leitura também leva o tempo que levaria no firmware.
+    # As casas começam na posição da calibração: brancas na linha 0 e
+    # pretas na última (no 8x8, duas linhas de cada lado, como no xadrez);
+    # mover() e definir_categorias() mudam o tabuleiro.
+    def __init__(self, transporte, linhas: int = 3, colunas: int = 3, ruido: float = 5.0,
+                 latencia: float = 0.0, fps_maximo: float = 60.0, tempo_calibracao: float = 0.0,
+                 variacao: float = 0.0, semente: Optional[int] = None, tempo_varredura: bool = False):
+        self.transporte = transporte
+        self.linhas = linhas
+        self.colunas = colunas
+        self.ruido = ruido
+        self.latencia = latencia
+        self.fps_maximo = fps_maximo
+        self.tempo_calibracao = tempo_calibracao
+        self.rng = np.random.default_rng(semente)
+        # Sensibilidade própria de cada LDR (ganho multiplicativo em torno de 1)
+        self.ganhos = np.clip(self.rng.normal(1.0, variacao, (linhas, colunas)), 0.5, 1.5)
+
+        self.categorias = np.zeros((linhas, colunas), dtype=np.int8)
+        fileiras = 2 if (linhas, colunas) == (8, 8) else 1
+        self.categorias[:fileiras, :] = 1
+        self.categorias[-fileiras:, :] = 2
+        self.lock = threading.Lock()
+
+        self.modo_binario = False
+        self.sequencia_frame = 0
+        self.streaming = False
+        self.intervalo_streaming = 0.1
+        self.ultimo_frame = 0.0
+
+        self.tempo_varredura = tempo_varredura
+        self.amostras = AMOSTRAS_PADRAO
+        self.estabilizacao_us = ESTABILIZACAO_PADRAO_US
+        self.entre_linhas_us = ENTRE_LINHAS_PADRAO_US
+        self.extras = np.zeros((linhas, colunas), dtype=int)
+
+        self.comandos_recebidos = 0
+        self.frames_enviados = 0
+
+        self.ativo = False
+        self.thread = None
+
+    def iniciar(self):
+        self.ativo = True
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def parar(self):
+        self.ativo = False
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2)
+
+    # ---- Tabuleiro simulado ----
+
+    def mover(self, origem: Tuple[int, int], destino: Tuple[int, int]):
+        with self.lock:
+            self.categorias[destino] = self.categorias[origem]
+            self.categorias[origem] = 0
+
+    def definir_categorias(self, categorias: np.ndarray):
+        with self.lock:
+            self.categorias[...] = categorias
+
+    def gerar_leituras(self) -> np.ndarray:
+        with self.lock:
+            base = NIVEIS_CATEGORIA[self.categorias] * self.ganhos
+        if self.ruido > 0:
+            desvio = self.ruido * np.sqrt(AMOSTRAS_PADRAO / (self.amostras + self.extras))
+            base = base + self.rng.normal(0.0, 1.0, base.shape) * desvio
+        return np.clip(np.rint(base), 0, 1023).astype(np.uint16)
+
+    def duracao_varredura(self) -> float:
+        # Mesmo laço do realizarLeituraIsolada: linhas sem casas pendentes são puladas
+        passes = self.amostras + int(self.extras.max())
+        linhas = sum(min(passes, self.amostras + int(extras.max())) for extras in self.extras)
+        return (linhas * (self.estabilizacao_us + self.entre_linhas_us) + passes * self.entre_linhas_us / 2) / 1e6
+
+    # ---- Protocolo ----
+
+    def _enviar(self, texto: str):
+        self.transporte.write((texto + "\r\n").encode())
+
+    def _enviar_dados(self):
+        if self.tempo_varredura:
+            time.sleep(self.duracao_varredura())
+        leituras = self.gerar_leituras()
+        if self.modo_binario:
+            self.transporte.write(montar_frame_binario(leituras, self.sequencia_frame))
+        else:
+            self._enviar("DADOS:" + ",".join(str(v) for v in leituras.ravel()))
+        self.sequencia_frame = (self.sequencia_frame + 1) & 0xFFFF
+        self.frames_enviados += 1
+
+    def _loop(self):
+        self._enviar(f"ARDUINO_PRONTO_3X3_REAL_V3 PROTO:ASCII,BIN1,CMDID,SCAN DIM:{self.linhas}x{self.colunas}")
+        self._enviar("Sistema 3x3 Real - Pronto (simulado)")
+
+        while self.ativo:
+            # Sem streaming, espera comandos; com streaming, só até o próximo frame
+            espera = 0.1
+            if self.streaming:
+                espera = max(0.0, self.ultimo_frame + self.intervalo_streaming - time.monotonic())
+            # Mesmo atrasado (varredura mais lenta que o intervalo), olha os comandos
+            # pendentes a cada frame, como o loop() do firmware
+            self.transporte.timeout = max(espera, 1e-4)
+
+            try:
+                linha = self.transporte.readline()
+                if linha and not linha.endswith(b"\n"):
+                    # Comando ainda incompleto: devolve ao buffer e espera o resto
+                    self.transporte.pendente[:0] = linha
+                    linha = b""
+                if linha.strip():
+                    self.tratar_comando(linha.decode('utf-8', errors='ignore').strip())
+
+                if self.streaming and time.monotonic() - self.ultimo_frame >= self.intervalo_streaming:
+                    self.ultimo_frame = time.monotonic()
+                    self._enviar_dados()
+            except (ConnectionError, OSError):
+                break
+
+        self.ativo = False
+
+    def tratar_comando(self, comando: str):
+        self.comandos_recebidos += 1
+
+        sufixo_id = ""
+        pos_id = comando.rfind(" #")
+        if pos_id >= 0:
+            comando, sufixo_id = comando[:pos_id], comando[pos_id:]
+
+        if self.latencia > 0:
+            time.sleep(self.latencia)
+
+        if comando == "LER":
+            self._enviar_dados()
+            self._enviar("LEITURA_CONCLUIDA" + sufixo_id)
+        elif comando == "CALIBRAR":
+            self._enviar("CALIBRACAO: Iniciando calibração automática...")
+            time.sleep(self.tempo_calibracao)
+            for nome, nivel in zip(("Vazio", "Branco", "Preto"), NIVEIS_CATEGORIA):
+                self._enviar(f"CALIBRACAO: {nome}: {int(nivel)}")
+            self._enviar("CALIBRACAO: Sistema calibrado com sucesso!")
+            self._enviar("CALIBRACAO_CONCLUIDA" + sufixo_id)
+        elif comando == "RESET":
+            self.amostras = AMOSTRAS_PADRAO
+            self.estabilizacao_us = ESTABILIZACAO_PADRAO_US
+            self.entre_linhas_us = ENTRE_LINHAS_PADRAO_US
+            self.extras[...] = 0
+            self._enviar("RESET_CONCLUIDO" + sufixo_id)
+        elif comando == "TEST":
+            self._enviar("TESTE_OK" + sufixo_id)
+        elif comando.startswith("STREAM_ON"):
+            try:
+                fps = int(comando[9:] or 0)
+            except ValueError:
+                fps = 0
+            if fps <= 0:
+                fps = 10
+            self.intervalo_streaming = 1.0 / min(fps, self.fps_maximo)
+            self.streaming = True
+            self.ultimo_frame = 0.0
+            self._enviar("STREAM_INICIADO" + sufixo_id)
+        elif comando == "STREAM_OFF":
+            self.streaming = False
+            self._enviar("STREAM_PARADO" + sufixo_id)
+        elif comando == "MODO BIN1":
+            self.modo_binario = True
+            self._enviar("MODO_OK BIN1" + sufixo_id)
+        elif comando == "MODO ASCII":
+            self.modo_binario = False
+            self._enviar("MODO_OK ASCII" + sufixo_id)
+        elif comando.startswith("VARREDURA"):
+            try:
+                amostras, estabilizacao, entre_linhas = (int(v) for v in comando.split()[1:4])
+            except ValueError:
+                amostras = 0
+            if 1 <= amostras <= 64 and 0 <= estabilizacao <= 100000 and 0 <= entre_linhas <= 100000:
+                self.amostras, self.estabilizacao_us, self.entre_linhas_us = amostras, estabilizacao, entre_linhas
+                self._enviar(f"VARREDURA_OK {amostras} {estabilizacao} {entre_linhas}" + sufixo_id)
+            else:
+                self._enviar("VARREDURA_INVALIDA" + sufixo_id)
+        elif comando.startswith("EXTRA"):
+            campos = comando.split()
+            amostras = min(max(int(campos[1]) if len(campos) > 1 and campos[1].isdigit() else 0, 0), 64)
+            self.extras[...] = 0
+            marcadas = 0
+            if amostras and len(campos) > 2:
+                for casa in campos[2].split(","):
+                    if casa.isdigit() and int(casa) < self.linhas * self.colunas:
+                        self.extras.flat[int(casa)] = amostras
+                        marcadas += 1
+            self._enviar(f"EXTRA_OK {marcadas}" + sufixo_id)
+        else:
+            self._enviar(f"COMANDO_DESCONHECIDO {comando}" + sufixo_id)
+
+
+def servir_tcp(porta: int, linhas: int, colunas: int, **opcoes):
+    # Um simulador novo por conexão, como um Arduino que reinicia ao abrir a serial
+    servidor = socket.create_server(("", porta))
+    print(f"Simulador {linhas}x{colunas} ouvindo em tcp://localhost:{porta}")
+    while True:
+        conexao, endereco = servidor.accept()
+        print(f"Conexão de {endereco[0]}:{endereco[1]}")
+        SimuladorArduino(TransporteTCP(conexao), linhas, colunas, **opcoes).iniciar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Arduino simulado para testes sem hardware")
+    parser.add_argument("--porta-tcp", type=int, default=5555)
+    parser.add_argument("--linhas", type=int, default=3)
+    parser.add_argument("--colunas", type=int, default=3)
+    parser.add_argument("--ruido", type=float, default=5.0, help="desvio padrão das leituras do LDR")
+    parser.add_argument("--latencia", type=float, default=0.0, help="atraso por comando, em segundos")
+    parser.add_argument("--fps", type=float, default=60.0, help="limite de frames/s do streaming")
+    parser.add_argument("--variacao", type=float, default=0.0, help="variação do ganho entre LDRs (ex.: 0.1)")
+    args = parser.parse_args()
+
+    try:
+        servir_tcp(args.porta_tcp, args.linhas, args.colunas, ruido=args.ruido,
+                   latencia=args.latencia, fps_maximo=args.fps, variacao=args.variacao)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Iterator, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+# Posição como vista pelos sensores: dois bitboards (bit k = casa i*colunas + j).
+#   ocupadas: casas com peça de qualquer cor
+#   brancas:  casas com peça branca (subconjunto de ocupadas)
+Codigo = Tuple[int, int]
+
+
+class Movimento(NamedTuple):
+    origem: int
+    destino: int
+    captura: bool
+
+
+def bits(valor: int) -> Iterator[int]:
+    while valor:
+        menor = valor & -valor
+        yield menor.bit_length() - 1
+        valor ^= menor
+
+
+class TabelaTransicoes:
+    # Índice (posição anterior, lado que joga) -> {posição observada: lances que a explicam}.
+    # A tabela de uma posição é montada uma vez, quando ela vira o estado atual,
+    # e fica num cache LRU; a partir daí cada frame é um XOR e um acesso a dict.
+    # destinos(codigo, origem, brancas_jogam) pode restringir os destinos de cada
+    # peça (regras de movimento); sem ele, qualquer casa que não seja do próprio lado.
+    # Com uma posicao do gerador_lances, a tabela sai dos lances legais dela (roque,
+    # en passant e promoção incluídos) e o cache é indexado pela posição completa.
+    def __init__(self, linhas: int, colunas: int,
+                 destinos: Optional[Callable[[Codigo, int, bool], Iterable[int]]] = None,
+                 capacidade: int = 1024):
+        self.linhas = linhas
+        self.colunas = colunas
+        self.casas = linhas * colunas
+        self.todas = (1 << self.casas) - 1
+        self.pesos = np.left_shift(np.uint64(1), np.arange(self.casas, dtype=np.uint64))
+        self.destinos = destinos
+        self.capacidade = capacidade
+        self.cache: 'OrderedDict[tuple, Dict[Codigo, tuple]]' = OrderedDict()
+
+    def codificar(self, classificacao: np.ndarray) -> Codigo:
+        # classificacao: 0 = vazio, 1 = branco, 2 = preto
+        plano = classificacao.ravel()
+        return int(self.pesos[plano != 0].sum()), int(self.pesos[plano == 1].sum())
+
+    def casas_alteradas(self, anterior: Codigo, observado: Codigo) -> int:
+        return bin((anterior[0] ^ observado[0]) | (anterior[1] ^ observado[1])).count("1")
+
+    def tabela(self, codigo: Codigo, brancas_jogam: bool, posicao=None) -> Dict[Codigo, tuple]:
+        chave = (codigo, brancas_jogam) if posicao is None else posicao.chave()
+        tabela = self.cache.get(chave)
+        if tabela is None:
+            if posicao is None:
+                tabela = self._construir(codigo, brancas_jogam)
+            else:
+                tabela = self._construir_legais(posicao)
+            self.cache[chave] = tabela
+            if len(self.cache) > self.capacidade:
+                self.cache.popitem(last=False)
+        else:
+            self.cache.move_to_end(chave)
+        return tabela
+
+    def explicar(self, anterior: Codigo, observado: Codigo, brancas_jogam: bool, posicao=None) -> tuple:
+        return self.tabela(anterior, brancas_jogam, posicao).get(observado, ())
+
+    def _construir(self, codigo: Codigo, brancas_jogam: bool) -> Dict[Codigo, Tuple[Movimento, ...]]:
+        ocupadas, brancas = codigo
+        pretas = ocupadas & ~brancas
+        proprias = brancas if brancas_jogam else pretas
+        adversarias = pretas if brancas_jogam else brancas
+
+        tabela: Dict[Codigo, list] = {}
+        for origem in bits(proprias):
+            if self.destinos is None:
+                destinos = bits(self.todas & ~proprias)
+            else:
+                destinos = (d for d in self.destinos(codigo, origem, brancas_jogam) if not (proprias >> d) & 1)
+
+            sem_origem = ocupadas & ~(1 << origem)
+            for destino in destinos:
+                bit = 1 << destino
+                novas_ocupadas = sem_origem | bit
+                if brancas_jogam:
+                    novas_brancas = (brancas & ~(1 << origem)) | bit
+                else:
+                    novas_brancas = brancas & ~bit
+                movimento = Movimento(origem, destino, bool(adversarias & bit))
+                tabela.setdefault((novas_ocupadas, novas_brancas), []).append(movimento)
+
+        return {observado: tuple(movimentos) for observado, movimentos in tabela.items()}
+
+    def _construir_legais(self, posicao) -> Dict[Codigo, tuple]:
+        tabela: Dict[Codigo, list] = {}
+        for lance in posicao.lances_legais():
+            anterior = posicao.jogar(lance)
+            tabela.setdefault(posicao.codigo(), []).append(lance)
+            posicao.desfazer(lance, anterior)
+        return {observado: tuple(lances) for observado, lances in tabela.items()}
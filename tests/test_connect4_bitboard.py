@@ -0,0 +1,78 @@
+import random
+
+import numpy as np
+import pytest
+
+from connect4_bitboard import (COLUNAS, LINHAS, Connect_4, EstadoConnect4, carregar_referencia, conferir,
+                               entradas_modelo, rollout, tem_quatro)
+
+
+def partida_aleatoria(rng, lances):
+    estado, jogador = EstadoConnect4(), 1
+    for _ in range(lances):
+        validos = estado.validos()
+        if not validos or estado.vencedor():
+            break
+        estado = estado.jogar(rng.choice(validos), jogador)
+        jogador = -jogador
+    return estado, jogador
+
+
+def quatro_na_matriz(matriz, jogador):
+    # Varredura direta da matriz, como o Check_Conections do notebook
+    for i in range(LINHAS):
+        for j in range(COLUNAS):
+            for di, dj in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                casas = [(i + k * di, j + k * dj) for k in range(4)]
+                if all(0 <= a < LINHAS and 0 <= b < COLUNAS and matriz[a, b] == jogador for a, b in casas):
+                    return True
+    return False
+
+
+def test_igual_ao_connect4_do_notebook():
+    referencia = carregar_referencia()
+    assert conferir(referencia, 300, random.Random(1)) == 0
+
+
+def test_tem_quatro_igual_a_varredura_da_matriz():
+    rng = random.Random(2)
+    for _ in range(500):
+        estado, _ = partida_aleatoria(rng, rng.randint(0, 42))
+        matriz = estado.matriz()
+        assert tem_quatro(estado.pecas1) == quatro_na_matriz(matriz, 1)
+        assert tem_quatro(estado.pecas2) == quatro_na_matriz(matriz, -1)
+
+
+def test_matriz_ida_e_volta():
+    rng = random.Random(3)
+    for _ in range(200):
+        estado, _ = partida_aleatoria(rng, rng.randint(0, 42))
+        assert EstadoConnect4.de_matriz(estado.matriz()) == estado
+
+
+def test_coluna_cheia():
+    estado = EstadoConnect4()
+    for k in range(LINHAS):
+        estado = estado.jogar(0, 1 if k % 2 == 0 else -1)
+    assert 0 not in estado.validos()
+    with pytest.raises(ValueError):
+        estado.jogar(0, 1)
+    jogo = Connect_4(estado)
+    assert jogo.get_valid_moves() == list(range(1, COLUNAS))
+
+
+def test_entradas_do_modelo():
+    rng = random.Random(4)
+    estados = [partida_aleatoria(rng, rng.randint(0, 30)) for _ in range(16)]
+    entradas = entradas_modelo([e.pecas1 for e, _ in estados], [e.pecas2 for e, _ in estados],
+                               [j for _, j in estados])
+    assert entradas.shape == (16, LINHAS * COLUNAS + 1)
+    for (estado, jogador), linha in zip(estados, entradas):
+        np.testing.assert_array_equal(linha[:-1], estado.matriz().ravel())
+        assert linha[-1] == jogador
+
+
+def test_rollout_termina_com_vencedor_valido():
+    rng = random.Random(5)
+    for _ in range(200):
+        assert rollout(EstadoConnect4(), 1, rng) in (-1, 0, 1)
@@ -0,0 +1,50 @@
+import pytest
+
+from gerador_lances import (FEN_INICIAL, ROQUE_PEQUENO, Posicao, casa_de_nome, comando_robo, nome_casa)
+
+KIWIPETE = "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1"
+POSICAO_3 = "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1"
+
+
+# Contagens publicadas (chessprogramming.org/Perft_Results)
+@pytest.mark.parametrize("fen,contagens", [
+    (FEN_INICIAL, [20, 400, 8902]),
+    (KIWIPETE, [48, 2039]),
+    (POSICAO_3, [14, 191, 2812]),
+])
+def test_perft(fen, contagens):
+    posicao = Posicao.de_fen(fen)
+    for profundidade, esperado in enumerate(contagens, start=1):
+        assert posicao.perft(profundidade) == esperado
+
+
+def test_perft_nao_altera_a_posicao():
+    posicao = Posicao.de_fen(KIWIPETE)
+    antes = posicao.chave()
+    posicao.perft(2)
+    assert posicao.chave() == antes
+
+
+def test_variante_3x3():
+    posicao = Posicao.de_matriz([list('ABC'), ['·'] * 3, list('abc')])
+    lances = {(l.peca, l.origem, l.destino, l.captura) for l in posicao.lances_legais()}
+    assert {origem for _, origem, _, _ in lances} == {0, 1, 2}
+    assert ('A', 0, 8, 'c') in lances   # rainha na diagonal
+    assert ('B', 1, 7, 'b') in lances   # torre na coluna
+    assert ('C', 2, 4, '') in lances    # bispo
+    assert not any(peca == 'B' and destino % 3 != 1 for peca, _, destino, _ in lances)
+
+
+def test_nomes_de_casas_ida_e_volta():
+    for linhas, colunas in ((3, 3), (8, 8), (5, 4)):
+        for k in range(linhas * colunas):
+            assert casa_de_nome(nome_casa(*divmod(k, colunas), linhas, colunas), linhas, colunas) == k
+    assert casa_de_nome('e2', 8, 8) == 12
+    with pytest.raises(ValueError):
+        casa_de_nome('i9', 8, 8)
+
+
+def test_comando_robo_roque():
+    posicao = Posicao.de_fen(KIWIPETE)
+    roque = next(l for l in posicao.lances_legais() if l.especial == ROQUE_PEQUENO)
+    assert comando_robo(roque, posicao) == "MOVER 4,6,0,6,2"
@@ -0,0 +1,107 @@
+import io
+
+import numpy as np
+import pytest
+
+from protocolo_serial import ParserFrames, crc16_ccitt, montar_frame_binario, tamanho_frame
+
+
+def frames_aleatorios(n, linhas, colunas, semente=0):
+    rng = np.random.default_rng(semente)
+    return [rng.integers(0, 1024, size=(linhas, colunas), dtype=np.uint16) for _ in range(n)]
+
+
+def ler_tudo(parser, fluxo):
+    # Lê até o fluxo acabar (BytesIO devolve b'' no fim, como um timeout)
+    recebidos = []
+    while fluxo.tell() < len(fluxo.getbuffer()) or parser.sobra:
+        mensagem = parser.ler_mensagem(fluxo)
+        if mensagem is not None:
+            tipo, conteudo = mensagem
+            recebidos.append((tipo, conteudo.copy() if tipo == 'DADOS' else conteudo))
+    return recebidos
+
+
+def test_crc_ccitt_vetor_padrao():
+    assert crc16_ccitt(b"123456789") == 0x29B1
+
+
+def test_frame_binario_ida_e_volta():
+    matriz = frames_aleatorios(1, 8, 8)[0]
+    frame = montar_frame_binario(matriz, 7)
+    assert len(frame) == tamanho_frame(8, 8)
+
+    parser = ParserFrames(8, 8)
+    parser.definir_binario(True)
+    tipo, lida = parser.ler_mensagem(io.BytesIO(frame))
+    assert tipo == 'DADOS'
+    np.testing.assert_array_equal(lida, matriz)
+    assert parser.sequencia == 7
+
+
+@pytest.mark.parametrize("linhas,colunas", [(3, 3), (8, 8)])
+def test_ressincroniza_depois_de_byte_perdido(linhas, colunas):
+    frames = frames_aleatorios(200, linhas, colunas)
+    dados = bytearray(b"".join(montar_frame_binario(f, n) for n, f in enumerate(frames)))
+    # Um byte some no meio das leituras do frame 10
+    del dados[10 * tamanho_frame(linhas, colunas) + 9]
+
+    parser = ParserFrames(linhas, colunas)
+    parser.definir_binario(True)
+    recebidos = ler_tudo(parser, io.BytesIO(bytes(dados)))
+
+    assert len(recebidos) == 199
+    esperados = frames[:10] + frames[11:]
+    for (tipo, lida), esperada in zip(recebidos, esperados):
+        assert tipo == 'DADOS'
+        np.testing.assert_array_equal(lida, esperada)
+    assert parser.frames_invalidos == 1
+    assert parser.frames_perdidos == 1
+
+
+def test_ressincroniza_depois_de_crc_errado():
+    frames = frames_aleatorios(20, 3, 3)
+    dados = bytearray(b"".join(montar_frame_binario(f, n) for n, f in enumerate(frames)))
+    dados[5 * tamanho_frame(3, 3) + 8] ^= 0xFF
+
+    parser = ParserFrames(3, 3)
+    parser.definir_binario(True)
+    recebidos = ler_tudo(parser, io.BytesIO(bytes(dados)))
+
+    assert len(recebidos) == 19
+    assert parser.frames_invalidos == 1
+
+
+def test_frame_cortado_por_timeout_conta_como_invalido():
+    frame = montar_frame_binario(frames_aleatorios(1, 3, 3)[0], 0)
+    parser = ParserFrames(3, 3)
+    parser.definir_binario(True)
+
+    assert parser.ler_mensagem(io.BytesIO(frame[:-4])) is None
+    assert parser.frames_invalidos == 1
+
+
+def test_linhas_de_texto_entre_frames_binarios():
+    frames = frames_aleatorios(3, 3, 3)
+    dados = (montar_frame_binario(frames[0], 0) + b"VARREDURA_OK #4\r\n" +
+             b"\x01\x02lixo" + montar_frame_binario(frames[1], 1) +
+             "CALIBRACAO: peças\n".encode() + montar_frame_binario(frames[2], 2))
+
+    parser = ParserFrames(3, 3)
+    parser.definir_binario(True)
+    recebidos = ler_tudo(parser, io.BytesIO(dados))
+
+    assert [tipo for tipo, _ in recebidos] == ['DADOS', 'LINHA', 'DADOS', 'LINHA', 'DADOS']
+    assert recebidos[1][1] == "VARREDURA_OK #4"
+    assert recebidos[3][1] == "CALIBRACAO: peças"
+    assert parser.frames_invalidos == 0
+
+
+def test_modo_ascii():
+    parser = ParserFrames(3, 3)
+    fluxo = io.BytesIO(b"DADOS:1,2,3,4,5,6,7,8,9\nLEITURA_OK\n")
+
+    tipo, matriz = parser.ler_mensagem(fluxo)
+    assert tipo == 'DADOS'
+    np.testing.assert_array_equal(matriz, np.arange(1, 10).reshape(3, 3))
+    assert parser.ler_mensagem(fluxo) == ('LINHA', "LEITURA_OK")
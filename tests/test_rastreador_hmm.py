@@ -0,0 +1,65 @@
+import numpy as np
+
+from gerador_lances import ROQUE_PEQUENO, Posicao
+from rastreador_hmm import ModeloSensores, RastreadorHMM
+from tabela_transicoes import TabelaTransicoes
+
+CLUSTERS = {
+    'vazio': {'media': 800.0, 'desvio': 15.0},
+    'branco': {'media': 500.0, 'desvio': 15.0},
+    'preto': {'media': 200.0, 'desvio': 15.0},
+}
+MEDIAS = np.array([800.0, 500.0, 200.0])
+
+
+def leitura(posicao, rng):
+    # Classe de cada casa pela peça (maiúscula = branca) e ruído gaussiano
+    classes = np.array([[0 if p == '·' else 1 if p.isupper() else 2 for p in linha] for linha in posicao.para_matriz()])
+    return MEDIAS[classes] + rng.normal(0, 15.0, classes.shape)
+
+
+def novo_rastreador(linhas, colunas):
+    return RastreadorHMM(TabelaTransicoes(linhas, colunas), ModeloSensores(CLUSTERS))
+
+
+def observar(rastreador, posicao, leituras, rng, frames):
+    for _ in range(frames):
+        resultado = rastreador.atualizar(leituras(rng), posicao.codigo(), posicao.vez == 0, posicao)
+        if resultado is not None:
+            return resultado
+    return None
+
+
+def test_confirma_lance_simples():
+    rng = np.random.default_rng(0)
+    posicao = Posicao.de_matriz([list('ABC'), ['·'] * 3, list('abc')])
+    rastreador = novo_rastreador(3, 3)
+
+    # Tabuleiro parado: nenhum lance
+    assert observar(rastreador, posicao, lambda r: leitura(posicao, r), rng, 30) is None
+
+    lance = next(l for l in posicao.lances_legais() if (l.origem, l.destino) == (1, 4))
+    depois = Posicao.de_matriz(posicao.para_matriz())
+    depois.jogar(lance)
+    resultado = observar(rastreador, posicao, lambda r: leitura(depois, r), rng, 30)
+    assert resultado is not None
+    lances, confianca = resultado
+    assert lances == (lance,)
+    assert confianca >= rastreador.limiar_confianca
+
+
+def test_roque_pela_metade_nao_confirma():
+    rng = np.random.default_rng(1)
+    posicao = Posicao.de_fen("4k3/8/8/8/8/8/8/4K2R w K - 0 1")
+    rastreador = novo_rastreador(8, 8)
+    roque = next(l for l in posicao.lances_legais() if l.especial == ROQUE_PEQUENO)
+
+    # Rei já em g1, torre ainda em h1
+    meio = posicao.para_matriz()
+    meio[0][4], meio[0][6] = '·', 'K'
+    meio = Posicao.de_matriz(meio)
+    assert observar(rastreador, posicao, lambda r: leitura(meio, r), rng, 30) is None
+
+    completo = Posicao.de_fen("4k3/8/8/8/8/8/8/5RK1 b - - 1 1")
+    resultado = observar(rastreador, posicao, lambda r: leitura(completo, r), rng, 30)
+    assert resultado is not None and resultado[0] == (roque,)
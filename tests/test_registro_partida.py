@@ -0,0 +1,77 @@
+import json
+import os
+
+from gerador_lances import FEN_INICIAL, Posicao, nome_casa
+from registro_partida import (RegistroPartida, arquivo_partida, exportar_pgn, ler_partida, texto_lance, truncar_partida,
+                              ultima_partida)
+
+
+def lance_de(posicao, origem, destino):
+    return next(l for l in posicao.lances_legais() if (l.origem, l.destino) == (origem, destino))
+
+
+def gravar(caminho, posicao, lances, registro=None):
+    # Joga e registra os lances (origem, destino) como o BoardEngine faz
+    if registro is None:
+        registro = RegistroPartida.nova(caminho, posicao.linhas, posicao.colunas, posicao.para_matriz(), True)
+    for origem, destino in lances:
+        antes = posicao.para_matriz()
+        lance = lance_de(posicao, origem, destino)
+        posicao.jogar(lance)
+        registro.registrar_lance(lance, antes, posicao.para_matriz(), posicao.vez == 0)
+    registro.fechar()
+
+
+def test_retoma_depois_de_ultima_linha_cortada(tmp_path):
+    caminho = str(tmp_path / "partida.jsonl")
+    posicao = Posicao.de_fen(FEN_INICIAL)
+    gravar(caminho, posicao, [(12, 28), (52, 36)])  # e2-e4 e7-e5
+
+    # Queda do processo no meio da escrita do próximo lance
+    with open(caminho, 'a', encoding='utf-8') as f:
+        f.write(json.dumps({'tipo': 'lance', 'n': 3})[:12])
+
+    partida = ler_partida(caminho)
+    assert len(partida.lances) == 2
+    assert partida.linhas_descartadas == 1
+    assert not partida.encerrada
+    assert partida.pecas == posicao.para_matriz()
+    assert partida.vez_das_brancas
+
+    # Retomar corta o resto corrompido e continua no mesmo arquivo
+    truncar_partida(partida)
+    retomada = partida.posicao()
+    assert retomada.chave() == posicao.chave()
+    gravar(caminho, retomada, [(6, 21)], RegistroPartida(caminho, lances=len(partida.lances)))  # Ng1-f3
+
+    partida = ler_partida(caminho)
+    assert [l['n'] for l in partida.lances] == [1, 2, 3]
+    assert partida.linhas_descartadas == 0
+
+
+def test_pgn_8x8_usa_coordenadas_do_xadrez(tmp_path):
+    caminho = str(tmp_path / "partida.jsonl")
+    gravar(caminho, Posicao.de_fen(FEN_INICIAL), [(12, 28), (52, 36), (6, 21)])
+    pgn = exportar_pgn(ler_partida(caminho))
+    assert pgn.rstrip().endswith("1. e2-e4 e7-e5 2. Ng1-f3 *")
+
+
+def test_notacao_do_3x3():
+    assert nome_casa(0, 0, 3, 3) == "A3"
+    assert nome_casa(2, 1, 3, 3) == "B1"
+    registro = {'origem': 0, 'destino': 3, 'peca': 'A', 'captura': '', 'promocao': '', 'especial': 0}
+    assert texto_lance(registro, 3, 3) == "AA3-A2"
+
+
+def test_partidas_no_mesmo_segundo_em_arquivos_distintos(tmp_path):
+    diretorio = str(tmp_path)
+    caminhos = []
+    for _ in range(3):
+        caminho = arquivo_partida('sim://8x8', diretorio)
+        RegistroPartida.nova(caminho, 8, 8, Posicao.de_fen(FEN_INICIAL).para_matriz(), True).encerrar('*')
+        caminhos.append(caminho)
+    assert len(set(caminhos)) == 3
+    assert caminhos == sorted(caminhos)
+    assert ultima_partida('sim://8x8', diretorio) == caminhos[-1]
+    for caminho in caminhos:
+        assert os.path.exists(caminho) and ler_partida(caminho).encerrada
@@ -0,0 +1,77 @@
+import numpy as np
+
+from gerador_lances import EN_PASSANT, ROQUE_PEQUENO, Posicao
+from tabela_transicoes import Movimento, TabelaTransicoes
+
+
+def classificacao(texto):
+    # '.' vazio, 'B' branco, 'p' preto; uma string por linha
+    return np.array([['.Bp'.index(c) for c in linha] for linha in texto], dtype=np.int8)
+
+
+def test_codificar():
+    tabela = TabelaTransicoes(3, 3)
+    ocupadas, brancas = tabela.codificar(classificacao(["BB.", "...", "p.p"]))
+    assert ocupadas == 0b101000011
+    assert brancas == 0b11
+
+
+def test_lance_simples_e_captura():
+    tabela = TabelaTransicoes(3, 3)
+    anterior = tabela.codificar(classificacao(["BB.", "...", "p.p"]))
+
+    andou = tabela.codificar(classificacao(["B..", ".B.", "p.p"]))
+    assert tabela.explicar(anterior, andou, True) == (Movimento(1, 4, False),)
+
+    capturou = tabela.codificar(classificacao(["B..", "...", "pBp"]))
+    assert tabela.explicar(anterior, capturou, True) == (Movimento(1, 7, False),)
+    capturou = tabela.codificar(classificacao([".B.", "...", "B.p"]))
+    assert tabela.explicar(anterior, capturou, True) == (Movimento(0, 6, True),)
+
+    # Vez das brancas: um lance das pretas não explica nada
+    pretas = tabela.codificar(classificacao(["BB.", "p..", "..p"]))
+    assert tabela.explicar(anterior, pretas, True) == ()
+    assert tabela.explicar(anterior, pretas, False) == (Movimento(6, 3, False),)
+
+
+def test_tabela_igual_a_enumeracao_direta():
+    rng = np.random.default_rng(0)
+    tabela = TabelaTransicoes(3, 3)
+    for _ in range(50):
+        atual = rng.integers(0, 3, size=(3, 3))
+        anterior = tabela.codificar(atual)
+        esperados = set()
+        for origem in np.flatnonzero(atual.ravel() == 1):
+            for destino in np.flatnonzero(atual.ravel() != 1):
+                depois = atual.ravel().copy()
+                captura = bool(depois[destino] == 2)
+                depois[origem], depois[destino] = 0, 1
+                esperados.add((tabela.codificar(depois.reshape(3, 3)), Movimento(int(origem), int(destino), captura)))
+        obtidos = {(observado, m) for observado, movimentos in tabela.tabela(anterior, True).items() for m in movimentos}
+        assert obtidos == esperados
+
+
+def test_roque_e_en_passant_com_regras():
+    tabela = TabelaTransicoes(8, 8)
+    posicao = Posicao.de_fen("r3k2r/8/8/3pP3/8/8/8/R3K2R w KQkq d6 0 1")
+    anterior = posicao.codigo()
+    legais = tabela.tabela(anterior, True, posicao)
+
+    roque = next(l for l in posicao.lances_legais() if l.especial == ROQUE_PEQUENO)
+    en_passant = next(l for l in posicao.lances_legais() if l.especial == EN_PASSANT)
+    for lance, casas in ((roque, 4), (en_passant, 3)):
+        desfazer = posicao.jogar(lance)
+        observado = posicao.codigo()
+        posicao.desfazer(lance, desfazer)
+        assert tabela.casas_alteradas(anterior, observado) == casas
+        assert legais[observado] == (lance,)
+
+
+def test_cache_lru():
+    tabela = TabelaTransicoes(3, 3, capacidade=2)
+    codigos = [tabela.codificar(classificacao(t)) for t in (["B..", "...", "..p"], [".B.", "...", "..p"],
+                                                             ["..B", "...", "..p"])]
+    for codigo in codigos:
+        tabela.tabela(codigo, True)
+    assert len(tabela.cache) == 2
+    assert (codigos[0], True) not in tabela.cache
@@ -0,0 +1,195 @@
+import socket
+import threading
+import time
+from typing import Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+import serial
+
+# Endereços aceitos por abrir_transporte:
+#   COM6, /dev/ttyUSB0            porta serial (pyserial)
+#   tcp://host:5555               simulador ou ponte serial<->TCP em outra máquina
+#   sim://8x8?ruido=5&latencia=0.01&fps=30&variacao=0.1
+#                                 Arduino simulado no próprio processo (loopback);
+#                                 varredura=1 simula também o tempo de cada leitura
+# Todos expõem a mesma interface mínima usada pelo LeitorSerial e pelo
+# ParserFrames: read, readinto, readline, write, close, is_open e timeout.
+
+
+class Transporte:
+    # Base para transportes que não são pyserial. As subclasses só implementam
+    # _receber (bloqueia até 'espera' segundos e devolve b'' em timeout) e write.
+    def __init__(self, timeout: Optional[float] = 0.5):
+        self.timeout = timeout
+        self.is_open = True
+        self.pendente = bytearray()
+
+    def _receber(self, espera: Optional[float]) -> bytes:
+        raise NotImplementedError
+
+    def write(self, dados: bytes) -> int:
+        raise NotImplementedError
+
+    def close(self):
+        self.is_open = False
+
+    def _prazo(self) -> Optional[float]:
+        return None if self.timeout is None else time.monotonic() + self.timeout
+
+    def _completar(self, prazo: Optional[float]) -> bool:
+        # Traz mais bytes para o buffer; False quando o prazo acabou
+        espera = None if prazo is None else prazo - time.monotonic()
+        if espera is not None and espera <= 0:
+            return False
+        bloco = self._receber(espera)
+        if bloco:
+            self.pendente += bloco
+        return True
+
+    def read(self, n: int = 1) -> bytes:
+        # Mesma semântica do pyserial: até n bytes ou o que chegou até o timeout
+        prazo = self._prazo()
+        while len(self.pendente) < n and self._completar(prazo):
+            pass
+        dados = bytes(self.pendente[:n])
+        del self.pendente[:n]
+        return dados
+
+    def readinto(self, destino) -> int:
+        dados = self.read(len(destino))
+        destino[:len(dados)] = dados
+        return len(dados)
+
+    def readline(self) -> bytes:
+        prazo = self._prazo()
+        fim = self.pendente.find(b"\n")
+        while fim < 0 and self._completar(prazo):
+            fim = self.pendente.find(b"\n")
+        n = fim + 1 if fim >= 0 else len(self.pendente)
+        dados = bytes(self.pendente[:n])
+        del self.pendente[:n]
+        return dados
+
+    def reset_input_buffer(self):
+        self.pendente.clear()
+
+
+class TransporteTCP(Transporte):
+    def __init__(self, sock: socket.socket, timeout: Optional[float] = 0.5):
+        super().__init__(timeout)
+        self.sock = sock
+        # Frames e respostas são pequenos; sem Nagle a latência fica no link
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    @classmethod
+    def conectar(cls, host: str, porta: int, timeout: Optional[float] = 0.5) -> 'TransporteTCP':
+        return cls(socket.create_connection((host, porta), timeout=5), timeout)
+
+    def _receber(self, espera: Optional[float]) -> bytes:
+        self.sock.settimeout(espera)
+        try:
+            bloco = self.sock.recv(4096)
+        except socket.timeout:
+            return b""
+        if not bloco:
+            self.is_open = False
+            raise ConnectionError("Conexão TCP encerrada pelo outro lado")
+        return bloco
+
+    def write(self, dados: bytes) -> int:
+        self.sock.sendall(dados)
+        return len(dados)
+
+    def close(self):
+        super().close()
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class _Canal:
+    # Um sentido do loopback: bytes escritos de um lado, lidos do outro
+    def __init__(self):
+        self.dados = bytearray()
+        self.cond = threading.Condition()
+        self.fechado = False
+
+    def escrever(self, dados: bytes):
+        with self.cond:
+            if self.fechado:
+                raise ConnectionError("Loopback fechado")
+            self.dados += dados
+            self.cond.notify_all()
+
+    def receber(self, espera: Optional[float]) -> bytes:
+        with self.cond:
+            if not self.dados and not self.fechado:
+                self.cond.wait(espera)
+            if not self.dados and self.fechado:
+                raise ConnectionError("Loopback fechado")
+            bloco = bytes(self.dados)
+            self.dados.clear()
+            return bloco
+
+    def fechar(self):
+        with self.cond:
+            self.fechado = True
+            self.cond.notify_all()
+
+
+class TransporteLoopback(Transporte):
+    def __init__(self, entrada: _Canal, saida: _Canal, timeout: Optional[float] = 0.5):
+        super().__init__(timeout)
+        self.entrada = entrada
+        self.saida = saida
+
+    def _receber(self, espera: Optional[float]) -> bytes:
+        return self.entrada.receber(espera)
+
+    def write(self, dados: bytes) -> int:
+        self.saida.escrever(bytes(dados))
+        return len(dados)
+
+    def close(self):
+        # Fecha os dois sentidos: o outro lado vê ConnectionError, como num cabo solto
+        super().close()
+        self.entrada.fechar()
+        self.saida.fechar()
+
+
+def criar_par_loopback(timeout: Optional[float] = 0.5) -> Tuple[TransporteLoopback, TransporteLoopback]:
+    # (lado do host, lado do dispositivo)
+    ida, volta = _Canal(), _Canal()
+    return TransporteLoopback(volta, ida, timeout), TransporteLoopback(ida, volta, timeout)
+
+
+def abrir_transporte(endereco: str, baud_rate: int = 115200, timeout: Optional[float] = 0.5):
+    url = urlsplit(endereco)
+
+    if url.scheme == 'tcp':
+        return TransporteTCP.conectar(url.hostname or 'localhost', url.port or 5555, timeout)
+
+    if url.scheme == 'sim':
+        # Import tardio: o simulador depende deste módulo
+        from simulador_arduino import SimuladorArduino
+
+        opcoes = {chave: valores[-1] for chave, valores in parse_qs(url.query).items()}
+        linhas, colunas = 3, 3
+        if url.netloc:
+            linhas, colunas = (int(x) for x in url.netloc.lower().split("x"))
+
+        host, dispositivo = criar_par_loopback(timeout)
+        host.simulador = SimuladorArduino(
+            dispositivo, linhas, colunas,
+            ruido=float(opcoes.get('ruido', 5.0)),
+            latencia=float(opcoes.get('latencia', 0.0)),
+            fps_maximo=float(opcoes.get('fps', 60.0)),
+            variacao=float(opcoes.get('variacao', 0.0)),
+            semente=int(opcoes['semente']) if 'semente' in opcoes else None,
+            tempo_varredura=opcoes.get('varredura', '0') not in ('0', ''))
+        host.simulador.iniciar()
+        return host
+
+    return serial.Serial(endereco, baud_rate, timeout=timeout)